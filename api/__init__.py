@@ -1,2 +1,3 @@
 from api.limiter import NSLeakyBucket
-from api.wrapper import Client
\ No newline at end of file
+from api.wrapper import Client
+from api.aio import AsyncClient
@@ -0,0 +1,217 @@
+import time
+from typing import AsyncIterator, List, Optional
+from api import metrics
+from api.cache import ResponseCache
+from api.resilience import Resilience, endpoint
+from api.singleflight import AsyncSingleFlight
+from api.stream import StreamParser
+from api.transport import Response, StreamingResponse
+from api.wrapper import API_BASE_URL, Client
+
+# aiohttp is only needed if you actually use AsyncClient, so don't make it a hard requirement for the rest of HYPR.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse returned by AsyncPooledTransport.stream(). iter_content() is an async iterator; close() still
+    needs calling once the caller is done with it.
+    """
+
+    __slots__ = ()
+
+    async def iter_content(self) -> AsyncIterator[bytes]:
+        async for chunk in self._chunks:
+            yield chunk
+
+
+class AsyncPooledTransport:
+    """
+    asyncio counterpart to api.transport.PooledTransport. Keeps one aiohttp session (and its keep-alive connection
+    pool) for the lifetime of the transport, and returns the same Response objects as the sync transports.
+
+    The session is created lazily on the first request, since aiohttp wants to be set up from inside a running loop.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        base_url: Optional[str] = None,
+    ):
+        """
+        :param pool_size: Maximum number of connections kept open
+        :param connect_timeout: Seconds to wait for a connection to be established
+        :param read_timeout: Seconds to wait between bytes of the response
+        :param base_url: Optional url to send requests to instead of the live API
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncPooledTransport requires aiohttp to be installed.")
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def url(self, url: str) -> str:
+        return self.base_url if self.base_url is not None else url
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.timeout,
+                headers={"Accept-Encoding": "gzip, deflate"},
+            )
+        return self._session
+
+    async def get(self, url: str, params: dict, headers: dict) -> Response:
+        start = time.perf_counter()
+        async with self.session.get(self.url(url), params=params, headers=headers) as r:
+            content = await r.read()
+            return Response(r.status, r.headers, content, time.perf_counter() - start)
+
+    async def stream(
+        self, url: str, params: dict, headers: dict, chunk_size: int = 8192
+    ) -> AsyncStreamingResponse:
+        r = await self.session.get(self.url(url), params=params, headers=headers)
+        return AsyncStreamingResponse(
+            r.status, r.headers, r.content.iter_chunked(chunk_size), r.release
+        )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+class AsyncClient(Client):
+    def __init__(
+        self,
+        useragent: str,
+        transport: Optional[AsyncPooledTransport] = None,
+        cache: Optional[ResponseCache] = None,
+        resilience: Optional[Resilience] = None,
+    ):
+        """
+        asyncio version of api.wrapper.Client. ns_request is a coroutine, but otherwise behaves exactly like the sync
+        version - it takes the same params and returns the same parsed responses.
+
+        Requests made through an AsyncClient are counted against the same NSLeakyBucket as Client, so sync and async
+        code can be mixed in one process without going over the ratelimit. Identical requests awaited at the same
+        time are only sent once.
+
+        Can be used as an async context manager to close the underlying connection pool on exit:
+
+            async with AsyncClient("useragent") as api:
+                world, tgq = await asyncio.gather(
+                    api.ns_request({"q": "newnations"}),
+                    api.ns_request({"q": "tgq"}),
+                )
+
+        :param useragent: An identifying string for the client
+        :param transport: AsyncPooledTransport to send requests with, defaults to a new one
+        :param cache: ResponseCache to answer repeated queries from, defaults to no caching
+        :param resilience: Retry and circuit breaker policy for server errors, defaults to Resilience()
+        """
+        super().__init__(
+            useragent,
+            transport=transport if transport is not None else AsyncPooledTransport(),
+            cache=cache,
+            resilience=resilience,
+        )
+        self._async_flights = AsyncSingleFlight()
+
+    async def ns_request(self, params: dict) -> dict | List[dict]:
+        """
+        Async wrapper to make NS requests less shitty to work with
+
+        :param params: Dict of parameters to send to the API
+        :return: Response from the request serialized to JSON or a list of JSON formatted responses
+        """
+        if self.cache is not None:
+            hit, response = self.cache.lookup(params)
+            if hit:
+                return response
+        name = endpoint(params)
+        if "a" in params:
+            return await self.resilience.call_async(
+                name, lambda: self.request(params), retry=False
+            )
+        response = await self._async_flights.do(
+            ResponseCache.key(params),
+            lambda: self.resilience.call_async(
+                name, lambda: self.request(params), wait=self.limiter.delay
+            ),
+        )
+        if self.cache is not None:
+            self.cache.store(params, response)
+        return response
+
+    @Client.request.limit
+    async def request(self, params: dict) -> dict | List[dict]:
+        """
+        Async version of Client.request, which skips the cache.
+
+        :param params: Dict of parameters to send to the API
+        :return: Response from the request serialized to JSON or a list of JSON formatted responses
+        """
+        r = await self.transport.get(API_BASE_URL, params, self.headers)
+        return self.parse_response(params, r)
+
+    @Client.request.limit
+    async def ns_stream(
+        self, params: dict, chunk_size: int = 8192
+    ) -> AsyncIterator[dict | str]:
+        """
+        Async version of Client.ns_stream. Parses the response as it downloads, yielding happenings events and
+        nation names as they arrive.
+
+        :param params: Dict of parameters to send to the API
+        :param chunk_size: Number of bytes to read from the connection at a time
+        :raises APIException: The request failed
+        :return: Async iterator of happenings dicts or nation names
+        """
+        r = await self.transport.stream(API_BASE_URL, params, self.headers, chunk_size)
+        # Counted once per stream, same as Client.ns_stream
+        name, status = endpoint(params), str(r.status_code)
+        metrics.REQUESTS.inc(name, metrics.current_campaign.get(), status)
+        if not r.ok:
+            metrics.ERRORS.inc(name, status)
+        try:
+            self.check_stream(r)
+            parser = StreamParser()
+            async for chunk in r.iter_content():
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+        finally:
+            r.close()
+
+    async def send_telegram(
+        self, tgid: int, secret_key: str, to: str, recruitment: bool, block: bool = True
+    ) -> dict:
+        """
+        Async version of Client.send_telegram. Awaits the telegram lanes instead of blocking the thread.
+        """
+        params = self.telegram_params(tgid, secret_key, to)
+        if block:
+            await self.telegram_limiter.acquire_async(self.key, recruitment)
+        else:
+            self.telegram_limiter.check(self.key, recruitment)
+        return await self.ns_request(params)
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
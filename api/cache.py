@@ -0,0 +1,153 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Several campaigns watching the same region tend to ask the API the exact same question within seconds of each
+# other. ResponseCache remembers parsed responses for a short, per-shard time, so the repeats are answered locally
+# and don't cost any ratelimit budget.
+
+# How long a response to each shard stays fresh, in seconds. Happenings move fast, membership lists don't.
+DEFAULT_TTLS = {
+    "happenings": 10,
+    "newnations": 15,
+    "nations": 300,
+    "endorsements": 60,
+    "members": 600,
+    "delegates": 600,
+    "tgq": 0,
+}
+
+# Parameters holding nation or region names, which NS treats case- and space-insensitively
+NAME_PARAMS = ("nation", "region", "view")
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 10,
+    ):
+        """
+        LRU cache of parsed API responses with a time-to-live per shard.
+
+        Requests are keyed on their normalised parameters, so {"q": "happenings", "view": "region.The Pacific"} and
+        {"view": "region.the_pacific", "q": "happenings"} share an entry. A response to several shards expires as
+        soon as the shortest-lived of them does. Actions (a=...) and error responses are never cached.
+
+        Cached responses are shared between callers and must be treated as read-only.
+
+        :param maxsize: Maximum number of responses to keep. The least recently used one is evicted past this.
+        :param ttls: Seconds a response to each shard stays fresh, defaults to DEFAULT_TTLS
+        :param default_ttl: Seconds a response stays fresh if its shard isn't listed in ttls
+        """
+        self.maxsize = maxsize
+        self.ttls = ttls if ttls is not None else dict(DEFAULT_TTLS)
+        self.default_ttl = default_ttl
+
+        # key -> (expiry time on the monotonic clock, response)
+        self._entries: OrderedDict[tuple, Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(params: dict) -> tuple:
+        """
+        Normalises request parameters into a cache key.
+        """
+        normalised = []
+        for k, v in params.items():
+            k = k.lower()
+            v = str(v).strip()
+            if k in NAME_PARAMS:
+                v = v.lower().replace(" ", "_")
+            elif k == "q":
+                v = "+".join(sorted(v.lower().split("+")))
+            normalised.append((k, v))
+        return tuple(sorted(normalised))
+
+    def ttl(self, params: dict) -> float:
+        """
+        Seconds a response to params stays fresh.
+        """
+        shards = str(params.get("q", "")).lower().split("+")
+        return min(self.ttls.get(shard, self.default_ttl) for shard in shards)
+
+    def cacheable(self, params: dict) -> bool:
+        return "a" not in params and self.ttl(params) > 0
+
+    def lookup(self, params: dict) -> Tuple[bool, Any]:
+        """
+        Looks up a fresh response to params.
+
+        :param params: Dict of request parameters
+        :return: (True, response) on a hit, (False, None) on a miss
+        """
+        if not self.cacheable(params):
+            return False, None
+        key = self.key(params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return False, None
+
+    def store(self, params: dict, response: Any) -> None:
+        """
+        Remembers the response to params, unless it shouldn't be cached.
+
+        :param params: Dict of request parameters
+        :param response: Parsed response
+        """
+        if not self.cacheable(params):
+            return
+        if isinstance(response, dict) and "error" in response:
+            return
+        key = self.key(params)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl(params), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        return self._evictions
+
+    @property
+    def stats(self) -> dict:
+        """
+        Hit/miss counters, for sizing the cache.
+        """
+        total = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "size": len(self._entries),
+            "hit_rate": self._hits / total if total else 0.0,
+        }
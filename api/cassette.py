@@ -0,0 +1,304 @@
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from api.transport import Response, StreamingResponse, Transport
+
+# Record/replay for Client. RecordingTransport wraps a real transport and writes every request and response that goes
+# through it (status, headers - ratelimit ones included - body and round trip time) to a cassette file.
+# ReplayTransport serves a cassette back without touching the network, at the recorded speed or faster, so campaign
+# searches, parsing and scheduling can be tested and benchmarked offline against real NS data that doesn't change
+# under you.
+#
+# Cassettes are gzipped JSON lines: a header line, then one line per interaction in the order they were made.
+
+CASSETTE_VERSION = 1
+
+# Never written to a cassette: API client keys and telegram secret keys
+SECRET_PARAMS = frozenset({"client", "key"})
+# Response headers not worth keeping
+DROPPED_HEADERS = frozenset({"set-cookie", "content-encoding", "transfer-encoding"})
+REDACTED = "[redacted]"
+
+
+class CassetteMiss(LookupError):
+    """
+    Raised by ReplayTransport for a request that isn't on the cassette.
+    """
+
+    pass
+
+
+def scrub(params: Mapping) -> Dict[str, str]:
+    """
+    Params as they're stored on a cassette and matched on replay: values as strings, secrets redacted.
+    """
+    return {
+        k: REDACTED if k in SECRET_PARAMS else str(v) for k, v in sorted(params.items())
+    }
+
+
+def request_key(params: Mapping) -> Tuple[Tuple[str, str], ...]:
+    return tuple(scrub(params).items())
+
+
+class Interaction:
+    __slots__ = ("params", "status_code", "headers", "content", "elapsed", "offset")
+
+    def __init__(
+        self,
+        params: Dict[str, str],
+        status_code: int,
+        headers: Dict[str, str],
+        content: bytes,
+        elapsed: float,
+        offset: float,
+    ):
+        """
+        :param params: Scrubbed request parameters, see scrub()
+        :param status_code: HTTP status of the response
+        :param headers: Response headers
+        :param content: Response body
+        :param elapsed: Seconds the round trip took
+        :param offset: Seconds since recording started that the request was sent
+        """
+        self.params = params
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+        self.offset = offset
+
+    def to_json(self) -> dict:
+        record = {
+            "params": self.params,
+            "status": self.status_code,
+            "headers": self.headers,
+            "elapsed": round(self.elapsed, 6),
+            "offset": round(self.offset, 6),
+        }
+        try:
+            record["body"] = self.content.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body_b64"] = base64.b64encode(self.content).decode("ascii")
+        return record
+
+    @classmethod
+    def from_json(cls, record: dict) -> "Interaction":
+        if "body_b64" in record:
+            content = base64.b64decode(record["body_b64"])
+        else:
+            content = record["body"].encode("utf-8")
+        return cls(
+            record["params"],
+            record["status"],
+            record["headers"],
+            content,
+            record["elapsed"],
+            record["offset"],
+        )
+
+
+class Cassette:
+    def __init__(self, interactions: Optional[List[Interaction]] = None):
+        self.interactions = interactions if interactions is not None else []
+
+    def __len__(self) -> int:
+        return len(self.interactions)
+
+    def __iter__(self) -> Iterator[Interaction]:
+        return iter(self.interactions)
+
+    def save(self, path: str) -> None:
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction.to_json(), separators=(",", ":")))
+                f.write("\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(
+                    f"{path} is a version {header.get('version')} cassette, expected {CASSETTE_VERSION}"
+                )
+            return cls(
+                [Interaction.from_json(json.loads(line)) for line in f if line.strip()]
+            )
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests through another transport and records them. Nothing is written until save() or close().
+    """
+
+    def __init__(self, transport: Transport, path: str):
+        """
+        :param transport: Transport that actually makes the requests
+        :param path: File to save the cassette to
+        """
+        super().__init__()
+        self.transport = transport
+        self.path = path
+        self.cassette = Cassette()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        params: dict,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        elapsed: float,
+        sent: float,
+    ) -> None:
+        interaction = Interaction(
+            scrub(params),
+            status_code,
+            {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+            content,
+            elapsed,
+            sent - self._start,
+        )
+        with self._lock:
+            self.cassette.interactions.append(interaction)
+
+    def get(self, url: str, params: dict, headers: dict) -> Response:
+        sent = time.monotonic()
+        r = self.transport.get(url, params, headers)
+        self.record(params, r.status_code, r.headers, r.content, r.elapsed, sent)
+        return r
+
+    def stream(
+        self, url: str, params: dict, headers: dict, chunk_size: int = 8192
+    ) -> StreamingResponse:
+        sent = time.monotonic()
+        r = self.transport.stream(url, params, headers, chunk_size)
+        chunks = []
+
+        def iter_content() -> Iterator[bytes]:
+            for chunk in r.iter_content():
+                chunks.append(chunk)
+                yield chunk
+
+        def close() -> None:
+            r.close()
+            self.record(
+                params,
+                r.status_code,
+                r.headers,
+                b"".join(chunks),
+                time.monotonic() - sent,
+                sent,
+            )
+
+        return StreamingResponse(r.status_code, r.headers, iter_content(), close)
+
+    def save(self) -> None:
+        with self._lock:
+            self.cassette.save(self.path)
+
+    def close(self) -> None:
+        self.save()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Answers requests from a cassette instead of the network.
+
+    Each request is matched on its (scrubbed) parameters. Repeated requests for the same parameters get the recorded
+    responses in the order they were recorded; once those run out, the last one is served again, or CassetteMiss is
+    raised if repeat is False.
+
+    Unless speed is None or pace is False, the original pacing is replayed as well as the round trip times: a response
+    isn't given before its request's recorded offset (scaled by speed) has passed since the first request of the
+    replay, so a run that sat out a ratelimit window while recording does so again on replay.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette | str,
+        speed: Optional[float] = 1.0,
+        repeat: bool = True,
+        pace: bool = True,
+    ):
+        """
+        :param cassette: Cassette, or path to one
+        :param speed: How much faster than recorded to answer, e.g. 10 takes a tenth of the original round trip time
+            and the original gaps between requests. None answers immediately.
+        :param repeat: If False, raise CassetteMiss for requests made more often than they were recorded
+        :param pace: If False, only round trip times are replayed, not the gaps between requests
+        """
+        super().__init__()
+        if isinstance(cassette, str):
+            cassette = Cassette.load(cassette)
+        self.cassette = cassette
+        self.speed = speed
+        self.repeat = repeat
+        self.pace = pace
+        self._queues: Dict[tuple, Deque[Interaction]] = defaultdict(deque)
+        for interaction in cassette:
+            self._queues[request_key(interaction.params)].append(interaction)
+        # Offsets are replayed relative to the earliest one on the cassette, from the first request made
+        self._origin = min((i.offset for i in cassette), default=0.0)
+        self._start: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def next(self, params: dict) -> Interaction:
+        key = request_key(params)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded response for {dict(key)}")
+            if len(queue) > 1 or not self.repeat:
+                return queue.popleft()
+            return queue[0]
+
+    def wait(self, interaction: Interaction) -> float:
+        """
+        Sleeps until the interaction's response is due.
+
+        :return: The scaled round trip time, not counting any time spent waiting for the request's offset
+        """
+        if self.speed is None:
+            return 0.0
+        pause = 0.0
+        if self.pace:
+            now = time.monotonic()
+            with self._lock:
+                if self._start is None:
+                    self._start = now
+                due = self._start + (interaction.offset - self._origin) / self.speed
+            pause = max(0.0, due - now)
+        elapsed = interaction.elapsed / self.speed
+        time.sleep(pause + elapsed)
+        return elapsed
+
+    def get(self, url: str, params: dict, headers: dict) -> Response:
+        interaction = self.next(params)
+        elapsed = self.wait(interaction)
+        return Response(
+            interaction.status_code,
+            interaction.headers,
+            interaction.content,
+            elapsed,
+        )
+
+    def stream(
+        self, url: str, params: dict, headers: dict, chunk_size: int = 8192
+    ) -> StreamingResponse:
+        interaction = self.next(params)
+        self.wait(interaction)
+        content = interaction.content
+        chunks = (
+            content[i : i + chunk_size] for i in range(0, len(content), chunk_size)
+        )
+        return StreamingResponse(interaction.status_code, interaction.headers, chunks)
@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+from api.responses import Shards
+import api.wrapper
+
+# NS lets one request ask for several shards of the same entity at once (q=happenings+newnations, or several nation
+# shards joined with +), but only counts it as one request against the ratelimit. The Coalescer sits in front of a
+# Client and takes advantage of that: shard requests for the same entity that arrive within a short window of each
+# other are merged into one request, and the parsed result is split back out to each caller. Build a Client with
+# coalesce=window to have every ns_request go through one.
+
+
+class _Batch:
+    """
+    Shard requests waiting to be sent together.
+    """
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.shards: Set[str] = set()
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[Exception] = None
+
+
+class Coalescer:
+    def __init__(
+        self,
+        client: "api.wrapper.Client",
+        window: float = 0.05,
+        send: Optional[Callable[[dict], dict | List[dict]]] = None,
+    ):
+        """
+        Batches shard requests made through ns_request().
+
+        The first caller for an entity opens a batch. If other requests are going through the coalescer at the same
+        time, it waits for the window to pass, while any caller asking for the same entity in the meantime adds its
+        shards to the batch and waits. Then the first caller sends one request for every shard in the batch, and each
+        caller gets back just the shards it asked for, in the same shape ns_request would have returned them. A caller
+        on its own has nobody to batch with, so it sends straight away instead of sitting out the window.
+
+        Requests are only merged if all of their parameters apart from q are identical. Actions (a=...) are never
+        merged.
+
+        :param client: Client to send the merged requests with
+        :param window: Seconds to wait for other requests to join a batch
+        :param send: Sends a request, defaults to client.ns_request. A Client built with coalesce passes the part of
+            its ns_request that comes after the coalescer here.
+        """
+        self.client = client
+        self.window = window
+        self.send = send
+        self._pending: Dict[tuple, _Batch] = {}
+        # callers currently inside ns_request
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def _send(self, params: dict) -> dict | List[dict]:
+        if self.send is not None:
+            return self.send(params)
+        return self.client.ns_request(params)
+
+    def ns_request(self, params: dict) -> dict | List[dict]:
+        """
+        Drop-in replacement for Client.ns_request that merges concurrent shard requests for the same entity.
+
+        :param params: Dict of parameters to send to the API
+        :return: Response from the request, see Client.ns_request
+        """
+        if "a" in params or "q" not in params:
+            return self._send(params)
+
+        shards = params["q"].split("+")
+        key = tuple(sorted((k, str(v)) for k, v in params.items() if k != "q"))
+
+        with self._lock:
+            self._active += 1
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch({k: v for k, v in params.items() if k != "q"})
+                self._pending[key] = batch
+            batch.shards.update(shards)
+            # Only worth waiting for company if there's anyone else about
+            wait = leader and self._active > 1
+
+        try:
+            if leader:
+                if wait:
+                    time.sleep(self.window)
+                with self._lock:
+                    # Close the batch; anyone arriving from now on starts a new one
+                    del self._pending[key]
+                try:
+                    batch.result = self._send(
+                        {**batch.params, "q": "+".join(sorted(batch.shards))}
+                    )
+                except Exception as e:
+                    batch.error = e
+                finally:
+                    # Followers must never be left waiting, even if the leader is interrupted (KeyboardInterrupt...)
+                    if batch.result is None and batch.error is None:
+                        batch.error = RuntimeError("Batched request was interrupted")
+                    batch.done.set()
+            else:
+                batch.done.wait()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        if batch.error is not None:
+            raise batch.error
+        return self._split(batch, shards)
+
+    @staticmethod
+    def _split(batch: _Batch, shards: List[str]) -> dict | List[dict] | Shards:
+        # Nothing was merged, so the response is already in the shape the caller expects
+        if len(batch.shards) == 1:
+            return batch.result
+        # Error dicts are shared by everyone in the batch
+        if isinstance(batch.result, dict) and "error" in batch.result:
+            return batch.result
+
+        if isinstance(batch.result, Shards):
+            # Nation and region responses hold one tag per shard; hand back a response of the same type with just the
+            # tags that belong to the caller's shards
+            selected = batch.result.select(shards)
+            return selected if len(selected) else batch.result
+
+        # World and WA responses come back keyed by shard
+        if len(shards) == 1:
+            return batch.result[shards[0]]
+        return {shard: batch.result[shard] for shard in shards}
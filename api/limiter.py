@@ -1,48 +1,390 @@
+import os
+import json
+import math
 import time
-from typing import Optional, Callable
-from exceptions import TooManyRequests
+import asyncio
+import threading
+import inspect
+import functools
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Callable
+from exceptions import (
+    TooManyRequests,
+    TelegramLimitExceeded,
+    RecruitmentLimitExceeded,
+)
+from api.metrics import RATELIMIT_WAIT, THROTTLED
+
+# File locking is platform specific. HYPR runs on Windows too, so fall back to msvcrt where fcntl doesn't exist.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class Window:
+    """
+    The state of a ratelimit window: when each request in it was made and by which process, when the server last
+    told us to back off until, and which processes are currently waiting for a slot.
+    """
+
+    def __init__(self):
+        # [timestamp, owner] pairs, oldest first. In pacing mode timestamps can be in the future, as waiting
+        # callers reserve their slot before sleeping until it arrives. Requests only the server knows about
+        # (see NSLeakyBucket.sync) have no owner.
+        self.entries: List[list] = []
+        # Set from Retry-After; nothing is admitted before this time.
+        self.blocked_until: float = 0.0
+        # owner -> time it last had to wait for a slot
+        self.waiters: Dict[str, float] = {}
+
+    def prune(self, now: float, period: float) -> None:
+        cutoff = now - period
+        if self.entries and self.entries[0][0] <= cutoff:
+            self.entries = [e for e in self.entries if e[0] > cutoff]
+        self.waiters = {k: v for k, v in self.waiters.items() if v > cutoff}
+
+
+class LocalLedger:
+    """
+    Keeps the ratelimit window in memory. This is what a bucket uses unless told otherwise, and only accounts for
+    requests made by this process.
+    """
+
+    def __init__(self):
+        self.owner = str(os.getpid())
+        self._window = Window()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clock() -> float:
+        return time.monotonic()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Window]:
+        with self._lock:
+            yield self._window
+
+
+class SharedLedger:
+    """
+    Keeps the ratelimit window in a file, so that several HYPR processes on one machine share one budget.
+
+    Every operation takes an exclusive lock on the file, reads the window, updates it and writes it back. Entries
+    are tagged with the process that made them, which lets the bucket give each process a fair share of the budget
+    while more than one is waiting for it, without statically capping anyone when the others are idle.
+
+    Wall-clock time is used rather than the monotonic clock, since it's the only clock every process agrees on.
+    """
+
+    def __init__(self, path: str, owner: Optional[str] = None):
+        """
+        :param path: Path to the ledger file. Created if it doesn't exist.
+        :param owner: Identifies this process in the ledger, defaults to the pid
+        """
+        self.path = path
+        self.owner = owner if owner is not None else str(os.getpid())
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clock() -> float:
+        return time.time()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Window]:
+        with self._lock, open(self.path, "a+") as f:
+            _lock_file(f)
+            try:
+                f.seek(0)
+                window = Window()
+                raw = f.read()
+                if raw:
+                    try:
+                        data = json.loads(raw)
+                        window.entries = data["entries"]
+                        window.blocked_until = data["blocked_until"]
+                        window.waiters = data["waiters"]
+                    except (ValueError, KeyError):
+                        # A corrupt ledger is treated as empty rather than wedging every process sharing it
+                        pass
+                try:
+                    yield window
+                finally:
+                    # Written back even if the caller raised, so that a denied request still registers as waiting
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(
+                        {
+                            "entries": window.entries,
+                            "blocked_until": window.blocked_until,
+                            "waiters": window.waiters,
+                        },
+                        f,
+                    )
+                    f.flush()
+            finally:
+                _unlock_file(f)
+
+
+def _lock_file(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 class NSLeakyBucket:
     """
     Implementation of a Leaky Bucket ratelimiting concept for accessing the NS API
     within the API specification.
+
+    The bucket keeps a log of when each request in the current window was made, so the window slides continuously
+    instead of resetting on whole-second boundaries. The log lives in a ledger: in memory by default, or in a
+    SharedLedger to share the budget with other HYPR processes on the same machine.
+
+    By default, a request that would go over the limit is discarded and TooManyRequests is raised. With pacing
+    enabled, requests instead wait for their slot, and are spread evenly over the window so the full rate can be
+    used without bursts.
+
+    After every response, the client reconciles the bucket with what the server says it has seen via sync(), so
+    requests made by other programs on the same IP are accounted for.
     """
 
-    def __init__(self, func: Callable):
+    def __init__(
+        self, func: Callable, max_requests: int = 45, reset_period: float = 30
+    ):
 
-        self._max_requests: int = 45  # This gives a five-call grace buffer in case another program is being run by
-        # accident
-        self._reset_time: int = 0
-        self._reset_period: int = 30
+        # The default of 45 gives a five-call grace buffer in case another program is being run by accident
+        self._max_requests: int = max_requests
+        self._reset_period: float = reset_period
         self._last_call_made: Optional[int] = None
-        self._requests_made = 0
+        self._pacing: bool = False
+        self._ledger: LocalLedger | SharedLedger = LocalLedger()
 
         self.func = func
 
+    def __get__(self, instance, owner):
+        # Bind to the instance when used as a method decorator, otherwise the wrapped function never sees self.
+        # The bucket itself stays shared between every instance of the owning class.
+        if instance is None:
+            return self
+        return functools.partial(self.__call__, instance)
+
     def __call__(self, *args, **kwargs):
-        # Check to see if the call period has rolled over
-        if time.time().__trunc__() >= self._reset_time:
-            self._requests_made = 0
-            self.reset_time = time.time().__trunc__() + self._reset_period
-
-        self._requests_made += 1
-        if self._requests_made >= self._max_requests:
-            raise TooManyRequests(self.reset_time)
+        if self.pacing:
+            self.acquire()
         else:
-            self.last_call_made = time.time().__trunc__()
-            return self.func(*args, **kwargs)
+            self.check()
+        return self.func(*args, **kwargs)
+
+    def _next_slot(self, window: Window, now: float) -> float:
+        # Earliest instant at which one more request from us fits in the window. Must be called in a transaction.
+        window.prune(now, self._reset_period)
+        entries = window.entries
+        slot = max(now, window.blocked_until)
+        if len(entries) >= self._max_requests:
+            slot = max(slot, entries[-self._max_requests][0] + self._reset_period)
+        if self._pacing and entries:
+            slot = max(slot, entries[-1][0] + self.interval)
+
+        # Fair share: while other processes are waiting for the budget, don't take more than our share of it.
+        owner = self._ledger.owner
+        if any(w != owner for w in window.waiters):
+            contenders = {e[1] for e in entries if e[1] is not None}
+            contenders |= set(window.waiters) | {owner}
+            share = max(1, math.floor(self._max_requests / len(contenders)))
+            own = [e[0] for e in entries if e[1] == owner]
+            if len(own) >= share:
+                slot = max(slot, own[-share] + self._reset_period)
+        return slot
+
+    def _reserve(self, block: bool) -> float:
+        # Reserve the next slot and return how long the caller has to wait for it.
+        with self._ledger.transaction() as window:
+            now = self._ledger.clock()
+            slot = self._next_slot(window, now)
+            if slot > now:
+                window.waiters[self._ledger.owner] = now
+                if not block:
+                    THROTTLED.inc()
+                    raise TooManyRequests(slot - now)
+            else:
+                window.waiters.pop(self._ledger.owner, None)
+            window.entries.append([slot, self._ledger.owner])
+            window.entries.sort(key=lambda e: e[0])
+            self.last_call_made = int(time.time() + slot - now)
+        RATELIMIT_WAIT.observe(slot - now)
+        return slot - now
+
+    def check(self) -> None:
+        """
+        Count a request against the bucket, raising TooManyRequests if it would exceed the ratelimit.
+
+        The exception carries the number of seconds until the request could be made.
+        """
+        self._reserve(block=False)
+
+    async def _reserve_async(self, block: bool) -> float:
+        # A SharedLedger takes a blocking file lock and reads and writes the file, which would stall every coroutine
+        # on the loop while another process holds the lock. Do that in a worker thread instead.
+        if isinstance(self._ledger, LocalLedger):
+            return self._reserve(block)
+        return await asyncio.to_thread(self._reserve, block)
+
+    def acquire(self, block: bool = True) -> float:
+        """
+        Count a request against the bucket, blocking until the exact moment it can be made.
+
+        :param block: If False, raise TooManyRequests instead of waiting
+        :return: Seconds spent waiting
+        """
+        delay = self._reserve(block)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        """
+        Same as acquire(), but awaits the slot instead of blocking the thread.
+
+        :return: Seconds spent waiting
+        """
+        delay = await self._reserve_async(block=True)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def delay(self) -> float:
+        """
+        Seconds until the next request could be made, without counting one.
+        """
+        with self._ledger.transaction() as window:
+            now = self._ledger.clock()
+            return self._next_slot(window, now) - now
+
+    def sync(
+        self, seen: Optional[int] = None, retry_after: Optional[float] = None
+    ) -> None:
+        """
+        Reconcile the bucket with the server's view of the ratelimit.
+
+        If the server has seen more requests in the window than we made, someone else is using our budget, so the
+        difference is counted against us straight away. If it has seen fewer, nothing is dropped: the entries it hasn't
+        counted may be requests still in flight (or reserved by another process sharing the ledger), and forgetting
+        them could let the next burst go over the limit. They leave the window on their own.
+
+        :param seen: Value of the X-Ratelimit-Requests-Seen header
+        :param retry_after: Value of the Retry-After header, in seconds
+        """
+        with self._ledger.transaction() as window:
+            now = self._ledger.clock()
+            if retry_after is not None:
+                window.blocked_until = max(window.blocked_until, now + retry_after)
+            if seen is None:
+                return
+
+            window.prune(now, self._reset_period)
+            # Only requests that have actually been made can be compared with the server; leave reservations alone.
+            past = [e for e in window.entries if e[0] <= now]
+            if seen > len(past):
+                window.entries.extend([now, None] for _ in range(seen - len(past)))
+                window.entries.sort(key=lambda e: e[0])
+
+    def reset(self) -> None:
+        """
+        Forget every request made so far.
+        """
+        with self._ledger.transaction() as window:
+            window.entries = []
+            window.blocked_until = 0.0
+            window.waiters = {}
+
+    def limit(self, func: Callable) -> Callable:
+        """
+        Decorate another function so that it draws from this bucket's budget instead of getting its own.
+        Coroutine functions (and async generators) are supported, which is how AsyncClient shares accounting with
+        Client.
+
+        :param func: Function or coroutine function to ratelimit
+        :return: Wrapped function
+        """
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if self.pacing:
+                    await self.acquire_async()
+                else:
+                    await self._reserve_async(block=False)
+                async for item in func(*args, **kwargs):
+                    yield item
+
+        elif inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if self.pacing:
+                    await self.acquire_async()
+                else:
+                    await self._reserve_async(block=False)
+                return await func(*args, **kwargs)
 
-    @property
-    def reset_time(self) -> Optional[int]:
-        if self._reset_time == 0:
-            return None
         else:
-            return self._reset_time
 
-    @reset_time.setter
-    def reset_time(self, value: int) -> None:
-        self._reset_time = value
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.pacing:
+                    self.acquire()
+                else:
+                    self.check()
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    @property
+    def ledger(self) -> LocalLedger | SharedLedger:
+        return self._ledger
+
+    @ledger.setter
+    def ledger(self, value: LocalLedger | SharedLedger) -> None:
+        self._ledger = value
+
+    @property
+    def pacing(self) -> bool:
+        return self._pacing
+
+    @pacing.setter
+    def pacing(self, value: bool) -> None:
+        self._pacing = value
+
+    @property
+    def interval(self) -> float:
+        """
+        Spacing between requests in pacing mode.
+        """
+        return self._reset_period / self._max_requests
+
+    @property
+    def reset_time(self) -> Optional[int]:
+        """
+        Unix time at which the oldest request in the window expires, or None if the window is empty.
+        """
+        with self._ledger.transaction() as window:
+            now = self._ledger.clock()
+            window.prune(now, self._reset_period)
+            if not window.entries:
+                return None
+            return int(time.time() + window.entries[0][0] + self._reset_period - now)
 
     @property
     def last_call_made(self) -> Optional[int]:
@@ -56,6 +398,101 @@ class NSLeakyBucket:
     def max_requests(self) -> int:
         return self._max_requests
 
+    @property
+    def reset_period(self) -> float:
+        return self._reset_period
+
     @property
     def requests_made(self) -> int:
-        return self._requests_made
+        with self._ledger.transaction() as window:
+            window.prune(self._ledger.clock(), self._reset_period)
+            return len(window.entries)
+
+
+class TelegramBucket:
+    """
+    Telegram ratelimiting, kept separate from NSLeakyBucket so that waiting for a telegram slot never holds up
+    ordinary API requests.
+
+    NationStates allows each API client key one telegram every 30 seconds, and one recruitment telegram every 180
+    seconds. Each key gets two lanes: a general lane that every telegram occupies for 30 seconds, and a recruitment
+    lane that recruitment telegrams additionally occupy for 180 seconds. A telegram is admitted at the earliest instant
+    every lane it needs is free.
+    """
+
+    def __init__(self, telegram_period: float = 30, recruitment_period: float = 180):
+        self._telegram_period = telegram_period
+        self._recruitment_period = recruitment_period
+        # (client key, recruitment) -> monotonic time at which the lane is next free
+        self._lanes: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def _next_slot(self, key: str, recruitment: bool, now: float) -> float:
+        slot = max(now, self._lanes.get((key, False), 0.0))
+        if recruitment:
+            slot = max(slot, self._lanes.get((key, True), 0.0))
+        return slot
+
+    def _reserve(self, key: str, recruitment: bool, block: bool) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = self._next_slot(key, recruitment, now)
+            if slot > now and not block:
+                if recruitment:
+                    raise RecruitmentLimitExceeded(slot - now)
+                raise TelegramLimitExceeded(slot - now)
+            self._lanes[(key, False)] = slot + self._telegram_period
+            if recruitment:
+                self._lanes[(key, True)] = slot + self._recruitment_period
+            return slot - now
+
+    def check(self, key: str, recruitment: bool) -> None:
+        """
+        Count a telegram against the lanes for key, raising if it can't be sent yet.
+
+        :param key: API client key the telegram is sent with
+        :param recruitment: True if this is a recruitment telegram
+        :raises RecruitmentLimitExceeded: Recruitment lane busy, carries the seconds to wait
+        :raises TelegramLimitExceeded: Telegram lane busy, carries the seconds to wait
+        """
+        self._reserve(key, recruitment, block=False)
+
+    def acquire(self, key: str, recruitment: bool, block: bool = True) -> float:
+        """
+        Count a telegram against the lanes for key, blocking until it can be sent.
+
+        :param key: API client key the telegram is sent with
+        :param recruitment: True if this is a recruitment telegram
+        :param block: If False, raise instead of waiting (see check())
+        :return: Seconds spent waiting
+        """
+        delay = self._reserve(key, recruitment, block)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, key: str, recruitment: bool) -> float:
+        """
+        Same as acquire(), but awaits the slot instead of blocking the thread.
+
+        :return: Seconds spent waiting
+        """
+        delay = self._reserve(key, recruitment, block=True)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def delay(self, key: str, recruitment: bool) -> float:
+        """
+        Seconds until a telegram could be sent with key, without counting one.
+        """
+        with self._lock:
+            now = time.monotonic()
+            return self._next_slot(key, recruitment, now) - now
+
+    def reset(self) -> None:
+        """
+        Free every lane.
+        """
+        with self._lock:
+            self._lanes.clear()
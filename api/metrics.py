@@ -0,0 +1,265 @@
+import bisect
+import contextvars
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# In-process metrics for how HYPR spends its API budget: requests and latency per endpoint, bytes, parse time,
+# ratelimit headroom and throttling, and errors by status. Metrics are plain counters behind a lock, cheap enough to
+# update on every request. REGISTRY.render() formats them in the Prometheus text format, and serve() exposes that on a
+# local HTTP port for Prometheus (or curl) to scrape.
+
+# Name of the campaign whose search is running, so requests can be attributed to it. Set by Campaign.update_deque().
+current_campaign: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_campaign", default=""
+)
+
+# Seconds; NS usually answers in well under a second, but happenings pages can take a while
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Seconds spent waiting for the ratelimit
+WAIT_BUCKETS = (0.01, 0.1, 0.5, 1, 2, 5, 10, 30)
+# Seconds spent parsing a response
+PARSE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {v}" for k, v in values]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ):
+        """
+        :param callback: If set, called at render time for the (unlabelled) value instead of using set()
+        """
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def value(self, *label_values: str) -> float:
+        if self.callback is not None:
+            return self.callback()
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> List[str]:
+        if self.callback is not None:
+            return [f"{self.name} {self.callback()}"]
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {v}" for k, v in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                ]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def count(self, *label_values: str) -> int:
+        entry = self._values.get(label_values)
+        return sum(entry[0]) if entry is not None else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(k, list(v[0]), v[1]) for k, v in self._values.items()]
+        lines = []
+        for k, counts, total in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _labels(self.labels, k, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, k)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, k)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            # Registering the same name twice hands back the first one, so modules can be reloaded safely
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, callback))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Instrumentation used by Client and NSLeakyBucket
+REQUESTS = REGISTRY.counter(
+    "hypr_api_requests_total",
+    "Requests sent to the NS API.",
+    ("endpoint", "campaign", "status"),
+)
+LATENCY = REGISTRY.histogram(
+    "hypr_api_request_seconds", "Round trip time of API requests.", ("endpoint",)
+)
+BYTES = REGISTRY.counter(
+    "hypr_api_response_bytes_total", "Bytes received from the NS API.", ("endpoint",)
+)
+PARSE = REGISTRY.histogram(
+    "hypr_api_parse_seconds",
+    "Time spent parsing API responses.",
+    ("endpoint",),
+    PARSE_BUCKETS,
+)
+ERRORS = REGISTRY.counter(
+    "hypr_api_errors_total", "Failed API requests.", ("endpoint", "status")
+)
+RATELIMIT_WAIT = REGISTRY.histogram(
+    "hypr_ratelimit_wait_seconds",
+    "Time requests waited for a ratelimit slot.",
+    buckets=WAIT_BUCKETS,
+)
+THROTTLED = REGISTRY.counter(
+    "hypr_ratelimit_throttled_total",
+    "Requests refused by the ratelimiter (TooManyRequests).",
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(
+    port: int = 9108, host: str = "127.0.0.1", registry: Registry = REGISTRY
+) -> ThreadingHTTPServer:
+    """
+    Serves registry in the Prometheus text format on a background thread. Any path works, /metrics by convention.
+
+    :param port: Port to listen on, 0 for any free one
+    :param host: Address to listen on. Defaults to local connections only.
+    :param registry: Registry to expose
+    :return: The server; call shutdown() on it to stop
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
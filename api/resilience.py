@@ -0,0 +1,220 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+from exceptions import (
+    CircuitOpen,
+    CloudflareError,
+    GatewayTimeout,
+    ServerError,
+    ServiceUnavailable,
+)
+
+# When NS is having a bad day, every request fails for a while. Hammering it with retries just burns ratelimit budget
+# on errors (and doesn't help NS recover), while giving up on the first 503 throws away requests that would have
+# worked a second later. Resilience retries transient failures a few times with growing, jittered delays, and if an
+# endpoint keeps failing, opens a circuit breaker that fails requests to it straight away until it has had a chance
+# to recover.
+
+T = TypeVar("T")
+
+# Failures worth trying again. requests' connection errors and timeouts are OSErrors.
+RETRYABLE = (ServerError, ServiceUnavailable, GatewayTimeout, CloudflareError, OSError)
+
+
+def endpoint(params: dict) -> str:
+    """
+    Names the endpoint a request goes to, e.g. "world/happenings" or "a/sendtg", for keying circuit breakers.
+    """
+    if "a" in params:
+        return f"a/{str(params['a']).lower()}"
+    for entity in ("nation", "region", "wa"):
+        if entity in params:
+            break
+    else:
+        entity = "world"
+    return f"{entity}/{str(params.get('q', '')).lower()}"
+
+
+class CircuitBreaker:
+    """
+    Closed: requests go through, and consecutive failures are counted. Open: after threshold failures in a row,
+    requests fail with CircuitOpen until reset_timeout has passed. Half-open: one trial request is let through; if it
+    succeeds the breaker closes, if it fails the breaker opens again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name: str, threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def check(self) -> None:
+        """
+        Raises CircuitOpen if a request shouldn't be sent right now.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            remaining = self._opened_at + self.reset_timeout - now
+            if self._state == self.OPEN and remaining <= 0:
+                self._state = self.HALF_OPEN
+                self._trial = False
+            if self._state == self.HALF_OPEN and not self._trial:
+                # Let exactly one request through to see whether the endpoint has recovered
+                self._trial = True
+                return
+            raise CircuitOpen(self.name, max(remaining, 0.0))
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def release(self) -> None:
+        """
+        Gives up a half-open trial without recording a result, so another request can be the trial.
+        """
+        with self._lock:
+            self._trial = False
+
+    def reset(self) -> None:
+        self.success()
+
+
+class Resilience:
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        threshold: int = 5,
+        reset_timeout: float = 60.0,
+    ):
+        """
+        Retry and circuit breaker policy for API requests.
+
+        Every attempt is a full request, so retries count against the ratelimit like any other request, and a retry
+        never goes out sooner than the bucket allows. Actions (sendTG and friends) are not retried, since a request
+        that failed on our end may still have gone through on NS's.
+
+        :param attempts: Most times to try a request, including the first
+        :param base_delay: Seconds to wait before the first retry. Each retry waits up to twice as long as the last.
+        :param max_delay: Most seconds to wait between retries
+        :param threshold: Consecutive failures after which an endpoint's circuit opens
+        :param reset_timeout: Seconds an open circuit waits before letting a trial request through
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(
+                    name, self.threshold, self.reset_timeout
+                )
+            return self._breakers[name]
+
+    @property
+    def breakers(self) -> Dict[str, CircuitBreaker]:
+        return dict(self._breakers)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Seconds to wait before retry number attempt (0-based): exponential, capped, with full jitter so clients that
+        failed together don't all retry together.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def call(
+        self,
+        name: str,
+        func: Callable[[], T],
+        retry: bool = True,
+        wait: Callable[[], float] = lambda: 0.0,
+    ) -> T:
+        """
+        Calls func through the named endpoint's circuit breaker, retrying transient failures.
+
+        :param name: Endpoint name, see endpoint()
+        :param func: Makes the request
+        :param retry: If False, only try once
+        :param wait: Returns the minimum number of seconds before the next attempt may be made (e.g. the limiter's
+            delay), so retries don't run into the ratelimit
+        :raises CircuitOpen: The endpoint has been failing and is being left alone for now
+        :return: Whatever func returns
+        """
+        breaker = self.breaker(name)
+        attempts = self.attempts if retry else 1
+        for attempt in range(attempts):
+            breaker.check()
+            try:
+                result = func()
+            except RETRYABLE:
+                breaker.failure()
+                if attempt == attempts - 1 or breaker.state == CircuitBreaker.OPEN:
+                    raise
+                time.sleep(max(self.backoff(attempt), wait()))
+                continue
+            except BaseException:
+                # Not the endpoint's fault (a 403, our own ratelimit...), so it says nothing about its health
+                breaker.release()
+                raise
+            breaker.success()
+            return result
+
+    async def call_async(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[T]],
+        retry: bool = True,
+        wait: Callable[[], float] = lambda: 0.0,
+    ) -> T:
+        """
+        Same as call(), for coroutines.
+        """
+        breaker = self.breaker(name)
+        attempts = self.attempts if retry else 1
+        for attempt in range(attempts):
+            breaker.check()
+            try:
+                result = await func()
+            except RETRYABLE:
+                breaker.failure()
+                if attempt == attempts - 1 or breaker.state == CircuitBreaker.OPEN:
+                    raise
+                await asyncio.sleep(max(self.backoff(attempt), wait()))
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.success()
+            return result
@@ -0,0 +1,340 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from xml.etree.ElementTree import Element
+
+# Parsed API responses. ns_request used to turn every response into a dict of strings up front, whether the caller
+# wanted one field or all of them, and flattened anything nested more than one level deep. The classes here keep the
+# parsed XML and only turn a field into Python values the first time it's read, with typed properties for the fields
+# HYPR actually uses. They can still be subscripted with the keys the old dicts had (response["NATIONS"],
+# event["text"]...), returning the same values as before, so existing callers keep working.
+
+
+def element_value(element: Element) -> Any:
+    """
+    Converts an element to Python values, however deeply it's nested.
+
+    A leaf becomes its text. An element with children becomes a dict of their values (plus its attributes), and
+    children with the same tag (e.g. the SCALEs in CENSUS) become a list under that tag.
+    """
+    if len(element) == 0 and not element.attrib:
+        return element.text
+    value = dict(element.attrib)
+    for child in element:
+        v = element_value(child)
+        if child.tag in value:
+            if not isinstance(value[child.tag], list):
+                value[child.tag] = [value[child.tag]]
+            value[child.tag].append(v)
+        else:
+            value[child.tag] = v
+    if len(element) == 0:
+        # attributes only
+        value["text"] = element.text
+    return value
+
+
+# Tags nation and region shards come back under, where it isn't just the shard name in capitals
+SHARD_TAGS = {
+    "wa": "UNSTATUS",
+}
+
+
+def shard_tag(shard: str) -> str:
+    """
+    Tag a nation or region shard is returned under, e.g. "wa" -> "UNSTATUS".
+    """
+    shard = shard.lower()
+    return SHARD_TAGS.get(shard, shard.upper())
+
+
+class Result:
+    """
+    Base class for parsed responses. Subclasses list their dict-style keys in keys() and look them up in _item().
+    """
+
+    __slots__ = ()
+
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+
+    def _item(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.keys():
+            raise KeyError(key)
+        return self._item(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._item(key) if key in self.keys() else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def items(self) -> List[tuple]:
+        return [(key, self._item(key)) for key in self.keys()]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(self.keys())})"
+
+
+class Shards(Result):
+    """
+    Nation or region response: one child tag per shard. Each tag is converted on first access and remembered.
+    """
+
+    __slots__ = ("_root", "_fields", "ratelimit")
+
+    def __init__(self, root: Element, ratelimit: Optional[str] = None):
+        self._root = root
+        self._fields: Dict[str, Any] = {}
+        self.ratelimit = ratelimit
+
+    def keys(self) -> List[str]:
+        return [child.tag for child in self._root]
+
+    def __contains__(self, key: str) -> bool:
+        return self._root.find(key) is not None
+
+    def _item(self, key: str) -> Any:
+        if key not in self._fields:
+            element = self._root.find(key)
+            if element is None:
+                raise KeyError(key)
+            self._fields[key] = element_value(element)
+        return self._fields[key]
+
+    def __getitem__(self, key: str) -> Any:
+        return self._item(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self._item(key)
+        except KeyError:
+            return default
+
+    def _text(self, tag: str) -> Optional[str]:
+        element = self._root.find(tag)
+        return element.text if element is not None else None
+
+    def _list(self, tag: str, separator: str) -> List[str]:
+        text = self._text(tag)
+        return text.split(separator) if text else []
+
+    def select(self, shards: Iterable[str]) -> "Shards":
+        """
+        A response of the same type holding only the tags of the given shards, sharing the parsed XML with this one.
+        """
+        tags = {shard_tag(shard) for shard in shards}
+        root = Element(self._root.tag, self._root.attrib)
+        root.extend(child for child in self._root if child.tag in tags)
+        return type(self)(root, self.ratelimit)
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._text("NAME")
+
+
+class Nation(Shards):
+    __slots__ = ()
+
+    @property
+    def region(self) -> Optional[str]:
+        return self._text("REGION")
+
+    @property
+    def endorsements(self) -> List[str]:
+        return self._list("ENDORSEMENTS", ",")
+
+    @property
+    def population(self) -> Optional[int]:
+        text = self._text("POPULATION")
+        return int(text) if text is not None else None
+
+    @property
+    def wa_member(self) -> Optional[bool]:
+        text = self._text("UNSTATUS")
+        return text != "Non-member" if text is not None else None
+
+    @property
+    def tgcanrecruit(self) -> Optional[bool]:
+        text = self._text("TGCANRECRUIT")
+        return text == "1" if text is not None else None
+
+
+class Region(Shards):
+    __slots__ = ()
+
+    @property
+    def nations(self) -> List[str]:
+        return self._list("NATIONS", ":")
+
+    @property
+    def numnations(self) -> Optional[int]:
+        text = self._text("NUMNATIONS")
+        return int(text) if text is not None else None
+
+    @property
+    def delegate(self) -> Optional[str]:
+        return self._text("DELEGATE")
+
+
+class Happening(Result):
+    """
+    One happenings event. event["event_id"] and event["timestamp"] are strings, as they always were; event.event_id
+    and event.timestamp are ints.
+    """
+
+    __slots__ = ("_element",)
+
+    _keys = ["event_id", "timestamp", "text"]
+
+    def __init__(self, element: Element):
+        self._element = element
+
+    def keys(self) -> List[str]:
+        return self._keys
+
+    def _item(self, key: str) -> Any:
+        if key == "event_id":
+            return self._element.attrib["id"]
+        if key == "timestamp":
+            return self._element.findtext("TIMESTAMP")
+        return self._element.findtext("TEXT")
+
+    @property
+    def event_id(self) -> int:
+        return int(self._element.attrib["id"])
+
+    @property
+    def timestamp(self) -> int:
+        return int(self._element.findtext("TIMESTAMP"))
+
+    @property
+    def text(self) -> str:
+        return self._element.findtext("TEXT")
+
+    def __repr__(self) -> str:
+        return f"Happening({self._element.attrib['id']})"
+
+
+class Happenings:
+    """
+    The happenings shard, a read-only list of Happening. Events are only wrapped when they're read.
+    """
+
+    __slots__ = ("_events", "_wrapped", "ratelimit")
+
+    def __init__(self, root: Element, ratelimit: Optional[str] = None):
+        happenings = root.find("HAPPENINGS")
+        self._events = list(happenings) if happenings is not None else []
+        self._wrapped: List[Optional[Happening]] = [None] * len(self._events)
+        self.ratelimit = ratelimit
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        event = self._wrapped[index]
+        if event is None:
+            event = self._wrapped[index] = Happening(self._events[index])
+        return event
+
+    def __iter__(self) -> Iterator[Happening]:
+        for i in range(len(self._events)):
+            yield self[i]
+
+    def __reversed__(self) -> Iterator[Happening]:
+        for i in reversed(range(len(self._events))):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"Happenings({len(self)} events)"
+
+
+class NameList(Result):
+    """
+    A shard that's a single separated list of nation names (newnations, WA members, WA delegates). Subscript with the
+    shard name to get the list, as before; it's only split on first access.
+    """
+
+    __slots__ = ("_key", "_text", "_separator", "_names", "ratelimit")
+
+    def __init__(
+        self, key: str, text: Optional[str], separator: str, ratelimit: Optional[str]
+    ):
+        self._key = key
+        self._text = text
+        self._separator = separator
+        self._names: Optional[List[str]] = None
+        self.ratelimit = ratelimit
+
+    def keys(self) -> List[str]:
+        return [self._key, "ratelimit"]
+
+    def _item(self, key: str) -> Any:
+        if key == "ratelimit":
+            return self.ratelimit
+        return self.names
+
+    @property
+    def names(self) -> List[str]:
+        if self._names is None:
+            self._names = self._text.split(self._separator) if self._text else []
+        return self._names
+
+
+class TelegramQueue(Result):
+    __slots__ = ("_root", "ratelimit")
+
+    _keys = ["manual", "stamps", "api", "ratelimit"]
+
+    def __init__(self, root: Element, ratelimit: Optional[str] = None):
+        self._root = root
+        self.ratelimit = ratelimit
+
+    def keys(self) -> List[str]:
+        return self._keys
+
+    def _item(self, key: str) -> Any:
+        if key == "ratelimit":
+            return self.ratelimit
+        return getattr(self, key)
+
+    @property
+    def manual(self) -> int:
+        return int(self._root.findtext(".//MANUAL"))
+
+    @property
+    def stamps(self) -> int:
+        return int(self._root.findtext(".//MASS"))
+
+    @property
+    def api(self) -> int:
+        return int(self._root.findtext(".//API"))
+
+
+def _name_list(tag: str, key: str, separator: str = ",") -> Callable:
+    return lambda root, ratelimit: NameList(
+        key, root.findtext(tag), separator, ratelimit
+    )
+
+
+# World and World Assembly shards, and how to parse each of them
+SHARD_PARSERS: Dict[str, Callable[[Element, Optional[str]], Any]] = {
+    "happenings": Happenings,
+    "newnations": _name_list("NEWNATIONS", "newnations"),
+    "tgq": TelegramQueue,
+    "delegates": _name_list("DELEGATES", "delegates"),
+    "members": _name_list("MEMBERS", "members"),
+}
@@ -0,0 +1,161 @@
+import json
+import random
+import threading
+from typing import Iterable, Iterator, List, Optional
+from api.transport import PooledTransport, Transport
+from exceptions import APIException
+
+# NS pushes happenings as they happen over server-sent events, at /api/<bucket>+<bucket>... where a bucket is a kind of
+# event (move, eject, founding, member, endo...) or region:<name>. This is a separate service from the API proper and
+# doesn't count against the API ratelimit, so a campaign fed from it costs nothing to keep up to date and hears about
+# events seconds after they happen instead of whenever its next poll comes round.
+
+SSE_BASE_URL = "https://www.nationstates.net/api/"
+
+
+class SSEDecoder:
+    """
+    Incremental text/event-stream parser. Feed it bytes as they arrive, get back (id, data) for each complete message.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._data: List[str] = []
+        self._id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> Iterator[tuple]:
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r").decode("utf-8", errors="replace")
+            if not line:
+                # A blank line ends the message
+                if self._data:
+                    yield self._id, "\n".join(self._data)
+                self._data = []
+                continue
+            if line.startswith(":"):
+                # keep-alive comment
+                continue
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "data":
+                self._data.append(value)
+            elif field == "id":
+                self._id = value
+
+
+class EventSource:
+    def __init__(
+        self,
+        useragent: str,
+        buckets: Iterable[str],
+        transport: Optional[Transport] = None,
+        base_url: str = SSE_BASE_URL,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Consumes the NS happenings event stream, reconnecting whenever it drops.
+
+        events() yields happenings in the same shape Client.ns_request returns them ({"event_id", "timestamp",
+        "text"}), so anything that handles polled happenings can handle pushed ones. After a dropped connection it
+        waits (backoff, doubling up to max_backoff, with jitter) and reconnects with Last-Event-ID set, so the server
+        can resume from the last event it delivered.
+
+        :param useragent: An identifying string for the client
+        :param buckets: Event buckets to subscribe to, e.g. ["move", "region:the_pacific"]
+        :param transport: Transport to connect with, defaults to a PooledTransport with a long read timeout
+        :param base_url: Url of the event stream, the buckets are appended to it
+        :param backoff: Seconds to wait before the first reconnect
+        :param max_backoff: Most seconds to wait between reconnects
+        """
+        self.headers = {"User-Agent": useragent, "Accept": "text/event-stream"}
+        self.buckets = list(buckets)
+        self.transport = (
+            transport if transport is not None else PooledTransport(read_timeout=90)
+        )
+        self.base_url = base_url
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.last_event_id: Optional[str] = None
+        self.reconnects = 0
+        self._stop = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return self.base_url + "+".join(self.buckets)
+
+    def stop(self) -> None:
+        """
+        Makes events() return after the current message, or straight away if it's waiting to reconnect.
+        """
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    @staticmethod
+    def parse(event_id: Optional[str], data: str) -> Optional[dict]:
+        """
+        Turns an event stream message into a happenings dict. Returns None for anything that isn't a happening.
+        """
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict) or "str" not in payload:
+            return None
+        return {
+            "event_id": str(payload.get("id", event_id)),
+            "timestamp": str(payload.get("time", 0)),
+            "text": payload["str"],
+        }
+
+    def _connect(self) -> Iterator[dict]:
+        headers = dict(self.headers)
+        if self.last_event_id is not None:
+            headers["Last-Event-ID"] = self.last_event_id
+        # The stream is sent chunked, and each chunk is handed over as soon as it arrives, however small
+        r = self.transport.stream(self.url, {}, headers, chunk_size=1024)
+        try:
+            if not r.ok:
+                raise APIException(str(r.status_code))
+            decoder = SSEDecoder()
+            for chunk in r.iter_content():
+                for event_id, data in decoder.feed(chunk):
+                    if event_id is not None:
+                        self.last_event_id = event_id
+                    event = self.parse(event_id, data)
+                    if event is not None:
+                        self.last_event_id = event["event_id"]
+                        yield event
+                if self._stop.is_set():
+                    return
+        finally:
+            r.close()
+
+    def events(self) -> Iterator[dict]:
+        """
+        Yields happenings as they are pushed, until stop() is called.
+
+        :return: Iterator of happenings dicts
+        """
+        delay = self.backoff
+        while not self._stop.is_set():
+            try:
+                for event in self._connect():
+                    # The connection is healthy again
+                    delay = self.backoff
+                    yield event
+                    if self._stop.is_set():
+                        return
+            except (OSError, APIException):
+                # requests' connection errors are OSErrors too
+                pass
+            if self._stop.is_set():
+                return
+            self.reconnects += 1
+            self._stop.wait(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.max_backoff)
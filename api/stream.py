@@ -0,0 +1,93 @@
+from typing import List, Optional
+from xml.parsers import expat
+
+# Incremental parsing of API responses. Instead of waiting for the whole body, building a string out of it and then a
+# tree out of the string, StreamParser is fed the body a chunk at a time and hands back whatever it has finished
+# parsing so far. Memory use stays flat no matter how big the shard is, and the first targets are available as soon
+# as their bytes arrive.
+
+# Shards that are a single tag holding a separated list of nation names, and the separator they use
+NAME_LISTS = {
+    "NEWNATIONS": ",",
+    "NATIONS": ":",
+    "MEMBERS": ",",
+    "DELEGATES": ",",
+    "ENDORSEMENTS": ",",
+}
+
+
+class StreamParser:
+    """
+    Push parser for NS API responses.
+
+    Happenings events come out as the same {"event_id", "timestamp", "text"} dicts ns_request returns, and the name
+    lists in NAME_LISTS come out one nation name at a time. Name lists are split as the text arrives, so even a
+    region with tens of thousands of residents never sits in memory as one string.
+    """
+
+    def __init__(self):
+        self._parser = expat.ParserCreate()
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._data
+
+        self._items: list = []
+        # Happening currently being built, and which of its fields we're inside
+        self._event: Optional[dict] = None
+        self._field: Optional[str] = None
+        self._text: List[str] = []
+        # Separator of the name list we're inside, and the name that's been cut off at the end of the last chunk
+        self._separator: Optional[str] = None
+        self._partial = ""
+
+    def feed(self, data: bytes) -> list:
+        """
+        Parse the next chunk of the body.
+
+        :param data: Next chunk of the response body
+        :return: Items completed by this chunk
+        """
+        self._parser.Parse(data, False)
+        items, self._items = self._items, []
+        return items
+
+    def close(self) -> list:
+        """
+        Signal the end of the body.
+
+        :return: Any items completed by the end of the body
+        """
+        self._parser.Parse(b"", True)
+        items, self._items = self._items, []
+        return items
+
+    def _start(self, tag: str, attrs: dict) -> None:
+        if tag == "EVENT":
+            self._event = {"event_id": attrs.get("id")}
+        elif self._event is not None and tag in ("TIMESTAMP", "TEXT"):
+            self._field = tag
+            self._text = []
+        elif tag in NAME_LISTS:
+            self._separator = NAME_LISTS[tag]
+            self._partial = ""
+
+    def _data(self, data: str) -> None:
+        if self._field is not None:
+            self._text.append(data)
+        elif self._separator is not None:
+            names = (self._partial + data).split(self._separator)
+            self._partial = names.pop()
+            self._items.extend(name for name in names if name)
+
+    def _end(self, tag: str) -> None:
+        if tag == self._field:
+            self._event[tag.lower()] = "".join(self._text)
+            self._field = None
+        elif tag == "EVENT" and self._event is not None:
+            self._items.append(self._event)
+            self._event = None
+        elif tag in NAME_LISTS and self._separator is not None:
+            if self._partial:
+                self._items.append(self._partial)
+            self._separator = None
+            self._partial = ""
@@ -0,0 +1,63 @@
+import time
+from unittest import TestCase
+
+from api.cache import ResponseCache
+from api.wrapper import Client
+from testing import StubTransport
+
+HAPPENINGS = (
+    b'<WORLD><HAPPENINGS><EVENT id="1"><TIMESTAMP>1660000000</TIMESTAMP>'
+    b"<TEXT><![CDATA[@@testlandia@@ was ejected from %%the_pacific%% by @@maxtopia@@.]]></TEXT>"
+    b"</EVENT></HAPPENINGS></WORLD>"
+)
+
+
+class TestResponseCache(TestCase):
+    def test_params_are_normalised(self):
+        cache = ResponseCache()
+        cache.store({"q": "happenings", "view": "region.The Pacific"}, ["event"])
+
+        hit, response = cache.lookup({"view": "region.the_pacific", "q": "happenings"})
+        self.assertTrue(hit)
+        self.assertEqual(response, ["event"])
+        self.assertEqual(cache.stats["hits"], 1)
+
+    def test_ttl(self):
+        cache = ResponseCache(ttls={"happenings": 0.1})
+        cache.store({"q": "happenings"}, [])
+        self.assertTrue(cache.lookup({"q": "happenings"})[0])
+
+        time.sleep(0.11)
+        self.assertFalse(cache.lookup({"q": "happenings"})[0])
+        self.assertEqual(cache.misses, 1)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(maxsize=2)
+        cache.store({"nation": "a", "q": "endorsements"}, {})
+        cache.store({"nation": "b", "q": "endorsements"}, {})
+        cache.lookup({"nation": "a", "q": "endorsements"})
+        cache.store({"nation": "c", "q": "endorsements"}, {})
+
+        self.assertTrue(cache.lookup({"nation": "a", "q": "endorsements"})[0])
+        self.assertFalse(cache.lookup({"nation": "b", "q": "endorsements"})[0])
+        self.assertEqual(cache.evictions, 1)
+
+    def test_actions_and_errors_not_cached(self):
+        cache = ResponseCache()
+        cache.store({"a": "verify", "nation": "a"}, {"verified": True})
+        cache.store({"q": "newnations"}, {"error": "500"})
+
+        self.assertEqual(len(cache), 0)
+
+    def test_client_uses_cache(self):
+        Client.request.reset()
+        transport = StubTransport(HAPPENINGS)
+        client = Client("HYPR Unit Tests", transport, ResponseCache())
+        params = {"q": "happenings", "filter": "eject", "view": "region.the_pacific"}
+
+        first = client.ns_request(params)
+        second = client.ns_request(dict(params))
+
+        self.assertEqual(first, second)
+        self.assertEqual(transport.calls, 1)
+        self.assertEqual(Client.request.requests_made, 1)
@@ -0,0 +1,121 @@
+import gzip
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+import api
+from api.cassette import (
+    Cassette,
+    CassetteMiss,
+    Interaction,
+    RecordingTransport,
+    ReplayTransport,
+)
+from testing import FoundingTransport
+
+
+class TestCassette(TestCase):
+    def setUp(self):
+        api.Client.request.reset()
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl.gz")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def record(self, requests: int = 2) -> FoundingTransport:
+        live = FoundingTransport()
+        recorder = RecordingTransport(live, self.path)
+        client = api.Client("HYPR Unit Tests", transport=recorder)
+        for _ in range(requests):
+            client.request({"q": "newnations"})
+        recorder.close()
+        api.Client.request.reset()
+        return live
+
+    def test_round_trip(self):
+        self.record()
+        cassette = Cassette.load(self.path)
+
+        self.assertEqual(len(cassette), 2)
+        first = cassette.interactions[0]
+        self.assertEqual(first.params, {"q": "newnations"})
+        self.assertEqual(first.headers["X-Ratelimit-Requests-Seen"], "1")
+        self.assertNotIn("Set-Cookie", first.headers)
+        self.assertAlmostEqual(first.elapsed, 0.2)
+
+    def test_replay_in_order(self):
+        self.record()
+        client = api.Client(
+            "HYPR Unit Tests", transport=ReplayTransport(self.path, speed=None)
+        )
+        names = [client.request({"q": "newnations"})["newnations"] for _ in range(3)]
+
+        # Recorded responses in order, then the last one again
+        self.assertEqual(names, [["nation_1"], ["nation_2"], ["nation_2"]])
+
+    def test_no_repeat(self):
+        self.record(1)
+        replay = ReplayTransport(self.path, speed=None, repeat=False)
+        replay.get("", {"q": "newnations"}, {})
+
+        with self.assertRaises(CassetteMiss):
+            replay.get("", {"q": "newnations"}, {})
+        with self.assertRaises(CassetteMiss):
+            replay.get("", {"q": "happenings"}, {})
+
+    def test_speed(self):
+        self.record(1)
+        replay = ReplayTransport(self.path, speed=4)
+        start = time.perf_counter()
+        r = replay.get("", {"q": "newnations"}, {})
+
+        self.assertAlmostEqual(r.elapsed, 0.05)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_offsets(self):
+        interactions = [
+            Interaction({"q": "newnations"}, 200, {}, b"<WORLD/>", 0.0, offset)
+            for offset in (5.0, 5.4)
+        ]
+        replay = ReplayTransport(Cassette(interactions), speed=2)
+        start = time.perf_counter()
+        replay.get("", {"q": "newnations"}, {})
+        # The first request starts the clock, the second waits out the recorded gap
+        self.assertLess(time.perf_counter() - start, 0.1)
+        r = replay.get("", {"q": "newnations"}, {})
+
+        self.assertEqual(r.elapsed, 0.0)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+    def test_secrets_redacted(self):
+        recorder = RecordingTransport(FoundingTransport(), self.path)
+        client = api.Client("HYPR Unit Tests", transport=recorder)
+        client.key = "client_key"
+        client.send_telegram(1, "secret_key", "testlandia", False, block=False)
+        recorder.close()
+
+        with gzip.open(self.path, "rt") as f:
+            text = f.read()
+        self.assertNotIn("client_key", text)
+        self.assertNotIn("secret_key", text)
+
+        # Replay matches regardless of which keys are used
+        replay = ReplayTransport(self.path, speed=None)
+        params = client.telegram_params(1, "another_key", "testlandia")
+        self.assertEqual(replay.get("", params, {}).status_code, 200)
+
+    def test_stream(self):
+        live = FoundingTransport()
+        recorder = RecordingTransport(live, self.path)
+        client = api.Client("HYPR Unit Tests", transport=recorder)
+        self.assertEqual(list(client.ns_stream({"q": "newnations"})), ["nation_1"])
+        recorder.close()
+        api.Client.request.reset()
+
+        client = api.Client(
+            "HYPR Unit Tests", transport=ReplayTransport(self.path, speed=None)
+        )
+        names = list(client.ns_stream({"q": "newnations"}, chunk_size=5))
+        self.assertEqual(names, ["nation_1"])
@@ -0,0 +1,178 @@
+import threading
+import time
+from typing import List
+from unittest import TestCase
+
+from api.coalesce import Coalescer
+from api.responses import Nation
+from api.wrapper import Client
+from testing import StubTransport
+
+WORLD = (
+    b"<WORLD><NEWNATIONS>testlandia,maxtopia</NEWNATIONS>"
+    b'<HAPPENINGS><EVENT id="1"><TIMESTAMP>1660000000</TIMESTAMP>'
+    b"<TEXT><![CDATA[@@testlandia@@ was founded in %%the_pacific%%.]]></TEXT></EVENT></HAPPENINGS></WORLD>"
+)
+
+
+NATION = (
+    b'<NATION id="testlandia"><REGION>the_pacific</REGION><UNSTATUS>WA Member</UNSTATUS>'
+    b"<ENDORSEMENTS>maxtopia,sedgistan</ENDORSEMENTS></NATION>"
+)
+
+
+class TestCoalescer(TestCase):
+    def setUp(self):
+        Client.request.reset()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.transport = StubTransport(self.respond)
+        self.coalescer = Coalescer(Client("HYPR Unit Tests", self.transport), 0.1)
+
+    def tearDown(self):
+        self.release.set()
+
+    def respond(self, params: dict) -> bytes:
+        if params.get("nation") == "busy":
+            self.entered.set()
+            self.release.wait(5)
+        return NATION if "nation" in params else WORLD
+
+    def busy(self, coalescer: Coalescer | Client) -> threading.Thread:
+        # Batches only wait for company when there's some about, so keep another request in flight until release
+        thread = threading.Thread(
+            target=coalescer.ns_request, args=({"nation": "busy", "q": "region"},)
+        )
+        thread.start()
+        self.entered.wait(5)
+        return thread
+
+    def sent(self) -> List[dict]:
+        return [p for p in self.transport.requests if p.get("nation") != "busy"]
+
+    def test_merges_world_shards(self):
+        self.busy(self.coalescer)
+        results = {}
+
+        def fetch(shard):
+            results[shard] = self.coalescer.ns_request({"q": shard})
+
+        threads = [
+            threading.Thread(target=fetch, args=(s,))
+            for s in ("newnations", "happenings")
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.sent(), [{"q": "happenings+newnations"}])
+        self.assertEqual(
+            results["newnations"]["newnations"], ["testlandia", "maxtopia"]
+        )
+        self.assertEqual(results["happenings"][0]["event_id"], "1")
+
+    def test_different_params_not_merged(self):
+        self.busy(self.coalescer)
+        threads = [
+            threading.Thread(target=self.coalescer.ns_request, args=(p,))
+            for p in ({"q": "happenings"}, {"q": "happenings", "filter": "move"})
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.sent()), 2)
+
+    def test_splits_nation_shards(self):
+        self.busy(self.coalescer)
+        results = {}
+
+        def fetch(q):
+            results[q] = self.coalescer.ns_request({"nation": "testlandia", "q": q})
+
+        threads = [
+            threading.Thread(target=fetch, args=(q,))
+            for q in ("wa+region", "endorsements")
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.sent()), 1)
+        # Same type as an unmerged request, with only the caller's shards - including ones whose tag isn't the
+        # shard name, like wa -> UNSTATUS
+        merged = results["wa+region"]
+        self.assertIsInstance(merged, Nation)
+        self.assertEqual(sorted(merged.keys()), ["REGION", "UNSTATUS"])
+        self.assertTrue(merged.wa_member)
+        self.assertEqual(merged.region, "the_pacific")
+        self.assertIsInstance(results["endorsements"], Nation)
+        self.assertEqual(
+            results["endorsements"].endorsements, ["maxtopia", "sedgistan"]
+        )
+        self.assertNotIn("REGION", results["endorsements"])
+
+    def test_interrupted_leader_releases_followers(self):
+        class Interrupted(BaseException):
+            pass
+
+        def interrupt(params):
+            raise Interrupted()
+
+        self.busy(self.coalescer)
+        self.coalescer.send = interrupt
+        raised = []
+
+        def fetch(shard):
+            try:
+                self.coalescer.ns_request({"q": shard})
+            except BaseException as e:
+                raised.append(type(e))
+
+        threads = [
+            threading.Thread(target=fetch, args=(s,))
+            for s in ("newnations", "happenings")
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        # The leader sees the interruption, the follower an error instead of waiting forever
+        self.assertFalse(any(t.is_alive() for t in threads))
+        self.assertCountEqual(raised, [Interrupted, RuntimeError])
+
+    def test_lone_request_skips_window(self):
+        self.coalescer.window = 5
+        start = time.monotonic()
+        result = self.coalescer.ns_request({"q": "newnations"})
+
+        # Nobody else was making a request, so there was nothing to wait for
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(result["newnations"], ["testlandia", "maxtopia"])
+
+    def test_client_option(self):
+        client = Client("HYPR Unit Tests", self.transport, coalesce=0.1)
+        self.busy(client)
+        results = {}
+
+        def fetch(shard):
+            results[shard] = client.ns_request({"q": shard})
+
+        threads = [
+            threading.Thread(target=fetch, args=(s,))
+            for s in ("newnations", "happenings")
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.sent(), [{"q": "happenings+newnations"}])
+        self.assertEqual(
+            results["newnations"]["newnations"], ["testlandia", "maxtopia"]
+        )
+        self.assertEqual(results["happenings"][0]["event_id"], "1")
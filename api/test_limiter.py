@@ -0,0 +1,178 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from api.limiter import NSLeakyBucket, SharedLedger, TelegramBucket
+from exceptions import (
+    RecruitmentLimitExceeded,
+    TelegramLimitExceeded,
+    TooManyRequests,
+)
+
+
+def noop():
+    return time.monotonic()
+
+
+class TestNSLeakyBucket(TestCase):
+    def test_raises_when_full(self):
+        bucket = NSLeakyBucket(noop, max_requests=3, reset_period=0.3)
+        for _ in range(3):
+            bucket()
+
+        with self.assertRaises(TooManyRequests) as e:
+            bucket()
+        self.assertGreater(e.exception.args[0], 0)
+        self.assertLessEqual(e.exception.args[0], 0.3)
+
+    def test_window_slides(self):
+        bucket = NSLeakyBucket(noop, max_requests=2, reset_period=0.2)
+        bucket()
+        time.sleep(0.1)
+        bucket()
+        time.sleep(0.12)
+
+        # The first request has left the window, the second hasn't
+        self.assertEqual(bucket.requests_made, 1)
+        bucket()
+        with self.assertRaises(TooManyRequests):
+            bucket()
+
+    def test_pacing_spreads_requests(self):
+        bucket = NSLeakyBucket(noop, max_requests=5, reset_period=0.5)
+        bucket.pacing = True
+        calls = [bucket() for _ in range(6)]
+
+        gaps = [b - a for a, b in zip(calls, calls[1:])]
+        for gap in gaps:
+            self.assertGreaterEqual(gap, bucket.interval * 0.9)
+        # The sixth call had to wait for the first to leave the window
+        self.assertGreaterEqual(calls[5] - calls[0], 0.5 * 0.9)
+
+    def test_acquire_async(self):
+        bucket = NSLeakyBucket(noop, max_requests=4, reset_period=0.2)
+        bucket.pacing = True
+
+        async def run():
+            return await asyncio.gather(*[bucket.acquire_async() for _ in range(4)])
+
+        waits = sorted(asyncio.run(run()))
+        self.assertEqual(waits[0], 0)
+        self.assertAlmostEqual(waits[-1], 3 * bucket.interval, delta=0.02)
+
+    def test_sync_with_server(self):
+        bucket = NSLeakyBucket(noop, max_requests=3, reset_period=0.3)
+        bucket()
+
+        # Someone else on our IP has been using the API
+        bucket.sync(seen=3)
+        self.assertEqual(bucket.requests_made, 3)
+        with self.assertRaises(TooManyRequests):
+            bucket()
+
+        # The server counting fewer doesn't free anything up: the rest may still be in flight
+        bucket.sync(seen=1)
+        self.assertEqual(bucket.requests_made, 3)
+        with self.assertRaises(TooManyRequests):
+            bucket()
+
+    def test_retry_after(self):
+        bucket = NSLeakyBucket(noop, max_requests=3, reset_period=0.3)
+        bucket.sync(retry_after=0.2)
+
+        with self.assertRaises(TooManyRequests) as e:
+            bucket()
+        self.assertAlmostEqual(e.exception.args[0], 0.2, delta=0.02)
+
+
+class TestSharedLedger(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def bucket(self, owner: str) -> NSLeakyBucket:
+        bucket = NSLeakyBucket(noop, max_requests=4, reset_period=0.3)
+        bucket.ledger = SharedLedger(self.path, owner=owner)
+        return bucket
+
+    def test_budget_is_shared(self):
+        a, b = self.bucket("a"), self.bucket("b")
+        a()
+        a()
+        b()
+        b()
+
+        self.assertEqual(a.requests_made, 4)
+        with self.assertRaises(TooManyRequests):
+            a()
+        with self.assertRaises(TooManyRequests):
+            b()
+
+    def test_fair_share(self):
+        a, b = self.bucket("a"), self.bucket("b")
+        # An idle neighbour doesn't cap us
+        a()
+        a()
+        time.sleep(0.15)
+        a()
+        a()
+        with self.assertRaises(TooManyRequests):
+            b()
+
+        # Once b has had to wait, a is held to half the budget until b gets its turn
+        time.sleep(0.16)
+        with self.assertRaises(TooManyRequests):
+            a()
+        b()
+        b()
+
+    def test_async_waits_for_lock_off_the_loop(self):
+        bucket = self.bucket("a")
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            # Another process is in the middle of a transaction
+            with SharedLedger(self.path, owner="b").transaction():
+                locked.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        locked.wait()
+
+        async def run():
+            task = asyncio.ensure_future(bucket.acquire_async())
+            # The loop keeps running while the ledger is locked
+            await asyncio.sleep(0.05)
+            self.assertFalse(task.done())
+            release.set()
+            return await task
+
+        self.assertEqual(asyncio.run(run()), 0)
+        holder.join()
+        self.assertEqual(bucket.requests_made, 1)
+
+
+class TestTelegramBucket(TestCase):
+    def test_lanes(self):
+        bucket = TelegramBucket(telegram_period=0.1, recruitment_period=0.3)
+        bucket.check("key", recruitment=True)
+
+        with self.assertRaises(RecruitmentLimitExceeded):
+            bucket.check("key", recruitment=True)
+        with self.assertRaises(TelegramLimitExceeded):
+            bucket.check("key", recruitment=False)
+        # Lanes are per client key
+        bucket.check("other", recruitment=True)
+
+        # The recruitment lane is still busy after the telegram lane frees up
+        self.assertAlmostEqual(
+            bucket.acquire("key", recruitment=False), 0.1, delta=0.02
+        )
+        self.assertAlmostEqual(bucket.delay("key", recruitment=True), 0.2, delta=0.02)
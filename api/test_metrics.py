@@ -0,0 +1,66 @@
+import urllib.request
+from unittest import TestCase
+
+import api
+from api import metrics
+from testing import StubTransport
+
+
+class TestRegistry(TestCase):
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.counter("test_total", "A counter.", ("kind",))
+        counter.inc('a"b')
+        counter.inc('a"b', amount=2)
+        histogram = registry.histogram("test_seconds", "A histogram.", buckets=(1, 5))
+        histogram.observe(0.5)
+        histogram.observe(3)
+        registry.gauge("test_gauge", "A gauge.", callback=lambda: 7)
+
+        text = registry.render()
+        self.assertIn("# TYPE test_total counter", text)
+        self.assertIn('test_total{kind="a\\"b"} 3', text)
+        self.assertIn('test_seconds_bucket{le="1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("test_seconds_sum 3.5", text)
+        self.assertIn("test_gauge 7", text)
+
+    def test_serve(self):
+        registry = metrics.Registry()
+        registry.counter("test_total", "A counter.").inc()
+        server = metrics.serve(port=0, registry=registry)
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/metrics"
+            with urllib.request.urlopen(url) as r:
+                self.assertIn("test_total 1", r.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestClientMetrics(TestCase):
+    def setUp(self):
+        api.Client.request.reset()
+
+    def test_request_metrics(self):
+        client = api.Client("HYPR Unit Tests", transport=StubTransport(elapsed=0.2))
+        before = metrics.REQUESTS.value("world/newnations", "founders", "200")
+        latency = metrics.LATENCY.count("world/newnations")
+
+        token = metrics.current_campaign.set("founders")
+        try:
+            client.request({"q": "newnations"})
+        finally:
+            metrics.current_campaign.reset(token)
+
+        self.assertEqual(
+            metrics.REQUESTS.value("world/newnations", "founders", "200"), before + 1
+        )
+        self.assertEqual(metrics.LATENCY.count("world/newnations"), latency + 1)
+        self.assertIn("hypr_ratelimit_headroom", metrics.REGISTRY.render())
+
+    def test_error_metrics(self):
+        client = api.Client("HYPR Unit Tests", transport=StubTransport(status=409))
+        before = metrics.ERRORS.value("world/newnations", "409")
+        client.request({"q": "newnations"})
+        self.assertEqual(metrics.ERRORS.value("world/newnations", "409"), before + 1)
@@ -0,0 +1,71 @@
+import time
+from unittest import TestCase
+
+import api
+from api.resilience import CircuitBreaker, Resilience, endpoint
+from exceptions import CircuitOpen, ServiceUnavailable
+from testing import ScriptedTransport
+
+
+class TestResilience(TestCase):
+    def setUp(self):
+        api.Client.request.reset()
+
+    def client(self, statuses: list, **kwargs) -> api.Client:
+        return api.Client(
+            "HYPR Unit Tests",
+            transport=ScriptedTransport(statuses),
+            resilience=Resilience(base_delay=0.01, **kwargs),
+        )
+
+    def test_retries_transient_errors(self):
+        client = self.client([503, 522])
+        r = client.ns_request({"q": "newnations"})
+
+        self.assertEqual(r["newnations"], ["testlandia"])
+        # Every attempt was a real request, so every attempt counted against the ratelimit
+        self.assertEqual(client.transport.calls, 3)
+        self.assertEqual(client.limiter.requests_made, 3)
+
+    def test_gives_up(self):
+        client = self.client([503] * 5, attempts=2)
+        with self.assertRaises(ServiceUnavailable):
+            client.ns_request({"q": "newnations"})
+        self.assertEqual(client.transport.calls, 2)
+
+    def test_actions_are_not_retried(self):
+        client = self.client([500])
+        client.key = "key"
+        with self.assertRaises(api.wrapper.ServerError):
+            client.ns_request(client.telegram_params(1, "secret", "testlandia"))
+        self.assertEqual(client.transport.calls, 1)
+
+    def test_circuit_breaker(self):
+        client = self.client([503] * 3, attempts=2, threshold=3, reset_timeout=0.1)
+        for _ in range(2):
+            with self.assertRaises(ServiceUnavailable):
+                client.ns_request({"q": "newnations"})
+        self.assertEqual(client.transport.calls, 3)
+
+        # The circuit is open: no request is sent at all
+        with self.assertRaises(CircuitOpen) as e:
+            client.ns_request({"q": "newnations"})
+        self.assertGreater(e.exception.retry_in, 0)
+        self.assertEqual(client.transport.calls, 3)
+        # Other endpoints are unaffected
+        client.ns_request({"region": "the_pacific", "q": "newnations"})
+
+        # After the timeout one trial request goes through; it fails, so the circuit opens again
+        time.sleep(0.11)
+        client.transport.statuses = [503]
+        with self.assertRaises(ServiceUnavailable):
+            client.ns_request({"q": "newnations"})
+        breaker = client.resilience.breaker(endpoint({"q": "newnations"}))
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # The next trial succeeds and closes it
+        time.sleep(0.11)
+        self.assertEqual(
+            client.ns_request({"q": "newnations"})["newnations"], ["testlandia"]
+        )
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
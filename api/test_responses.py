@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+import api
+from api.responses import Happening, Happenings, Nation, Region
+from api.transport import Response
+
+HEADERS = {"X-Ratelimit-Requests-Seen": "1"}
+
+NATION = b"""<NATION id="testlandia"><NAME>Testlandia</NAME><REGION>Testregionia</REGION>
+<ENDORSEMENTS>a,b,c</ENDORSEMENTS><POPULATION>32000</POPULATION>
+<CENSUS><SCALE id="66"><SCORE>1.5</SCORE><RANK>3</RANK></SCALE><SCALE id="80"><SCORE>2</SCORE></SCALE></CENSUS>
+</NATION>"""
+
+REGION = b"""<REGION id="the_pacific"><NAME>The Pacific</NAME><NATIONS>a:b:c</NATIONS><NUMNATIONS>3</NUMNATIONS>
+<DELEGATE>a</DELEGATE></REGION>"""
+
+WORLD = b"""<WORLD><HAPPENINGS>
+<EVENT id="2"><TIMESTAMP>1700000001</TIMESTAMP><TEXT><![CDATA[@@b@@ was admitted to the World Assembly.]]></TEXT></EVENT>
+<EVENT id="1"><TIMESTAMP>1700000000</TIMESTAMP><TEXT><![CDATA[@@a@@ endorsed @@b@@.]]></TEXT></EVENT>
+</HAPPENINGS><NEWNATIONS>x,y</NEWNATIONS></WORLD>"""
+
+TGQ = (
+    b"<WORLD><TGQUEUE><MANUAL>1</MANUAL><MASS>20</MASS><API>300</API></TGQUEUE></WORLD>"
+)
+
+
+class TestResponses(TestCase):
+    def setUp(self):
+        self.client = api.Client("HYPR Unit Tests")
+
+    def parse(self, params: dict, body: bytes):
+        return self.client.parse_response(params, Response(200, HEADERS, body))
+
+    def test_nation(self):
+        r = self.parse({"nation": "testlandia", "q": "name+region"}, NATION)
+        self.assertIsInstance(r, Nation)
+        self.assertEqual(r.name, "Testlandia")
+        self.assertEqual(r.endorsements, ["a", "b", "c"])
+        self.assertEqual(r.population, 32000)
+        # Old dict-style access still works, and nothing nested is lost any more
+        self.assertEqual(r["REGION"], "Testregionia")
+        self.assertEqual(
+            r["CENSUS"]["SCALE"],
+            [{"id": "66", "SCORE": "1.5", "RANK": "3"}, {"id": "80", "SCORE": "2"}],
+        )
+        self.assertNotIn("WA", r)
+
+    def test_region(self):
+        r = self.parse({"region": "the_pacific", "q": "nations"}, REGION)
+        self.assertIsInstance(r, Region)
+        self.assertEqual(r["NATIONS"].split(":"), r.nations)
+        self.assertEqual((r.numnations, r.delegate), (3, "a"))
+
+    def test_world_shards(self):
+        r = self.parse({"q": "happenings+newnations"}, WORLD)
+        happenings = r["happenings"]
+        self.assertIsInstance(happenings, Happenings)
+        self.assertEqual(len(happenings), 2)
+        event = happenings[1]
+        self.assertIsInstance(event, Happening)
+        self.assertEqual((event.event_id, event.timestamp), (1, 1700000000))
+        self.assertEqual(event["event_id"], "1")
+        self.assertEqual(event["text"], "@@a@@ endorsed @@b@@.")
+        self.assertEqual([e.event_id for e in reversed(happenings)], [1, 2])
+        self.assertEqual(r["newnations"]["newnations"], ["x", "y"])
+
+    def test_tgq(self):
+        r = self.parse({"q": "tgq"}, TGQ)
+        self.assertEqual((r.manual, r.stamps, r.api), (1, 20, 300))
+        self.assertEqual(r["stamps"], 20)
+        self.assertEqual(r["ratelimit"], "1")
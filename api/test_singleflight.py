@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from api.singleflight import AsyncSingleFlight
+from api.wrapper import Client
+from testing import StubTransport
+
+
+class TestSingleFlight(TestCase):
+    def test_threads_share_request(self):
+        Client.request.reset()
+        transport = StubTransport(delay=0.1)
+        client = Client("HYPR Unit Tests", transport)
+        results = []
+
+        def fetch():
+            results.append(client.ns_request({"q": "newnations"}))
+
+        threads = [threading.Thread(target=fetch) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(transport.calls, 1)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0]["newnations"], ["testlandia"])
+
+    def test_coroutines_share_call(self):
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "response"
+
+        async def run():
+            return await asyncio.gather(*[flights.do("key", fetch) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), ["response"] * 5)
+        self.assertEqual(len(calls), 1)
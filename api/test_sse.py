@@ -0,0 +1,149 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import campaign
+from api.sse import EventSource, SSEDecoder
+from campaign.live import LiveFeed
+from testing import FakeClient, event, make_campaign
+
+# A local stand-in for the NS event stream. The first connection sends two events and then drops; the second resumes
+# after whatever Last-Event-ID the client sent and then pushes one event per item put on server.queue.
+
+
+def message(event_id: int, text: str) -> bytes:
+    data = json.dumps({"id": event_id, "time": int(time.time()), "str": text})
+    return f"id: {event_id}\ndata: {data}\n\n".encode()
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def chunk(self, body: bytes) -> None:
+        self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        self.server.last_event_ids.append(self.headers.get("Last-Event-ID"))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.chunk(b": keep-alive\n\n")
+
+        if len(self.server.last_event_ids) == 1:
+            self.chunk(
+                message(1, "@@a@@ relocated from %%the_pacific%% to %%lazarus%%.")
+            )
+            self.chunk(message(2, "@@b@@ was founded in %%the_pacific%%."))
+            self.wfile.write(b"0\r\n\r\n")
+            self.close_connection = True
+            return
+
+        while True:
+            item = self.server.queue.get()
+            if item is None:
+                self.wfile.write(b"0\r\n\r\n")
+                self.close_connection = True
+                return
+            self.server.sent[item[0]] = time.perf_counter()
+            self.chunk(message(*item))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSSEDecoder(TestCase):
+    def test_split_messages(self):
+        decoder = SSEDecoder()
+        raw = b': hi\n\nid: 7\ndata: {"a":\ndata: 1}\r\n\r\n'
+        messages = []
+        for i in range(len(raw)):
+            messages.extend(decoder.feed(raw[i : i + 1]))
+        self.assertEqual(messages, [("7", '{"a":\n1}')])
+
+
+class TestEventSource(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SSEHandler)
+        self.server.daemon_threads = True
+        self.server.last_event_ids = []
+        self.server.queue = queue.Queue()
+        self.server.sent = {}
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.queue.put(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_live_feed(self):
+        source = EventSource(
+            "HYPR Unit Tests", ["move", "founding"], base_url=self.url, backoff=0.05
+        )
+        exits = campaign.Exits(
+            name="exits",
+            priority=0,
+            tgid=0,
+            secret_key="test_key",
+            recruitment=False,
+            handler=None,
+            search_params={"region": "the_pacific"},
+        )
+        founded = campaign.NewlyFounded(
+            name="founded",
+            priority=0,
+            tgid=0,
+            secret_key="test_key",
+            recruitment=False,
+            handler=None,
+            search_params={},
+        )
+        feed = LiveFeed(source, [exits, founded])
+        feed.start()
+
+        # Push one more event over the resumed connection and time how long it takes to reach the deque
+        self.server.queue.put(
+            (3, "@@c@@ relocated from %%the_pacific%% to %%osiris%%.")
+        )
+        deadline = time.perf_counter() + 5
+        while len(exits.deque) < 2 and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        latency = time.perf_counter() - self.server.sent[3]
+        feed.stop(timeout=0)
+
+        self.assertEqual(list(exits.deque), ["a", "c"])
+        self.assertEqual(list(founded.deque), ["b"])
+        # The client reconnected after the drop, resuming from the last event it saw
+        self.assertEqual(self.server.last_event_ids, [None, "2"])
+        # Only polls move the polling cursor
+        self.assertIsNone(exits.cursors.get(exits.cursor_key))
+        self.assertLess(latency, 0.5)
+
+
+class TestLiveFeed(TestCase):
+    def test_poll_finds_dropped_events(self):
+        moves = [
+            event(i, f"@@n{i}@@ relocated from %%the_pacific%% to %%osiris%%.")
+            for i in range(1, 4)
+        ]
+        handler = FakeClient(moves)
+        exits = make_campaign(
+            campaign.Exits, handler=handler, search_params={"region": "the_pacific"}
+        )
+        feed = LiveFeed(EventSource("HYPR Unit Tests", ["move"]), [exits])
+
+        # The stream drops event 2 while reconnecting, and replays event 3
+        self.assertEqual(feed.dispatch(moves[0]), 1)
+        self.assertEqual(feed.dispatch(moves[2]), 1)
+        self.assertEqual(feed.dispatch(moves[2]), 0)
+
+        # Polling picks up the dropped event without queueing the pushed ones again
+        exits.deque.clear()
+        exits.update_deque()
+        self.assertEqual(list(exits.deque), ["n2"])
+        self.assertEqual(exits.cursors.get(exits.cursor_key), 3)
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from api.stream import StreamParser
+
+HAPPENINGS = (
+    b"<WORLD><HAPPENINGS>"
+    b'<EVENT id="2"><TIMESTAMP>1660000001</TIMESTAMP>'
+    b"<TEXT><![CDATA[@@testlandia@@ was ejected from %%the_pacific%% by @@maxtopia@@.]]></TEXT></EVENT>"
+    b'<EVENT id="1"><TIMESTAMP>1660000000</TIMESTAMP>'
+    b"<TEXT><![CDATA[@@maxtopia@@ relocated from %%lazarus%% to %%the_pacific%%.]]></TEXT></EVENT>"
+    b"</HAPPENINGS></WORLD>"
+)
+
+
+def chunked(body: bytes, size: int):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+class TestStreamParser(TestCase):
+    def test_happenings(self):
+        # Whatever the chunk boundaries, the events come out the same
+        for size in (1, 7, len(HAPPENINGS)):
+            parser = StreamParser()
+            events = []
+            for chunk in chunked(HAPPENINGS, size):
+                events.extend(parser.feed(chunk))
+            events.extend(parser.close())
+
+            self.assertEqual([e["event_id"] for e in events], ["2", "1"])
+            self.assertEqual(events[0]["timestamp"], "1660000001")
+            self.assertTrue(events[1]["text"].startswith("@@maxtopia@@ relocated"))
+
+    def test_names_yielded_as_they_arrive(self):
+        parser = StreamParser()
+        self.assertEqual(
+            parser.feed(b"<REGION><NATIONS>testlandia:maxto"), ["testlandia"]
+        )
+        self.assertEqual(parser.feed(b"pia:the_"), ["maxtopia"])
+        self.assertEqual(
+            parser.feed(b"east_pacific</NATIONS></REGION>"), ["the_east_pacific"]
+        )
+        self.assertEqual(parser.close(), [])
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import api
+from api import metrics
+from api.aio import AsyncPooledTransport
+from api.transport import BasicTransport, PooledTransport
+
+# These tests run Client against a tiny local stand-in for the NS API, so they don't need network access.
+
+NEWNATIONS = b"<WORLD><NEWNATIONS>testlandia,maxtopia</NEWNATIONS></WORLD>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.server.seen += 1
+        body = NEWNATIONS
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Ratelimit-requests-seen", str(self.server.seen))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerTestCase(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.connections = set()
+        self.server.seen = 0
+        api.Client.request.reset()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/cgi-bin/api.cgi"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestTransport(StubServerTestCase):
+    def test_pooled_reuses_connection(self):
+        transport = PooledTransport(base_url=self.url)
+        client = api.Client(useragent="HYPR Unit Tests", transport=transport)
+        for _ in range(3):
+            r = client.ns_request(params={"q": "newnations"})
+            self.assertEqual(r["newnations"], ["testlandia", "maxtopia"])
+        transport.close()
+
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_ns_stream(self):
+        client = api.Client(
+            useragent="HYPR Unit Tests", transport=PooledTransport(base_url=self.url)
+        )
+        names = list(client.ns_stream(params={"q": "newnations"}, chunk_size=4))
+
+        self.assertEqual(names, ["testlandia", "maxtopia"])
+        self.assertEqual(client.requests_made, 1)
+
+    def test_basic_opens_new_connections(self):
+        client = api.Client(
+            useragent="HYPR Unit Tests", transport=BasicTransport(base_url=self.url)
+        )
+        for _ in range(3):
+            client.ns_request(params={"q": "newnations"})
+
+        self.assertEqual(len(self.server.connections), 3)
+
+
+class TestAsyncClient(StubServerTestCase):
+    def test_ns_request(self):
+        async def run():
+            transport = AsyncPooledTransport(pool_size=1, base_url=self.url)
+            async with api.AsyncClient("HYPR Unit Tests", transport) as client:
+                return await asyncio.gather(
+                    *[client.request(params={"q": "newnations"}) for _ in range(3)]
+                )
+
+        for r in asyncio.run(run()):
+            self.assertEqual(r["newnations"], ["testlandia", "maxtopia"])
+
+        # Shares accounting with the sync client, and reuses its single pooled connection
+        self.assertEqual(api.Client.request.requests_made, 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_ns_stream(self):
+        before = metrics.REQUESTS.value("world/newnations", "", "200")
+
+        async def run():
+            transport = AsyncPooledTransport(pool_size=1, base_url=self.url)
+            async with api.AsyncClient("HYPR Unit Tests", transport) as client:
+                return [name async for name in client.ns_stream({"q": "newnations"}, 4)]
+
+        self.assertEqual(asyncio.run(run()), ["testlandia", "maxtopia"])
+        self.assertEqual(api.Client.request.requests_made, 1)
+        self.assertEqual(
+            metrics.REQUESTS.value("world/newnations", "", "200"), before + 1
+        )
@@ -0,0 +1,210 @@
+import time
+import requests
+from typing import Callable, Iterable, Iterator, Mapping, Optional
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Transports are the only part of HYPR that actually touches the network. Client hands them a url, the query
+# parameters and its headers, and gets a Response back. Swapping the transport lets the same Client talk to the live
+# API, a local stub server, or anything else that can produce a Response.
+
+
+class Response:
+    """
+    Minimal, transport-agnostic HTTP response.
+
+    Only the pieces of a response that Client actually reads are kept: the status code, the headers (case-insensitive,
+    since NS is inconsistent about X-Ratelimit capitalisation), the raw body and how long the round trip took.
+    """
+
+    __slots__ = ("status_code", "headers", "content", "elapsed")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        elapsed: float = 0.0,
+    ):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.elapsed = elapsed
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+
+class StreamingResponse:
+    """
+    A response whose body hasn't been read yet. iter_content() yields the (decompressed) body as it arrives, and
+    close() must be called once the caller is done with it, to hand the connection back to the pool.
+    """
+
+    __slots__ = ("status_code", "headers", "_chunks", "_close")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        chunks: Iterable[bytes],
+        close: Optional[Callable[[], None]] = None,
+    ):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self._chunks = chunks
+        self._close = close
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def iter_content(self) -> Iterator[bytes]:
+        yield from self._chunks
+
+    def close(self) -> None:
+        if self._close is not None:
+            self._close()
+
+
+class Transport:
+    """
+    Base class for Client transports. Subclasses must implement get().
+
+    If base_url is set, it replaces the url Client asks for. This is how a transport is pointed at a local stub
+    server instead of the live API.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url
+
+    def url(self, url: str) -> str:
+        return self.base_url if self.base_url is not None else url
+
+    def get(self, url: str, params: dict, headers: dict) -> Response:
+        """
+        Perform a GET request and return the response.
+
+        :param url: URL to request
+        :param params: Query parameters
+        :param headers: Request headers
+        :return: Response
+        """
+        raise NotImplementedError
+
+    def stream(
+        self, url: str, params: dict, headers: dict, chunk_size: int = 8192
+    ) -> StreamingResponse:
+        """
+        Perform a GET request, returning as soon as the headers have arrived.
+
+        Transports that can't stream fall back to reading the whole body and handing it over as a single chunk.
+
+        :param url: URL to request
+        :param params: Query parameters
+        :param headers: Request headers
+        :param chunk_size: Preferred size of the chunks yielded by StreamingResponse.iter_content()
+        :return: StreamingResponse
+        """
+        r = self.get(url, params, headers)
+        return StreamingResponse(r.status_code, r.headers, [r.content])
+
+    def close(self) -> None:
+        """
+        Release any resources (sockets, pools) held by the transport.
+        """
+        pass
+
+
+class BasicTransport(Transport):
+    """
+    One connection per request, no pooling. This is how ns_request used to behave, and is kept around mostly so the
+    cost of a fresh TCP+TLS handshake can be measured against PooledTransport.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        base_url: Optional[str] = None,
+    ):
+        super().__init__(base_url)
+        self.timeout = (connect_timeout, read_timeout)
+
+    def get(self, url: str, params: dict, headers: dict) -> Response:
+        start = time.perf_counter()
+        r = requests.get(
+            self.url(url),
+            params=params,
+            headers={**headers, "Connection": "close"},
+            timeout=self.timeout,
+        )
+        return Response(
+            r.status_code, r.headers, r.content, time.perf_counter() - start
+        )
+
+
+class PooledTransport(Transport):
+    """
+    Keep-alive transport backed by a persistent connection pool.
+
+    Connections to the API are reused between requests, so only the first call pays for the handshake. Responses are
+    requested gzip-compressed, and every request carries a connect and read timeout so a hung socket can't stall the
+    scheduler forever.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        session: Optional[requests.Session] = None,
+        base_url: Optional[str] = None,
+    ):
+        """
+        :param pool_size: Maximum number of connections kept open per host
+        :param connect_timeout: Seconds to wait for a connection to be established
+        :param read_timeout: Seconds to wait between bytes of the response
+        :param session: Optional pre-configured requests.Session to use instead of a new one
+        :param base_url: Optional url to send requests to instead of the live API
+        """
+        super().__init__(base_url)
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+
+    def get(self, url: str, params: dict, headers: dict) -> Response:
+        start = time.perf_counter()
+        r = self.session.get(
+            self.url(url), params=params, headers=headers, timeout=self.timeout
+        )
+        return Response(
+            r.status_code, r.headers, r.content, time.perf_counter() - start
+        )
+
+    def stream(
+        self, url: str, params: dict, headers: dict, chunk_size: int = 8192
+    ) -> StreamingResponse:
+        r = self.session.get(
+            self.url(url),
+            params=params,
+            headers=headers,
+            timeout=self.timeout,
+            stream=True,
+        )
+        return StreamingResponse(
+            r.status_code, r.headers, r.iter_content(chunk_size), r.close
+        )
+
+    def close(self) -> None:
+        self.session.close()
@@ -1,9 +1,32 @@
-import requests
-from typing import List, Optional
-from requests.exceptions import HTTPError
+import time
+from typing import Iterator, List, Optional
 from xml.etree import ElementTree
-from api import NSLeakyBucket
-
+from api import metrics
+from api.cache import ResponseCache
+from api.coalesce import Coalescer
+from api.limiter import NSLeakyBucket, TelegramBucket
+from api.resilience import Resilience, endpoint
+from api.responses import (
+    SHARD_PARSERS,
+    Happenings,
+    Nation,
+    Region,
+    Result,
+    Shards,
+)
+from api.singleflight import SingleFlight
+from api.stream import StreamParser
+from api.transport import Response, StreamingResponse, Transport, PooledTransport
+from exceptions import (
+    APIException,
+    AccessForbidden,
+    Conflict,
+    ServerError,
+    ServiceUnavailable,
+    GatewayTimeout,
+    CloudflareError,
+    TooManyRequests,
+)
 
 # Globaled ratelimiter and constant API url
 # Yes, it's probably bad practice. No, it doesn't matter.
@@ -11,8 +34,22 @@ from api import NSLeakyBucket
 # It's fine.
 API_BASE_URL = "https://www.nationstates.net/cgi-bin/api.cgi"
 
+# Exceptions for failed requests. Server errors are always raised (after retrying, see api.resilience); the rest are
+# only raised where they can't be answered with an error dict, such as for streamed requests.
+STATUS_EXCEPTIONS = {
+    403: AccessForbidden,
+    409: Conflict,
+    500: ServerError,
+    503: ServiceUnavailable,
+    504: GatewayTimeout,
+    522: CloudflareError,
+}
+
 
 class Client:
+    # Telegram lanes are keyed by API client key, so one set is shared by every client
+    telegram_limiter = TelegramBucket()
+
     @property
     def requests_made(self) -> int:
         return self._requests_made
@@ -37,41 +74,93 @@ class Client:
     def key(self, value: str) -> None:
         self._key = value
 
-    def __init__(self, useragent: str):
+    @property
+    def limiter(self) -> NSLeakyBucket:
+        # The bucket is shared by every client, see NSLeakyBucket.limit()
+        return Client.request
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        return self._cache
+
+    @cache.setter
+    def cache(self, value: Optional[ResponseCache]) -> None:
+        self._cache = value
+
+    @property
+    def transport(self) -> Transport:
+        return self._transport
+
+    @transport.setter
+    def transport(self, value: Transport) -> None:
+        self._transport = value
+
+    @property
+    def resilience(self) -> Resilience:
+        return self._resilience
+
+    @resilience.setter
+    def resilience(self, value: Resilience) -> None:
+        self._resilience = value
+
+    def __init__(
+        self,
+        useragent: str,
+        transport: Optional[Transport] = None,
+        cache: Optional[ResponseCache] = None,
+        resilience: Optional[Resilience] = None,
+        coalesce: Optional[float] = None,
+    ):
         """
         Functions of the API client:
-        ns_request - Makes a request to the NationStates API, and parses the response from XML to JSON
+        ns_request - Makes a request to the NationStates API and parses the response, answering from the cache and
+            sharing identical in-flight requests where it can. With coalesce set, concurrent shard requests for the same
+            entity are also merged into one request (see api.coalesce).
+        request - Same as ns_request, but always goes to the API, skipping the cache
+        ns_stream - Parses the response as it downloads, for shards too big to hold in memory at once
+        send_telegram - Sends a telegram through the per-key telegram lanes
 
         Properties of the class:
-        requests_made - The number of requests made to the API
+        requests_made - Requests made in the current ratelimit window, kept in step with X-Ratelimit-Requests-Seen
         headers - The headers to send with each request
-        key - The NS API client key to use with telegram requests
-
-        Both of the above have setters, so they can be modified mid-run should that become necessary.
+        key - The NS API client key to use with telegram requests. None until set, and sending a telegram without one
+            raises AccessForbidden.
+        limiter - The NSLeakyBucket every request is counted against, shared by all clients in the process
+        transport - The api.transport.Transport used to actually talk to the API, a keep-alive PooledTransport unless
+            another is given (e.g. one pointed at a local stub server)
+        cache - Optional api.cache.ResponseCache that ns_request answers repeated queries from. Share one between
+            clients to share cached responses.
+        resilience - api.resilience.Resilience policy for retrying server errors and backing off failing endpoints
 
-        requests_made is incremented for each request made, and is reset to 0 when the ratelimit period
-        rolls over. This is to compensate for the happenings endpoint being clunky to attach X-Ratelimit-requests-seen
-        to on return due to its complicated structure. Every other endpoint returns a X-Ratelimit-requests-seen value
-        in addition to the rest of its data, however, which does make this somewhat redundant. Could definitely use
-        some work to hopefully remove this, but it's low-priority for now. If you're reading this and aren't a maintainer,
-        but it bugs you, PR a change! We're open source for a reason!
+        All but limiter have setters, so they can be modified mid-run should that become necessary.
 
-        Update 6/20/2022: I am tempted to deprecate requests_made as NSLeakyBucket is now a class and handles the
-        ratelimiting. Additionally, added the API client key as a getter/setter in this class to enable telegram
-        sending.
+        Server errors (500/503/504/522) and dropped connections are retried a few times with backoff and then raised as
+        the exceptions in exceptions.py; an endpoint that keeps failing has its circuit opened and raises CircuitOpen
+        for a while rather than spending ratelimit budget on more failures.
 
-        The key is set to None but can be modified via calling the setter. This enables a clean constructor
-        that only takes an useragent in the case that you aren't sending telegrams during a run, but if you are, you can
-        set the key via the config file, load it in, and then it will auto-set enabling telegrams. Otherwise, it will
-        raise an exception telling you that there is no key.
+        Responses are the lazy, slotted objects in api.responses (Nation, Region, Happenings, NameList, TelegramQueue).
+        Fields are only parsed when first read, and can still be subscripted with the old dict keys.
 
         :param useragent: An identifying string for the client
+        :param transport: Transport to send requests with, defaults to a new PooledTransport
+        :param cache: ResponseCache to answer repeated queries from, defaults to no caching
+        :param resilience: Retry and circuit breaker policy for server errors, defaults to Resilience()
+        :param coalesce: Seconds a shard request waits for others for the same entity to join it, while other requests
+            are in flight. Defaults to no merging.
         """
         self._headers = {"User-Agent": useragent}
         self._requests_made = 0
         self._key = None
+        self._transport = transport if transport is not None else PooledTransport()
+        self._cache = cache
+        self._resilience = resilience if resilience is not None else Resilience()
+        self._flights = SingleFlight()
+        self._coalescer = (
+            Coalescer(self, coalesce, send=self._fetch)
+            if coalesce is not None
+            else None
+        )
 
-    @NSLeakyBucket
     def ns_request(self, params: dict) -> dict | List[dict]:
         """
         Wrapper to make NS requests less shitty to work with
@@ -79,12 +168,198 @@ class Client:
         :param params: Dict of parameters to send to the API
         :return: Response from the request serialized to JSON or a list of JSON formatted responses
         """
-        r = requests.get(API_BASE_URL, headers=self.headers, params=params)
+        if self.cache is not None:
+            hit, response = self.cache.lookup(params)
+            if hit:
+                return response
+        if "a" in params:
+            # Actions have side effects, so every one of them has to actually be sent, and never sent twice
+            name = endpoint(params)
+            return self.resilience.call(name, lambda: self.request(params), retry=False)
+        if self._coalescer is not None:
+            return self._coalescer.ns_request(params)
+        return self._fetch(params)
 
-        # Ensure a sane return if the request fails
+    def _fetch(self, params: dict) -> dict | List[dict]:
+        # The rest of ns_request, after the cache and the coalescer
+        name = endpoint(params)
+        response = self._flights.do(
+            ResponseCache.key(params),
+            lambda: self.resilience.call(
+                name, lambda: self.request(params), wait=self.limiter.delay
+            ),
+        )
+        if self.cache is not None:
+            self.cache.store(params, response)
+        return response
+
+    @NSLeakyBucket
+    def request(self, params: dict) -> dict | List[dict]:
+        """
+        Makes a request to the API, without consulting the cache. This is what counts against the ratelimit.
+
+        :param params: Dict of parameters to send to the API
+        :return: Response from the request serialized to JSON or a list of JSON formatted responses
+        """
+        r = self.transport.get(API_BASE_URL, params, self.headers)
+        return self.parse_response(params, r)
+
+    @request.limit
+    def ns_stream(self, params: dict, chunk_size: int = 8192) -> Iterator[dict | str]:
+        """
+        Streaming version of ns_request, for shards that can be too big to comfortably hold in memory all at once
+        (region nations, WA members/delegates, big happenings pages).
+
+        The response is parsed as it downloads: happenings events are yielded as the same dicts ns_request returns,
+        and name lists (newnations, nations, members, delegates, endorsements) are yielded one nation at a time.
+        Counts against the ratelimit as soon as it is called, like ns_request.
+
+        :param params: Dict of parameters to send to the API
+        :param chunk_size: Number of bytes to read from the connection at a time
+        :raises APIException: The request failed
+        :return: Iterator of happenings dicts or nation names
+        """
+        r = self.transport.stream(API_BASE_URL, params, self.headers, chunk_size)
+        # Counted once per stream; the body's size and parse time aren't known up front
+        name, status = endpoint(params), str(r.status_code)
+        metrics.REQUESTS.inc(name, metrics.current_campaign.get(), status)
+        if not r.ok:
+            metrics.ERRORS.inc(name, status)
         try:
-            r.raise_for_status()
-        except HTTPError:
+            yield from self.parse_stream(r)
+        finally:
+            r.close()
+
+    def check_stream(self, r: StreamingResponse) -> None:
+        """
+        Does the bookkeeping for a streamed response before its body is read, and raises if the request failed.
+
+        :param r: StreamingResponse returned by the transport
+        :raises APIException: The request failed
+        """
+        self.sync_ratelimit(r)
+        if not r.ok:
+            self.requests_made += 1
+            raise STATUS_EXCEPTIONS.get(r.status_code, APIException)(str(r.status_code))
+        seen = r.headers.get("X-Ratelimit-Requests-Seen")
+        if seen is not None:
+            self.requests_made = int(seen)
+
+    def parse_stream(self, r: StreamingResponse) -> Iterator[dict | str]:
+        """
+        Incrementally parses a streamed response, see ns_stream.
+
+        :param r: StreamingResponse returned by the transport
+        :raises APIException: The request failed
+        :return: Iterator of happenings dicts or nation names
+        """
+        self.check_stream(r)
+        parser = StreamParser()
+        for chunk in r.iter_content():
+            yield from parser.feed(chunk)
+        yield from parser.close()
+
+    def telegram_params(self, tgid: int, secret_key: str, to: str) -> dict:
+        """
+        Builds the parameters of a sendTG request.
+
+        :raises AccessForbidden: No API client key has been set
+        """
+        if not self.key:
+            raise AccessForbidden("No API client key has been set.")
+        return {
+            "a": "sendTG",
+            "client": self.key,
+            "tgid": tgid,
+            "key": secret_key,
+            "to": to,
+        }
+
+    def send_telegram(
+        self, tgid: int, secret_key: str, to: str, recruitment: bool, block: bool = True
+    ) -> dict:
+        """
+        Sends a telegram, at the earliest instant the telegram ratelimit allows.
+
+        Waiting for the telegram lanes doesn't hold up other API requests; only the sendTG request itself is counted
+        against the general API budget.
+
+        :param tgid: ID of the telegram template
+        :param secret_key: Secret key of the telegram template
+        :param to: Nation to send the telegram to
+        :param recruitment: True if this is a recruitment telegram, which has a much stricter ratelimit
+        :param block: If False, raise TelegramLimitExceeded/RecruitmentLimitExceeded instead of waiting
+        :return: Response from the request, see ns_request
+        """
+        params = self.telegram_params(tgid, secret_key, to)
+        self.telegram_limiter.acquire(self.key, recruitment, block)
+        return self.ns_request(params)
+
+    @staticmethod
+    def raise_for_error(response) -> None:
+        """
+        ns_request answers 403, 404, 409 and 429 with an {"error": ...} dict rather than raising. Code that goes on to
+        treat the response as a list of results (e.g. paging through happenings) should call this first.
+
+        :param response: Response returned by ns_request
+        :raises TooManyRequests: The server answered 429; carries the seconds until the limiter lets a request through
+        :raises APIException: The server answered with another error
+        """
+        if not isinstance(response, dict) or "error" not in response:
+            return
+        error = response["error"]
+        if error == "429":
+            # The limiter has already been given the Retry-After, so it knows how long to hold off for
+            raise TooManyRequests(Client.request.delay())
+        status = int(error) if str(error).isdigit() else None
+        raise STATUS_EXCEPTIONS.get(status, APIException)(error)
+
+    def sync_ratelimit(self, r: Response | StreamingResponse) -> None:
+        """
+        Feeds the ratelimit headers of a response back into the limiter, so it tracks what the server has actually
+        counted rather than only our own calls.
+
+        :param r: Response returned by the transport
+        """
+        seen = r.headers.get("X-Ratelimit-Requests-Seen")
+        retry_after = r.headers.get("Retry-After", r.headers.get("X-Retry-After"))
+        try:
+            self.limiter.sync(
+                int(seen) if seen is not None else None,
+                float(retry_after) if retry_after is not None else None,
+            )
+        except ValueError:
+            # Garbled headers shouldn't take down the request; just skip reconciling this time
+            pass
+
+    def parse_response(self, params: dict, r: Response) -> dict | List[dict]:
+        """
+        Turns a raw API response into the dict (or list of dicts) that ns_request returns. Split out from ns_request
+        so that every client, sync or async, parses responses the exact same way.
+
+        :param params: Dict of parameters the request was made with
+        :param r: Response returned by the transport
+        :return: Response from the request serialized to JSON or a list of JSON formatted responses
+        """
+        name = endpoint(params)
+        status = str(r.status_code)
+        metrics.REQUESTS.inc(name, metrics.current_campaign.get(), status)
+        metrics.LATENCY.observe(r.elapsed, name)
+        metrics.BYTES.inc(name, amount=len(r.content))
+        if not r.ok:
+            metrics.ERRORS.inc(name, status)
+
+        start = time.perf_counter()
+        try:
+            return self._parse_response(params, r)
+        finally:
+            metrics.PARSE.observe(time.perf_counter() - start, name)
+
+    def _parse_response(self, params: dict, r: Response) -> dict | List[dict]:
+        self.sync_ratelimit(r)
+
+        # Ensure a sane return if the request fails
+        if not r.ok:
             self.requests_made += 1
             # Authentication errors
             if r.status_code == 403:
@@ -92,6 +367,12 @@ class Client:
                     "error": "403",
                     "ratelimit": r.headers["X-Ratelimit-requests-seen"],
                 }
+            if r.status_code == 404:
+                # Nation or region doesn't exist (any more)
+                return {
+                    "error": "404",
+                    "ratelimit": r.headers.get("X-Ratelimit-requests-seen"),
+                }
             if r.status_code == 409:
                 return {
                     "error": "409",
@@ -103,20 +384,32 @@ class Client:
                     "ratelimit": r.headers["X-Ratelimit-requests-seen"],
                 }
 
-            # Server errors
-            if r.status_code == 500:
-                return {"error": "500"}
-            if r.status_code == 503:
-                return {"error": "503"}
-            if r.status_code == 504:
-                return {"error": "504"}
-            if r.status_code == 522:
-                return {"error": "522"}
-            else:
-                return {"error": r.text}
+            # Server errors are transient, so raise them for Resilience to retry rather than handing callers an
+            # error dict they'll try to index
+            if r.status_code >= 500:
+                raise STATUS_EXCEPTIONS.get(r.status_code, ServerError)(
+                    str(r.status_code)
+                )
+            return {"error": r.text}
 
         self.requests_made = int(r.headers["X-ratelimit-requests-seen"])
 
+        # Actions (a=...) answer in plain text rather than XML, so deal with them first
+        action = params.get("a", "").lower()
+        if action == "verify":
+            # This endpoint returns nation verification information
+            return {
+                "verified": r.text.strip() == "1",
+                "ratelimit": r.headers["X-Ratelimit-requests-seen"],
+            }
+
+        if action == "sendtg":
+            # Returns true if the telegram was sent successfully, false otherwise
+            return {
+                "queued": r.text.strip().lower() == "queued",
+                "ratelimit": r.headers["X-Ratelimit-requests-seen"],
+            }
+
         # NS still uses XML, so we need to parse it
         try:
             root = ElementTree.fromstring(r.text)
@@ -126,92 +419,46 @@ class Client:
                 "ratelimit": r.headers["X-Ratelimit-requests-seen"],
             }
 
-        # Check through our params to figure out what we're looking for
+        ratelimit = r.headers["X-Ratelimit-requests-seen"]
+
+        # Check through our params to figure out what we're looking for. Nothing is actually parsed until it's read,
+        # see api.responses.
         if "nation" in params.keys():
-            vals = {}
-            for child in root:
-                # Some tags contain subtags, so we need to check for that
-                if len(child) > 0:
-                    s = {}
-                    for sub in child:
-                        s[sub.tag] = sub.text
-                    vals[child.tag] = s
-                else:
-                    vals[child.tag] = child.text
-            return vals
+            return Nation(root, ratelimit)
 
         elif "region" in params.keys():
-            # This block is an exact copy of the above, but for regions
-            # If you modify one, please modify the other
-            vals = {}
-            for child in root:
-                # Some tags contain subtags, so we need to check for that
-                if len(child) > 0:
-                    s = {}
-                    for sub in child:
-                        s[sub.tag] = sub.text
-                    vals[child.tag] = s
-                else:
-                    vals[child.tag] = child.text
-            return vals
+            return Region(root, ratelimit)
 
         else:
-            # Hitting the world API here, manually break out into individual endpoints
-            if "happenings" in params.values():
-                happenings = root.find("HAPPENINGS")
-                # Happenings have an event ID, a timestamp, and text which is in CDATA tags
-                # The event ID is a tag attribute, as opposed to everything else, which is a child tag.
-                vals = []
-                for event in happenings:
-                    event_id = event.attrib["id"]
-                    timestamp = event.find("TIMESTAMP").text
-                    text = event.find("TEXT").text
-                    vals.append(
-                        {"event_id": event_id, "timestamp": timestamp, "text": text}
-                    )
-                return vals
-
-            if "newnations" in params.values():
-                # This is a single tag with a list of CSV formatted nations
-                return {
-                    "newnations": root.find("NEWNATIONS").text.split(","),
-                    "ratelimit": r.headers["X-Ratelimit-requests-seen"],
-                }
-
-            if "tgq" in params.values():
-                # This endpoint returns the telegram queue information
+            # Several shards can be asked for at once (q=happenings+newnations). In that case each one is parsed on
+            # its own, and the results are returned in a dict keyed by shard name.
+            shards = params.get("q", "").split("+")
+            if len(shards) > 1:
                 return {
-                    "manual": int(root.find("MANUAL").text),
-                    "stamps": int(root.find("MASS").text),
-                    "api": int(root.find("API").text),
-                    "ratelimit": r.headers["X-Ratelimit-requests-seen"],
+                    shard: self.parse_world_shard(shard, root, r) for shard in shards
                 }
+            return self.parse_world_shard(shards[0], root, r)
 
-            # edge cases for World Assembly API
-            if "verify" in params.values():
-                # This endpoint returns nation verification information
-                return {
-                    "verified": True if int(r.text) == 1 else False,
-                    "ratelimit": r.headers["X-Ratelimit-requests-seen"],
-                }
+    def parse_world_shard(
+        self, shard: str, root: ElementTree.Element, r: Response
+    ) -> Result | Happenings:
+        """
+        Parses a single world or World Assembly shard out of a response.
 
-            if "delegates" in params.values():
-                # This is a single tag with a list of CSV formatted nations
-                return {
-                    "delegates": root.find("DELEGATES").text.split(","),
-                    "ratelimit": r.headers["X-Ratelimit-requests-seen"],
-                }
+        :param shard: Name of the shard
+        :param root: Root element of the response
+        :param r: Response returned by the transport
+        :return: Parsed shard
+        """
+        parser = SHARD_PARSERS.get(shard)
+        if parser is None:
+            # Not a shard HYPR knows about; hand back everything in the response
+            return Shards(root, r.headers["X-Ratelimit-requests-seen"])
+        return parser(root, r.headers["X-Ratelimit-requests-seen"])
 
-            if "members" in params.values():
-                # This is a single tag with a list of CSV formatted nations
-                return {
-                    "members": root.find("MEMBERS").text.split(","),
-                    "ratelimit": r.headers["X-Ratelimit-requests-seen"],
-                }
 
-            if "sendtg" in params.values():
-                # Returns true if the telegram was sent successfully, false otherwise
-                return {
-                    "queued": True if int(r.text) == 1 else False,
-                    "ratelimit": r.headers["X-Ratelimit-requests-seen"],
-                }
+metrics.REGISTRY.gauge(
+    "hypr_ratelimit_headroom",
+    "Requests that can still be made in the current ratelimit window.",
+    callback=lambda: max(0, Client.request.max_requests - Client.request.requests_made),
+)
@@ -0,0 +1,119 @@
+import json
+import random
+import re
+import sys
+import time
+
+from campaign.events import ADMIT, EJECT, ENDORSE, MOVE, classify
+
+# Compares how fast the happenings campaigns get through a page of events with the old per-campaign regexes and with
+# campaign.events.classify().
+#
+#   python -m benchmarks.bench_events [pages.json]
+#
+# pages.json should hold a list of happenings events as returned by Client.ns_request (dump a few pages with
+# json.dump to record some). Without one, a synthetic mix of moves, ejections, WA and endorsement events is used.
+
+REGION = "the_pacific"
+NATION = "east_durthang"
+
+
+def synthetic(n: int = 20000) -> list:
+    rng = random.Random(0)
+    regions = [REGION, "lazarus", "osiris", "the_rejected_realms", "balder"]
+    nations = [f"nation_{i}" for i in range(500)] + [NATION]
+    templates = [
+        lambda: f"@@{rng.choice(nations)}@@ relocated from %%{rng.choice(regions)}%% to %%{rng.choice(regions)}%%.",
+        lambda: f"@@{rng.choice(nations)}@@ was ejected from %%{rng.choice(regions)}%% by @@{rng.choice(nations)}@@.",
+        lambda: f"@@{rng.choice(nations)}@@ was admitted to the World Assembly.",
+        lambda: f"@@{rng.choice(nations)}@@ resigned from the World Assembly.",
+        lambda: f"@@{rng.choice(nations)}@@ endorsed @@{rng.choice(nations)}@@.",
+        lambda: f"@@{rng.choice(nations)}@@ withdrew its endorsement from @@{rng.choice(nations)}@@.",
+    ]
+    return [
+        {"event_id": str(i), "timestamp": "1700000000", "text": rng.choice(templates)()}
+        for i in range(n)
+    ]
+
+
+def legacy(events: list) -> int:
+    # What Ejections, Exits, Entrances, WorldAssemblyAdmissions and NewEndorsements used to do, each over the page
+    found = 0
+    for event in events:
+        m = re.search(r"[\w-]+(?=@@ was)", event["text"])
+        found += m is not None
+    for event in events:
+        destination = re.search(r"[\w-]+(?=%%\.)", event["text"])
+        source = re.search(r"[\w-]+(?=%% to)", event["text"])
+        # the old code crashed here on anything that wasn't a move; skip instead so the benchmark can finish
+        if destination is None or source is None:
+            continue
+        if source.group(0) == REGION and destination.group(0) != "the_rejected_realms":
+            found += re.search(r"[\w-]+(?=@@ relo)", event["text"]) is not None
+    for event in events:
+        destination = re.search(r"[\w-]+(?=%%\.)", event["text"])
+        if destination is not None and destination.group(0) == REGION:
+            found += re.search(r"[\w-]+(?=@@ relo)", event["text"]) is not None
+    for event in events:
+        found += re.search(r"[\w-]+(?=@@ was admitted)", event["text"]) is not None
+    for event in events:
+        endorser = re.search(r"[\w-]+(?=@@ en)", event["text"])
+        endorsee = re.search(r"[\w-]+(?=@@\.)", event["text"])
+        if endorser is not None and endorsee.group(0) == NATION:
+            found += 1
+    return found
+
+
+def unified(events: list) -> int:
+    # The same five campaigns, classifying the page once each
+    found = 0
+    found += sum(e.kind == EJECT for e in classify(events))
+    found += sum(
+        e.kind == MOVE and e.source == REGION and e.destination != "the_rejected_realms"
+        for e in classify(events)
+    )
+    found += sum(e.kind == MOVE and e.destination == REGION for e in classify(events))
+    found += sum(e.kind == ADMIT for e in classify(events))
+    found += sum(e.kind == ENDORSE and e.target == NATION for e in classify(events))
+    return found
+
+
+def unified_shared(events: list) -> int:
+    # The same five campaigns sharing one classification of the page
+    classified = classify(events)
+    found = 0
+    found += sum(e.kind == EJECT for e in classified)
+    found += sum(
+        e.kind == MOVE and e.source == REGION and e.destination != "the_rejected_realms"
+        for e in classified
+    )
+    found += sum(e.kind == MOVE and e.destination == REGION for e in classified)
+    found += sum(e.kind == ADMIT for e in classified)
+    found += sum(e.kind == ENDORSE and e.target == NATION for e in classified)
+    return found
+
+
+def bench(name: str, func, events: list, repeat: int = 5) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(events)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<16} {len(events) / best:>12,.0f} events/sec")
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            events = json.load(f)
+    else:
+        events = synthetic()
+
+    print(f"{len(events)} events, five campaigns")
+    bench("legacy regexes", legacy, events)
+    bench("classify", unified, events)
+    bench("classify once", unified_shared, events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import random
+import sys
+import time
+from collections import deque
+
+from campaign.queue import RecipientQueue
+
+# Compares campaign.queue.RecipientQueue with the collections.deque it replaced as Campaign.deque:
+#
+#   python -m benchmarks.bench_queue [entries]
+#
+# Searches keep returning nations that are already queued, so inserts are a mix of new and repeated names, as when
+# NewlyFounded sees the same newnations shard again.
+
+
+def bench(name: str, func) -> None:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<40} {elapsed * 1e3:>9.1f} ms  {result}")
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    names = [f"nation_{i}" for i in range(n)]
+    # Every nation found twice, in batches of 50 like a search result
+    found = names + names
+    rng.shuffle(found)
+    batches = [found[i : i + 50] for i in range(0, len(found), 50)]
+    lookups = rng.sample(names, 1000)
+
+    old = deque()
+    new = RecipientQueue()
+
+    def insert_deque():
+        for batch in batches:
+            old.extend(batch)
+        return f"{len(old)} entries"
+
+    def insert_queue():
+        for batch in batches:
+            new.extend(batch)
+        return f"{len(new)} entries"
+
+    print(f"inserting {len(found)} names ({n} distinct)")
+    bench("deque", insert_deque)
+    bench("RecipientQueue", insert_queue)
+
+    print("1000 membership checks")
+    bench("deque", lambda: sum(name in old for name in lookups))
+    bench("RecipientQueue", lambda: sum(name in new for name in lookups))
+
+    print("removing 1000 nations by name")
+
+    def remove_deque():
+        for name in lookups:
+            old.remove(name)
+        return f"{len(old)} left"
+
+    def remove_queue():
+        for name in lookups:
+            new.remove(name)
+        return f"{len(new)} left"
+
+    bench("deque", remove_deque)
+    bench("RecipientQueue", remove_queue)
+
+    print("popping everything")
+
+    def drain(queue):
+        popped = 0
+        while queue:
+            queue.pop()
+            popped += 1
+        return f"{popped} telegrams"
+
+    bench("deque", lambda: drain(old))
+    bench("RecipientQueue", lambda: drain(new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from campaign.registry import RecipientRegistry
+
+# How RecipientRegistry holds up with a lot of contacted nations:
+#
+#   python -m benchmarks.bench_registry [entries]
+#
+# The database is filled directly (one transaction) rather than through record(), which commits every time.
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "registry.db")
+        RecipientRegistry(path).close()
+        db = sqlite3.connect(path)
+        db.executemany(
+            "INSERT INTO recipients (nation, tgid, sent) VALUES (?, 1, ?)",
+            ((f"nation_{i}", 1.0) for i in range(n)),
+        )
+        db.commit()
+        db.close()
+
+        start = time.perf_counter()
+        registry = RecipientRegistry(path, capacity=2 * n)
+        print(f"{n} entries, {os.path.getsize(path) / 1e6:.0f} MB on disk")
+        print(
+            f"{'open (builds Bloom filter)':<32} {time.perf_counter() - start:>8.2f} s"
+        )
+        print(f"{'Bloom filter':<32} {len(registry._bloom.bits) / 1e6:>8.2f} MB")
+
+        for name, names in (
+            ("lookup, never contacted", (f"new_{i}" for i in range(100000))),
+            ("lookup, contacted", (f"nation_{i * 7 % n}" for i in range(100000))),
+        ):
+            start = time.perf_counter()
+            for nation in names:
+                registry.contacted(nation, 1)
+            per = (time.perf_counter() - start) / 100000
+            print(f"{name:<32} {per * 1e6:>8.2f} us")
+
+        start = time.perf_counter()
+        for i in range(1000):
+            registry.claim(f"claimed_{i}", 1)
+        per = (time.perf_counter() - start) / 1000
+        print(f"{'claim (writes)':<32} {per * 1e6:>8.2f} us")
+        registry.close()
+
+        start = time.perf_counter()
+        RecipientRegistry(path, capacity=2 * n).close()
+        print(
+            f"{'reopen (saved Bloom filter)':<32} {time.perf_counter() - start:>8.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
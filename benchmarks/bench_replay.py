@@ -0,0 +1,45 @@
+import sys
+import time
+
+import api
+from api.cassette import Cassette, ReplayTransport
+
+# Replays a recorded cassette (see api.cassette) through Client, offline, and compares how long the requests took
+# against the live API with how long HYPR itself spends on them (matching, ratelimit bookkeeping, parsing):
+#
+#   HYPR_CASSETTE=run.jsonl.gz HYPR_RECORD=1 python -m pytest campaign/test_campaign.py   # record once
+#   python -m benchmarks.bench_replay run.jsonl.gz [speed]
+#
+# With a speed, responses are delayed by their recorded round trip time divided by it, to see how the rest of HYPR
+# behaves with a faster or slower API. The gaps between the recorded requests aren't replayed, since they'd only add
+# idle time to the comparison.
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print("usage: python -m benchmarks.bench_replay cassette [speed]")
+        sys.exit(1)
+    cassette = Cassette.load(sys.argv[1])
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    # Actions can't be replayed meaningfully without their keys
+    requests = [i.params for i in cassette if "a" not in i.params]
+
+    client = api.Client(
+        "HYPR Benchmarks", transport=ReplayTransport(cassette, speed=speed, pace=False)
+    )
+    start = time.perf_counter()
+    for params in requests:
+        # Only HYPR's own cost is being measured here, not the 45 per 30 seconds budget
+        api.Client.request.reset()
+        client.request(params)
+    replayed = time.perf_counter() - start
+    recorded = sum(i.elapsed for i in cassette if "a" not in i.params)
+
+    print(f"{len(requests)} requests")
+    print(f"{'recorded round trips':<24} {recorded:>8.3f} s")
+    print(f"{'replayed':<24} {replayed:>8.3f} s")
+    print(f"{'per request':<24} {replayed / max(len(requests), 1) * 1e3:>8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
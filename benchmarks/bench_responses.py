@@ -0,0 +1,118 @@
+import time
+import tracemalloc
+from xml.etree import ElementTree
+
+from api.responses import Happenings, Nation
+
+# Compares the old eager dict parsing in Client.parse_response with the lazy, slotted objects in api.responses:
+#
+#   python -m benchmarks.bench_responses
+#
+# Building the XML tree costs the same either way, so parse time is measured from an already built tree. Memory is
+# what the parsed result adds on top of the tree, per response and per happenings event.
+
+NATION = (
+    "<NATION id='testlandia'>"
+    + "".join(f"<FIELD{i}>value {i}</FIELD{i}>" for i in range(60))
+    + "<REGION>testregionia</REGION><ENDORSEMENTS>"
+    + ",".join(f"nation_{i}" for i in range(200))
+    + "</ENDORSEMENTS><CENSUS>"
+    + "".join(
+        f"<SCALE id='{i}'><SCORE>{i}.5</SCORE><RANK>{i}</RANK></SCALE>"
+        for i in range(80)
+    )
+    + "</CENSUS></NATION>"
+)
+
+HAPPENINGS = (
+    "<WORLD><HAPPENINGS>"
+    + "".join(
+        f"<EVENT id='{i}'><TIMESTAMP>17000{i:05}</TIMESTAMP>"
+        f"<TEXT><![CDATA[@@nation_{i}@@ relocated from %%a%% to %%b%%.]]></TEXT></EVENT>"
+        for i in range(100)
+    )
+    + "</HAPPENINGS></WORLD>"
+)
+
+
+def legacy_nation(root):
+    vals = {}
+    for child in root:
+        if len(child) > 0:
+            s = {}
+            for sub in child:
+                s[sub.tag] = sub.text
+            vals[child.tag] = s
+        else:
+            vals[child.tag] = child.text
+    return vals
+
+
+def legacy_happenings(root):
+    vals = []
+    for event in root.find("HAPPENINGS"):
+        vals.append(
+            {
+                "event_id": event.attrib["id"],
+                "timestamp": event.find("TIMESTAMP").text,
+                "text": event.find("TEXT").text,
+            }
+        )
+    return vals
+
+
+def bench(name: str, func, n: int = 2000) -> None:
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    print(f"{name:<36} {(time.perf_counter() - start) / n * 1e6:>8.1f} us")
+
+
+def memory(name: str, func, root, per: int = 1) -> None:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func(root)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"{name:<36} {size / per:>8.0f} bytes")
+    return result
+
+
+def main() -> None:
+    nation = ElementTree.fromstring(NATION)
+    happenings = ElementTree.fromstring(HAPPENINGS)
+
+    print("parse time, reading one field of a nation")
+    bench(
+        "dicts",
+        lambda: legacy_nation(nation)["REGION"],
+    )
+    bench("lazy", lambda: Nation(nation).region)
+
+    print("parse time, reading every event of a happenings page")
+    bench(
+        "dicts",
+        lambda: [e["text"] for e in legacy_happenings(happenings)],
+    )
+    bench(
+        "lazy",
+        lambda: [e.text for e in Happenings(happenings)],
+    )
+
+    print("memory on top of the XML tree, per nation")
+    memory("dicts", legacy_nation, ElementTree.fromstring(NATION))
+    memory("lazy", Nation, ElementTree.fromstring(NATION))
+
+    print("memory on top of the XML tree, per happenings event")
+    memory("dicts", legacy_happenings, ElementTree.fromstring(HAPPENINGS), per=100)
+    memory(
+        "lazy (every event read)",
+        lambda root: list(Happenings(root)),
+        ElementTree.fromstring(HAPPENINGS),
+        per=100,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import sys
+import threading
+import time
+
+import api
+import campaign
+from api.transport import PooledTransport
+from tools.simulator import Simulator, World
+
+# Runs HYPR flat out against tools.simulator for a while and reports how many targets and telegrams it gets through,
+# and whether it ever tripped the simulated API or telegram limits:
+#
+#   python -m benchmarks.bench_simulator [seconds] [events per second]
+#
+# Campaigns are searched back to back with pacing on, so the whole request budget is used, while one thread sends a
+# recruitment telegram to the newest target as often as the telegram limit allows. The ratelimit windows are the
+# real 30 and 180 seconds, so runs shorter than a few minutes say little about telegram throughput.
+
+CAMPAIGNS = [
+    (campaign.NewlyFounded, {}),
+    (campaign.Entrances, {"region": "the_pacific"}),
+    (campaign.Exits, {"region": "the_pacific"}),
+    (campaign.Ejections, {"region": "the_rejected_realms"}),
+    (campaign.WorldAssemblyAdmissions, {}),
+    (campaign.WorldAssemblyResignations, {}),
+]
+
+
+def main() -> None:
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 120
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    rates = None
+    if rate is not None:
+        kinds = ("found", "move", "admit", "resign", "endorse", "withdraw", "eject")
+        rates = {kind: rate / len(kinds) for kind in kinds}
+
+    simulator = Simulator(World(rates=rates), recruitment_tgids=[1])
+    transport = PooledTransport(base_url=simulator.start())
+    client = api.Client("HYPR Benchmarks", transport=transport)
+    client.key = "benchmark"
+    api.Client.request.pacing = True
+
+    campaigns = [
+        cls(
+            name=cls.__name__,
+            priority=0,
+            tgid=1,
+            secret_key="benchmark",
+            recruitment=True,
+            handler=client,
+            search_params=params,
+        )
+        for cls, params in CAMPAIGNS
+    ]
+    found = {c.name: 0 for c in campaigns}
+    stop = time.monotonic() + duration
+    sent = []
+
+    def telegrams() -> None:
+        while time.monotonic() < stop:
+            targets = [c for c in campaigns if c.deque]
+            if not targets:
+                time.sleep(0.5)
+                continue
+            # The deque holds names, so pop directly rather than through Campaign.nation
+            target = targets[0].deque.pop()
+            client.send_telegram(1, "benchmark", target, recruitment=True)
+            sent.append(target)
+
+    sender = threading.Thread(target=telegrams, daemon=True)
+    sender.start()
+    start = time.monotonic()
+    while time.monotonic() < stop:
+        for c in campaigns:
+            before = len(c.deque)
+            c.update_deque()
+            found[c.name] += max(len(c.deque) - before, 0)
+    elapsed = time.monotonic() - start
+    sender.join(timeout=0)
+    transport.close()
+    simulator.stop()
+
+    stats = simulator.stats
+    hours = elapsed / 3600
+    print(f"{elapsed:.0f}s against the simulator")
+    print(
+        f"{'requests':<28} {stats['requests']:>8} ({stats['requests'] / elapsed:.2f}/s)"
+    )
+    print(f"{'requests refused (429)':<28} {stats['throttled']:>8}")
+    print(f"{'telegrams sent':<28} {stats['telegrams']:>8} ({len(sent) / hours:.0f}/h)")
+    print(f"{'telegrams refused (429)':<28} {stats['telegrams_throttled']:>8}")
+    for name, n in found.items():
+        print(f"{name:<28} {n:>8} targets ({n / hours:.0f}/h)")
+    print(
+        f"{'all campaigns':<28} {sum(found.values()):>8} targets ({sum(found.values()) / hours:.0f}/h)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,3 +11,5 @@ from campaign.campaign import NewWithdrawnEndorsements
 from campaign.campaign import Endorsements
 from campaign.campaign import WorldAssemblyDelegates
 from campaign.campaign import WorldAssemblyMembers
+from campaign.campaign import HappeningsCampaign
+from campaign.bus import HappeningsBus
@@ -0,0 +1,153 @@
+import threading
+import time
+from typing import Dict, List, Optional
+from api.wrapper import Client
+from campaign.campaign import HappeningsCampaign
+from campaign.cursors import CursorStore
+from campaign.events import classify
+
+# Every happenings campaign polling the API on its own means ten campaigns cost ten requests a cycle, for mostly the
+# same events. HappeningsBus polls one combined feed on behalf of all of its subscribers instead, classifies each event
+# once, and hands every campaign the events it accepts. Adding a campaign doesn't add a request unless it needs a
+# view nobody else is already polling.
+
+
+class HappeningsBus:
+    def __init__(
+        self,
+        handler: Client,
+        cursors: Optional[CursorStore] = None,
+        max_age: float = 10,
+        limit: int = 100,
+        catch_up_pages: int = 10,
+    ):
+        """
+        Shared happenings poller for HappeningsCampaigns.
+
+        Subscribers are grouped into as few requests as possible. One request, with every subscriber's filter
+        combined (filter=eject+move+...), covers all campaigns that don't care about region; another covers every
+        regional campaign whose accept() can check the region itself, with all of their regions in one view
+        (view=region.a,b). Campaigns that can't tell regions apart from the event text (WA admissions and resignations)
+        get one request per region.
+
+        :param handler: Client to poll with
+        :param cursors: Where to remember the newest event seen on each view, defaults to in memory
+        :param max_age: refresh() only polls again once the last poll is this many seconds old
+        :param limit: Most events to ask for per request
+        :param catch_up_pages: If a poll comes back full, more happened since the last one than fit on a page; page
+            back (beforeid) to the cursor, at most this many more pages, instead of skipping the rest
+        """
+        self.handler = handler
+        self.cursors = cursors if cursors is not None else CursorStore()
+        self.max_age = max_age
+        self.limit = limit
+        self.catch_up_pages = catch_up_pages
+        self._subscribers: List[HappeningsCampaign] = []
+        self._last_poll = None
+        self._lock = threading.RLock()
+
+    def subscribe(self, campaign: HappeningsCampaign) -> None:
+        """
+        Feeds campaign from the bus. Its searches stop making requests of their own.
+        """
+        with self._lock:
+            if campaign not in self._subscribers:
+                self._subscribers.append(campaign)
+            campaign.bus = self
+
+    def unsubscribe(self, campaign: HappeningsCampaign) -> None:
+        """
+        Stops feeding campaign. It goes back to polling the API itself.
+        """
+        with self._lock:
+            if campaign in self._subscribers:
+                self._subscribers.remove(campaign)
+            campaign.bus = None
+
+    @property
+    def subscribers(self) -> List[HappeningsCampaign]:
+        return list(self._subscribers)
+
+    def _groups(self) -> Dict[Optional[str], List[HappeningsCampaign]]:
+        """
+        Groups subscribers by the view they can be polled with. None is the world feed.
+        """
+        groups = {}
+        shared = []
+        for campaign in self._subscribers:
+            region = campaign.region
+            if region is None:
+                groups.setdefault(None, []).append(campaign)
+            elif campaign.local_view:
+                shared.append(campaign)
+            else:
+                groups.setdefault(f"region.{region}", []).append(campaign)
+        if shared:
+            regions = sorted({c.region for c in shared})
+            groups.setdefault(f"region.{','.join(regions)}", []).extend(shared)
+        return groups
+
+    def _query(self, view: Optional[str], campaigns: List[HappeningsCampaign]) -> dict:
+        params = {
+            "q": "happenings",
+            "filter": "+".join(sorted({c.feed for c in campaigns})),
+            "limit": self.limit,
+        }
+        if view is not None:
+            params["view"] = view
+        since = self.cursors.get(f"bus|{view or 'world'}")
+        if since is not None:
+            params["sinceid"] = since
+        return params
+
+    def poll(self) -> int:
+        """
+        Polls every group of subscribers once and publishes the new events to them.
+
+        :return: Number of requests made
+        """
+        with self._lock:
+            requests = 0
+            for view, campaigns in self._groups().items():
+                key = f"bus|{view or 'world'}"
+                since = self.cursors.get(key)
+                params = self._query(view, campaigns)
+                page = self.handler.ns_request(params=params)
+                # Raise on 4xx before any cursor moves, so the next poll asks for the same events again
+                Client.raise_for_error(page)
+                page = list(page)
+                response = page
+                requests += 1
+                for _ in range(self.catch_up_pages if since is not None else 0):
+                    if len(page) < self.limit:
+                        break
+                    params = {
+                        **params,
+                        "beforeid": min(int(event["event_id"]) for event in page),
+                    }
+                    page = self.handler.ns_request(params=params)
+                    Client.raise_for_error(page)
+                    page = [event for event in page if int(event["event_id"]) > since]
+                    response = response + page
+                    requests += 1
+                if response:
+                    self.cursors.advance(
+                        key, max(int(event["event_id"]) for event in response)
+                    )
+                events = classify(response)
+                for campaign in campaigns:
+                    campaign.publish(events)
+            self._last_poll = time.monotonic()
+            return requests
+
+    def refresh(self) -> None:
+        """
+        Polls, unless the bus has already polled within the last max_age seconds. Called by subscribed campaigns when
+        they search, so the first of them to search in a cycle pays for the request and the rest are served locally.
+        """
+        with self._lock:
+            if (
+                self._last_poll is None
+                or time.monotonic() - self._last_poll >= self.max_age
+            ):
+                self.poll()
@@ -1,9 +1,25 @@
 import time
 import api.wrapper
-import re
-from collections import deque
-from exceptions import SearchException
-
+from api.metrics import current_campaign
+from typing import Callable, Generator, List, Optional, Tuple
+from campaign.cursors import CursorStore
+from campaign.queue import RecipientQueue
+from campaign.registry import RecipientRegistry
+from campaign.validation import Validator
+from campaign.events import (
+    ADMIT,
+    EJECT,
+    ENDORSE,
+    FOUND,
+    MOVE,
+    REFOUND,
+    RESIGN,
+    WITHDRAW,
+    Event,
+    classify,
+    normalise,
+)
+from exceptions import SearchException, TooManyRequests
 
 # How this works
 # the campaign object holds a list of nations which is a stack - first in, last out.
@@ -17,6 +33,9 @@ from exceptions import SearchException
 
 
 class Campaign:
+    # True if every nation the campaign finds is a WA member, for scoring in campaign.targeting
+    wa_targets = False
+
     def __init__(
         self,
         name: str,
@@ -26,6 +45,10 @@ class Campaign:
         recruitment: bool,
         handler: api.wrapper.Client,
         search_params: dict,
+        cursors: Optional[CursorStore] = None,
+        registry: Optional[RecipientRegistry] = None,
+        validator: Optional[Validator] = None,
+        max_age: Optional[float] = None,
     ):
         """
         A meta-object for the instantiation of a campaign.
@@ -37,6 +60,15 @@ class Campaign:
         :param recruitment: True if campaign is recruitment, used to help schedule appropriately
         :param handler: api.wrapper.Client instance for accessing NS API safely
         :param search_params: Parameters for search.
+        :param cursors: Where happenings campaigns remember how far through their feeds they are. Pass a persistent
+            CursorStore to survive restarts; defaults to keeping them in memory.
+        :param registry: Who has already been telegrammed. Share one RecipientRegistry between campaigns so a nation
+            isn't targeted by several of them; defaults to no checking.
+        :param validator: Skips nations that no longer exist or (for recruitment campaigns) won't accept recruitment
+            telegrams before they're handed out. Share one Validator between campaigns; defaults to no checking.
+        :param max_age: Seconds after which a queued target is too old to be worth a telegram and is dropped. For
+            happenings campaigns this counts from the event, otherwise from when the nation was found. None never
+            drops them.
         """
 
         self._name = name
@@ -46,10 +78,14 @@ class Campaign:
         self._recruitment = recruitment
         self.handler = handler
         self.search_params = search_params
+        self.cursors = cursors if cursors is not None else CursorStore()
+        self.registry = registry
+        self.validator = validator
+        self.max_age = max_age
         self._last_search = 0
 
-        # create deque, with maximum length if necessary
-        self.deque = deque(maxlen=480)
+        # create deque, with maximum length if necessary. It's a RecipientQueue, so each nation is only in it once
+        self.deque = RecipientQueue(maxlen=480, max_age=max_age)
 
         # If True, deques are processed in reverse - oldest first.
         self.reverse = False
@@ -74,33 +110,83 @@ class Campaign:
         """
 
         # special logic for one-time searches - never refresh the deque again once it's been generated.
-        if self.one_time is True:
-            if self.last_search == 0:
-                new_nations = self._search()
-                self.last_search = time.time()
-                # add items to deque - oldest at left, newest at right
-                if self.reverse:
-                    self.deque.extendleft(new_nations)
-                else:
-                    self.deque.extend(new_nations)
-            else:
-                raise SearchException("One-time search already performed.")
-        else:
+        if self.one_time is True and self.last_search != 0:
+            raise SearchException("One-time search already performed.")
+
+        # attribute the search's API requests to this campaign in api.metrics
+        token = current_campaign.set(self.name)
+        try:
             new_nations = self._search()
-            self.last_search = time.time()
+        finally:
+            current_campaign.reset(token)
+        self.last_search = time.time()
+        self._add(new_nations)
+
+    async def update_deque_async(self) -> None:
+        """
+        Same as update_deque(), but for campaigns whose handler is an api.AsyncClient. Lets several campaigns search
+        concurrently from one event loop instead of each tying up a thread.
+
+        :return:
+        """
 
-            # add items to deque - oldest at left, newest at right
-            if self.reverse:
-                self.deque.extendleft(new_nations)
-            else:
-                self.deque.extend(new_nations)
+        if self.one_time is True and self.last_search != 0:
+            raise SearchException("One-time search already performed.")
+
+        token = current_campaign.set(self.name)
+        try:
+            new_nations = await self._search_async()
+        finally:
+            current_campaign.reset(token)
+        self.last_search = time.time()
+        self._add(new_nations)
+
+    def _add(self, new_nations: list) -> int:
+        # add items to deque - oldest at left, newest at right. reverse only changes which end nation takes from, so
+        # a full deque always drops its oldest entries. Items are nation names, or (nation, unix time) pairs when the
+        # search knows when the nation became a target.
+        return self.deque.extend(new_nations)
 
     def _search(self) -> list:
         """
         Defines campaign search functionality for a Campaign. End user should never call this.
 
-        If age matters, order should be oldest to newest to ensure deque limits discard correctly.
+        By default, this makes the request described by _query() and hands the response to _extract(). Campaigns that
+        need more than one request can override it directly, but then can't be searched with update_deque_async().
+
+        If age matters, order should be oldest to newest to ensure deque limits discard correctly. Searches that know
+        when each nation became a target can return (nation, unix time) pairs instead of names, so max_age counts
+        from then rather than from the search.
 
+        :return: list of nations
+        """
+        response = self.handler.ns_request(params=self._query())
+        api.wrapper.Client.raise_for_error(response)
+        return self._extract(response)
+
+    async def _search_async(self) -> list:
+        """
+        Same as _search(), for update_deque_async().
+
+        :return: list of nations
+        """
+        response = await self.handler.ns_request(self._query())
+        api.wrapper.Client.raise_for_error(response)
+        return self._extract(response)
+
+    def _query(self) -> dict:
+        """
+        Parameters of the API request made by the campaign search.
+
+        :return: dict of request parameters
+        """
+        pass
+
+    def _extract(self, response) -> list:
+        """
+        Pulls the list of target nations out of the API response to _query().
+
+        :param response: parsed response from Client.ns_request
         :return: list of nations
         """
         pass
@@ -122,12 +208,71 @@ class Campaign:
 
         If Campaign.reverse is True, the oldest recipient is returned; Otherwise, the newest one is.
 
+        With a registry, nations that have already been sent this campaign's telegram (or another one too recently)
+        are skipped, and the one returned is recorded as contacted; call release() if its telegram can't be sent. With
+        a validator, nations that have ceased to exist or won't accept the telegram are skipped too.
+
+        :raises IndexError: No nation left to target
         :return: nation name
         """
+        return self.take()[0]
+
+    def take(self) -> Tuple[str, float]:
+        """
+        Same as Campaign.nation, but also returns the time the nation was queued with, so that it can be handed back
+        unchanged with put_back().
+
+        :raises IndexError: No nation left to target
+        :return: nation name and Unix time
+        """
+        while True:
+            nation, when = (
+                self.deque.popleft_entry() if self.reverse else self.deque.pop_entry()
+            )
+            # Neither check makes a request (the validator only reads what it prefetched), so this never waits on NS
+            if self.registry is not None and self.registry.contacted(nation, self.tgid):
+                continue
+            if self.validator is not None and not self.validator.valid(
+                nation, self.is_recruitment
+            ):
+                continue
+            if self.registry is None or self.registry.claim(nation, self.tgid):
+                return nation, when
+
+    def put_back(self, nation: str, when: float) -> None:
+        """
+        Undoes take() for a nation whose telegram couldn't be sent yet (e.g. the telegram lane was taken in the
+        meantime): releases it and returns it to the end of the deque it came from, with its original timestamp, so
+        max_age still counts from when it was found. A nation that has gone stale in the meantime is dropped.
+
+        :param nation: nation name, as returned by take()
+        :param when: its timestamp, as returned by take()
+        """
+        self.release(nation)
         if self.reverse:
-            return self.deque.popleft()[0]
+            self.deque.appendleft(nation, when)
         else:
-            return self.deque.pop()[0]
+            self.deque.append(nation, when)
+
+    def release(self, nation: str) -> None:
+        """
+        Tells the registry that the telegram to a nation returned by Campaign.nation wasn't sent after all, so it isn't
+        counted as contacted.
+
+        :param nation: nation name
+        """
+        if self.registry is not None:
+            self.registry.release(nation, self.tgid)
+
+    def push(self, event: Event) -> bool:
+        """
+        Queues the target of an event pushed by campaign.live.LiveFeed, which has already checked accept().
+
+        :param event: classified event
+        :return: True if the nation was queued
+        """
+        self._add([(event.nation, event.timestamp)])
+        return True
 
     @property
     def tgid(self) -> int:
@@ -199,8 +344,15 @@ class NewlyFounded(Campaign):
     Recruits newly founded nations.
     """
 
-    def _search(self) -> list:
-        return self.handler.ns_request(params={"q": "newnations"})["newnations"]
+    def _query(self) -> dict:
+        return {"q": "newnations"}
+
+    def _extract(self, response) -> list:
+        return response["newnations"]
+
+    def accept(self, event: Event) -> bool:
+        # Only used by campaign.live.LiveFeed; searches still use the newnations shard
+        return event.kind in (FOUND, REFOUND)
 
 
 class Residents(Campaign):
@@ -210,199 +362,353 @@ class Residents(Campaign):
 
     def post_init(self) -> None:
         # no deque limit - regions can be huge
-        self.deque = deque()
+        self.deque = RecipientQueue(max_age=self.max_age)
         self.one_time = True
 
-    def _search(self) -> list:
-        return self.handler.ns_request(
-            params={"region": self.search_params["region"], "q": "nations"}
-        )["NATIONS"].split(":")
+    def _query(self) -> dict:
+        return {"region": self.search_params["region"], "q": "nations"}
 
+    def _extract(self, response) -> list:
+        return response["NATIONS"].split(":")
 
-class Ejections(Campaign):
+
+class HappeningsCampaign(Campaign):
     """
-    Targets new ejections.
+    Base class for campaigns that search the happenings feed.
+
+    Subclasses set feed to the happenings filter they watch and implement accept(). The campaign remembers the
+    newest event it has processed in its CursorStore and only asks the API for events after it (sinceid), so events
+    are never downloaded or processed twice. Cursors are kept per campaign as well as per feed, so campaigns watching
+    the same feed don't consume each other's events.
+
+    Alternatively, subscribe the campaign to a campaign.bus.HappeningsBus, which polls one combined feed for all of
+    its subscribers. A subscribed campaign's search doesn't make a request of its own; it just picks up the events the
+    bus has handed it.
     """
 
-    def _search(self) -> list:
-        region = self.search_params["region"]
-        client = self.handler
+    # happenings filter, e.g. "move"
+    feed: Optional[str] = None
 
-        if region is None:
-            events = client.ns_request(params={"q": "happenings", "filter": "eject"})
-        else:
-            events = client.ns_request(
-                params={
-                    "q": "happenings",
-                    "filter": "eject",
-                    "view": f"region.{region}",
-                }
-            )
+    # True if accept() can tell whether an event belongs to the campaign's region from the event itself, so the bus
+    # can fetch it as part of a feed covering several regions. WA admissions and resignations don't mention a region.
+    local_view = True
 
-        nations = []
-        for event in events:
-            nations.append(re.search(r"[\w-]+(?=@@ was)", event["text"]).group(0))
+    # Events asked for per search. If the page comes back full, more happened since the cursor than fit on it, so the
+    # search pages back (beforeid) to the cursor, up to catch_up_pages more pages, rather than skipping the rest.
+    limit = 100
+    catch_up_pages = 10
 
-        return nations
+    def post_init(self) -> None:
+        # set by HappeningsBus.subscribe()
+        self.bus = None
+        self._inbox = []
+        # ids of events LiveFeed has queued that no poll has got past yet, so polls don't queue them a second time
+        self._pushed = set()
 
+    def accept(self, event: Event) -> bool:
+        """
+        Decides whether a classified happenings event produces a target for this campaign.
 
-class Exits(Campaign):
-    """
-    Targets nations leaving a region.
-    """
+        :param event: classified event
+        :return: True if event.nation should be targeted
+        """
+        pass
 
-    def _search(self) -> list:
-        region = self.search_params["region"]
-        client = self.handler
+    def publish(self, events: List[Event]) -> None:
+        """
+        Called by the bus with newly polled events. Keeps the ones the campaign wants for its next search.
+
+        The campaign's own cursor still tracks the newest event it has been given, so nothing is delivered twice if
+        the bus regroups its views, and an unsubscribed campaign carries on from where the bus left it.
+        """
+        since = self.cursors.get(self.cursor_key)
+        if since is not None:
+            events = [e for e in events if e.event_id > since]
+        self._inbox.extend(e for e in events if self.accept(e))
+        if events:
+            self.cursors.advance(self.cursor_key, max(e.event_id for e in events))
+
+    def push(self, event: Event) -> bool:
+        """
+        Queues an event pushed by LiveFeed, unless it has already been queued by a poll or an earlier push.
 
-        events = client.ns_request(
-            params={"q": "happenings", "filter": "move", "view": f"region.{region}"}
+        The polling cursor isn't moved: the stream can drop events while it reconnects, and a poll still has to find
+        those. Instead the event's id is remembered, and polls skip it.
+        """
+        since = self.cursors.get(self.cursor_key)
+        if since is not None:
+            if event.event_id <= since:
+                return False
+            # Polls never look at or below the cursor, so there's no need to remember anything there
+            self._pushed = {event_id for event_id in self._pushed if event_id > since}
+        if event.event_id in self._pushed:
+            return False
+        self._pushed.add(event.event_id)
+        self._add([(event.nation, event.timestamp)])
+        return True
+
+    def _search(self) -> list:
+        if self.bus is None:
+            pages = self._pages(self._query(), self._catch_up())
+            return self._extract(self._walk(pages, self.handler.ns_request))
+        self.bus.refresh()
+        events, self._inbox = self._inbox, []
+        return self._stamp(events)
+
+    def _stamp(self, events: List[Event]) -> list:
+        # NS serves happenings newest first, but the deque wants oldest first: otherwise the newest end of the deque
+        # holds the oldest event of each page, and stale entries end up behind fresh ones where they can't expire.
+        # Each target keeps its event's TIMESTAMP, so it goes stale from when it happened, not from when we polled.
+        # Events LiveFeed has already queued are left out.
+        pushed = self._pushed
+        events = sorted(
+            (e for e in events if e.event_id not in pushed), key=lambda e: e.event_id
         )
-        nations = []
-        for event in events:
-            destination = re.search(r"[\w-]+(?=%%\.)", event["text"]).group(0)
-            source = re.search(r"[\w-]+(?=%% to)", event["text"]).group(0)
-            if source == region and destination != "the_rejected_realms":
-                nations.append(re.search(r"[\w-]+(?=@@ relo)", event["text"]).group(0))
+        return [(e.nation, e.timestamp) for e in events]
+
+    def _targets(self, events: list) -> list:
+        return self._stamp([e for e in classify(events) if self.accept(e)])
 
+    @property
+    def region(self) -> Optional[str]:
+        """
+        The campaign's region, normalised to compare with event regions, or None if it doesn't have one.
+        """
+        region = self.search_params.get("region")
+        return normalise(region) if region is not None else None
+
+    async def _search_async(self) -> list:
+        pages = self._pages(self._query(), self._catch_up())
+        try:
+            params = next(pages)
+            while True:
+                params = pages.send(await self.handler.ns_request(params))
+        except StopIteration as stop:
+            return self._extract(stop.value)
+
+    def _catch_up(self) -> int:
+        # Without a cursor there's nothing to catch up to; backfill() is for that
+        if self.cursors.get(self.cursor_key) is None:
+            return 1
+        return 1 + self.catch_up_pages
+
+    def _pages(
+        self, params: dict, max_pages: int, sincetime: Optional[int] = None
+    ) -> Generator[dict, list, list]:
+        """
+        Walks backwards through the feed from the newest event, a page at a time, until it reaches the campaign's
+        cursor, sincetime or max_pages. Yields the parameters of each page to fetch and is sent back the response, so
+        the same walk can be driven with or without await.
+
+        :return: Every event found, oldest first
+        """
+        since = self.cursors.get(self.cursor_key)
+        limit = int(params["limit"])
+        events = []
+        for _ in range(max_pages):
+            page = yield params
+            # A 4xx comes back as an error dict; raise before it's mistaken for a page of events. Nothing has been
+            # queued or moved the cursor yet, so the whole walk is simply tried again later.
+            api.wrapper.Client.raise_for_error(page)
+            # NS should already have cut the page off at sinceid/sincetime, but don't count on it
+            page = [
+                event
+                for event in page
+                if (since is None or int(event["event_id"]) > since)
+                and (sincetime is None or int(event["timestamp"]) >= sincetime)
+            ]
+            events.extend(page)
+            if len(page) < limit:
+                break
+            params = {
+                **params,
+                "beforeid": min(int(event["event_id"]) for event in page),
+            }
+        # Pages come newest first; the deque wants oldest first
+        events.sort(key=lambda event: int(event["event_id"]))
+        return events
+
+    @staticmethod
+    def _walk(pages: Generator[dict, list, list], request: Callable) -> list:
+        try:
+            params = next(pages)
+            while True:
+                params = pages.send(request(params=params))
+        except StopIteration as stop:
+            return stop.value
+
+    def _view(self) -> Optional[str]:
+        region = self.search_params.get("region")
+        return f"region.{region}" if region is not None else None
+
+    @property
+    def cursor_key(self) -> str:
+        return f"{self.name}|{self.feed}|{self._view() or 'world'}"
+
+    def _query(self) -> dict:
+        params = {"q": "happenings", "filter": self.feed, "limit": self.limit}
+        view = self._view()
+        if view is not None:
+            params["view"] = view
+        since = self.cursors.get(self.cursor_key)
+        if since is not None:
+            params["sinceid"] = since
+        return params
+
+    def _extract(self, response) -> list:
+        nations = self._targets(response)
+        if response:
+            self.cursors.advance(
+                self.cursor_key, max(int(event["event_id"]) for event in response)
+            )
         return nations
 
+    def backfill(
+        self, horizon: Optional[float] = None, limit: int = 100, max_pages: int = 10
+    ) -> int:
+        """
+        Catch up on events missed while HYPR wasn't searching, e.g. after a restart or an outage.
+
+        update_deque() only pages back catch_up_pages pages, and not at all without a cursor, so anything further
+        back than that would otherwise be lost. backfill() pages backwards through the feed with beforeid until it reaches the
+        campaign's cursor, the time horizon or max_pages, then adds everything it found to the deque oldest-first and
+        moves the cursor to the newest event.
+
+        Each page is a normal request, so it's counted against the ratelimit; if the bucket is full, backfill waits
+        for a slot rather than giving up.
+
+        :param horizon: Don't go back further than this many seconds. Defaults to going back to the cursor.
+        :param limit: Events to ask for per page
+        :param max_pages: Most pages to fetch, so a campaign without a cursor or horizon can't eat the whole budget
+        :return: Number of nations added to the deque
+        """
+        params = self._query()
+        params["limit"] = limit
+        sincetime = int(time.time() - horizon) if horizon is not None else None
+        if sincetime is not None:
+            params["sincetime"] = sincetime
+
+        def request(params: dict) -> list:
+            while True:
+                try:
+                    response = self.handler.ns_request(params=params)
+                    api.wrapper.Client.raise_for_error(response)
+                    return response
+                except TooManyRequests as e:
+                    time.sleep(e.args[0])
+
+        token = current_campaign.set(self.name)
+        try:
+            events = self._walk(self._pages(params, max_pages, sincetime), request)
+        finally:
+            current_campaign.reset(token)
+
+        new_nations = self._extract(events)
+        self.last_search = time.time()
+        return self._add(new_nations)
+
 
-class Entrances(Campaign):
+class Ejections(HappeningsCampaign):
     """
-    Targets nations entering a region.
+    Targets new ejections.
     """
 
-    def _search(self) -> list:
-        region = self.search_params["region"]
-        client = self.handler
+    feed = "eject"
 
-        events = client.ns_request(
-            params={"q": "happenings", "filter": "move", "view": f"region.{region}"}
+    def accept(self, event: Event) -> bool:
+        region = self.region
+        return event.kind == EJECT and (
+            region is None or normalise(event.region) == region
         )
 
-        nations = []
-        for event in events:
-            destination = re.search(r"[\w-]+(?=%%\.)", event["text"]).group(0)
-            if destination == region:
-                nations.append(re.search(r"[\w-]+(?=@@ relo)", event["text"]).group(0))
 
-        return nations
+class Exits(HappeningsCampaign):
+    """
+    Targets nations leaving a region.
+    """
+
+    feed = "move"
 
+    def accept(self, event: Event) -> bool:
+        return (
+            event.kind == MOVE
+            and normalise(event.source) == self.region
+            and normalise(event.destination) != "the_rejected_realms"
+        )
 
-class WorldAssemblyAdmissions(Campaign):
+
+class Entrances(HappeningsCampaign):
     """
-    Targets nations newly admitted to the World Assembly
+    Targets nations entering a region.
     """
 
-    def _search(self) -> list:
-        try:
-            region = self.search_params["region"]
-        except KeyError:
-            region = None
-        client = self.handler
+    feed = "move"
 
-        if region is None:
-            events = client.ns_request(params={"q": "happenings", "filter": "member"})
-        else:
-            events = client.ns_request(
-                params={
-                    "q": "happenings",
-                    "filter": "member",
-                    "view": f"region.{region}",
-                }
-            )
+    def accept(self, event: Event) -> bool:
+        return event.kind == MOVE and normalise(event.destination) == self.region
 
-        nations = []
-        for event in events:
-            check = re.search(r"[\w-]+(?=@@ was admitted)", event["text"])
-            if check is not None:
-                nations.append(check.group(0))
 
-        return nations
+class WorldAssemblyAdmissions(HappeningsCampaign):
+    """
+    Targets nations newly admitted to the World Assembly
+    """
 
+    feed = "member"
+    local_view = False
+    wa_targets = True
 
-class WorldAssemblyResignations(Campaign):
-    def _search(self) -> list:
-        try:
-            region = self.search_params["region"]
-        except KeyError:
-            region = None
-        client = self.handler
+    def accept(self, event: Event) -> bool:
+        return event.kind == ADMIT
 
-        if region is None:
-            events = client.ns_request(params={"q": "happenings", "filter": "member"})
-        else:
-            events = client.ns_request(
-                params={
-                    "q": "happenings",
-                    "filter": "member",
-                    "view": f"region.{region}",
-                }
-            )
 
-        nations = []
-        for event in events:
-            check = re.search(r"[\w-]+(?=@@ resigned)", event["text"])
-            if check is not None:
-                nations.append(check.group(0))
+class WorldAssemblyResignations(HappeningsCampaign):
+    feed = "member"
+    local_view = False
 
-        return nations
+    def accept(self, event: Event) -> bool:
+        return event.kind == RESIGN
 
 
-class NewEndorsements(Campaign):
+class NewEndorsements(HappeningsCampaign):
     """
     Targets nations recently endorsing a specific nation.
     """
 
-    def _search(self) -> list:
-        # TODO automatically determine target's region
-        nation = self.search_params["nation"]
-        region = self.search_params["region"]
-
-        client = self.handler
-
-        events = client.ns_request(
-            params={"q": "happenings", "filter": "endo", "view": f"region.{region}"}
-        )
+    # TODO automatically determine target's region
+    feed = "endo"
+    # only WA members can endorse
+    wa_targets = True
 
-        nations = []
-        for event in events:
-            endorser = re.search(r"[\w-]+(?=@@ en)", event["text"])
-            endorsee = re.search(r"[\w-]+(?=@@\.)", event["text"])
-
-            if endorser is not None and endorsee.group(0) == nation:
-                nations.append(endorser.group(0))
+    @property
+    def endorsed(self) -> str:
+        """
+        The nation being endorsed, normalised to compare with event targets.
+        """
+        return normalise(self.search_params["nation"])
 
-        return nations
+    def accept(self, event: Event) -> bool:
+        return event.kind == ENDORSE and normalise(event.target) == self.endorsed
 
 
-class NewWithdrawnEndorsements(Campaign):
+class NewWithdrawnEndorsements(HappeningsCampaign):
     """
     Targets nations recently withdrawing an endorsement of a specific nation. Withdrawn endorsements happen relatively
     infrequently compared to endorsements, so this campaign may struggle to catch withdrawn endorsements unless
     endorsements are stagnant.
     """
 
-    def _search(self) -> list:
-        # TODO automatically determine nation's region
-        nation = self.search_params["nation"]
-        region = self.search_params["region"]
-        client = self.handler
-
-        events = client.ns_request(
-            params={"q": "happenings", "filter": "endo", "view": f"region.{region}"}
-        )
-
-        nations = []
-        for event in events:
-            endorser = re.search(r"[\w-]+(?=@@ wi)", event["text"])
-            endorsee = re.search(r"[\w-]+(?=@@\.)", event["text"])
+    # TODO automatically determine nation's region
+    feed = "endo"
 
-            if endorser is not None and endorsee.group(0) == nation:
-                nations.append(endorser.group(0))
+    @property
+    def endorsed(self) -> str:
+        """
+        The nation whose endorsements are being withdrawn, normalised to compare with event targets.
+        """
+        return normalise(self.search_params["nation"])
 
-        return nations
+    def accept(self, event: Event) -> bool:
+        return event.kind == WITHDRAW and normalise(event.target) == self.endorsed
 
 
 class Endorsements(Campaign):
@@ -410,18 +716,19 @@ class Endorsements(Campaign):
     Targets all nations currently endorsing a specific nation.
     """
 
+    wa_targets = True
+
     def post_init(self) -> None:
         self.one_time = True
 
         # no deque limit for this - endo lists can be huge
-        self.deque = deque()
+        self.deque = RecipientQueue(max_age=self.max_age)
 
-    def _search(self) -> list:
-        nation = self.search_params["nation"]
-        client = self.handler
-        return client.ns_request(params={"nation": nation, "q": "endorsements"})[
-            "ENDORSEMENTS"
-        ].split(",")
+    def _query(self) -> dict:
+        return {"nation": self.search_params["nation"], "q": "endorsements"}
+
+    def _extract(self, response) -> list:
+        return response["ENDORSEMENTS"].split(",")
 
 
 class WorldAssemblyDelegates(Campaign):
@@ -429,15 +736,19 @@ class WorldAssemblyDelegates(Campaign):
     Targets all World Assembly Delegates
     """
 
+    wa_targets = True
+
     def post_init(self) -> None:
         self.one_time = True
 
         # no deque limit for this - there are a lot of WADs
-        self.deque = deque()
+        self.deque = RecipientQueue(max_age=self.max_age)
 
-    def _search(self) -> list:
-        client = self.handler
-        return client.ns_request(params={"wa": "1", "q": "delegates"})["delegates"]
+    def _query(self) -> dict:
+        return {"wa": "1", "q": "delegates"}
+
+    def _extract(self, response) -> list:
+        return response["delegates"]
 
 
 class WorldAssemblyMembers(Campaign):
@@ -445,11 +756,15 @@ class WorldAssemblyMembers(Campaign):
     Targets all World Assembly members
     """
 
+    wa_targets = True
+
     def post_init(self) -> None:
         self.one_time = True
         # no deque limit for this - there are a lot of WA members
-        self.deque = deque()
+        self.deque = RecipientQueue(max_age=self.max_age)
 
-    def _search(self) -> list:
-        client = self.handler
-        return client.ns_request(params={"wa": "1", "q": "members"})["members"]
+    def _query(self) -> dict:
+        return {"wa": "1", "q": "members"}
+
+    def _extract(self, response) -> list:
+        return response["members"]
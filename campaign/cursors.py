@@ -0,0 +1,62 @@
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+# Happenings campaigns remember the id of the newest event they've processed on each feed they watch, and ask the API
+# only for events after it (sinceid). CursorStore holds those ids and, if given a path, keeps them on disk so a
+# restarted HYPR picks up exactly where it stopped.
+
+
+class CursorStore:
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: JSON file to persist cursors to. If None, cursors are only kept in memory.
+        """
+        self.path = path
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                try:
+                    self._cursors = {k: int(v) for k, v in json.load(f).items()}
+                except ValueError:
+                    # Starting from the top of the feed beats refusing to start at all
+                    self._cursors = {}
+
+    def get(self, key: str) -> Optional[int]:
+        """
+        Id of the newest event processed on a feed, or None if it has never been polled.
+        """
+        return self._cursors.get(key)
+
+    def advance(self, key: str, event_id: int) -> None:
+        """
+        Moves a feed's cursor forward to event_id. Never moves it backwards.
+
+        :param key: Feed key
+        :param event_id: Id of the newest event processed
+        """
+        with self._lock:
+            if event_id <= self._cursors.get(key, -1):
+                return
+            self._cursors[key] = event_id
+            self._save()
+
+    def reset(self, key: str) -> None:
+        """
+        Forgets a feed's cursor, so its next poll starts from the top of the feed.
+        """
+        with self._lock:
+            self._cursors.pop(key, None)
+            self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        # Write to a temporary file and swap it in, so a crash mid-write can't leave a truncated cursor file
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._cursors, f)
+        os.replace(tmp, self.path)
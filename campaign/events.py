@@ -0,0 +1,125 @@
+import re
+from typing import Iterable, List, Optional
+
+# Every happenings campaign used to run its own handful of regexes over every event's text, recompiling them each
+# time. classify() instead parses each event once, with a single precompiled pattern, into an Event whose fields the
+# campaigns can compare directly.
+
+EJECT = "eject"
+MOVE = "move"
+ADMIT = "admit"
+RESIGN = "resign"
+ENDORSE = "endorse"
+WITHDRAW = "withdraw"
+FOUND = "found"
+REFOUND = "refound"
+
+# One alternative per kind of event. Each ends in an empty group named after its kind, which is always the last group
+# to close on a match, so match.lastgroup says which alternative matched without trying them one by one.
+PATTERN = re.compile(
+    r"@@(?P<nation>[\w-]+)@@ (?:"
+    r"relocated from %%(?P<source>[\w-]+)%% to %%(?P<destination>[\w-]+)%%\.(?P<move>)"
+    r"|was ejected (?:and banned )?from %%(?P<ejected_from>[\w-]+)%%(?P<eject>)"
+    r"|was admitted to the World Assembly(?P<admit>)"
+    r"|resigned from the World Assembly(?P<resign>)"
+    r"|endorsed @@(?P<endorsed>[\w-]+)@@\.(?P<endorse>)"
+    r"|withdrew its endorsement from @@(?P<withdrawn>[\w-]+)@@\.(?P<withdraw>)"
+    r"|was founded in %%(?P<founded_in>[\w-]+)%%(?P<found>)"
+    r"|was refounded in %%(?P<refounded_in>[\w-]+)%%(?P<refound>)"
+    r")"
+)
+
+
+def normalise(name: str) -> str:
+    """
+    Nation or region name the way happenings spell it: NS ignores case and treats spaces and underscores alike, so
+    "The Pacific" and "the_pacific" are the same region.
+    """
+    return name.strip().lower().replace(" ", "_")
+
+
+class Event:
+    """
+    A classified happenings event.
+
+    nation is always the nation the event happened to (the one that moved, was ejected, endorsed someone...). Which
+    of the other fields are set depends on kind:
+
+    - move: source and destination regions
+    - eject, found, refound: region
+    - endorse, withdraw: target, the nation being endorsed
+    """
+
+    __slots__ = (
+        "event_id",
+        "timestamp",
+        "kind",
+        "nation",
+        "region",
+        "source",
+        "destination",
+        "target",
+    )
+
+    def __init__(
+        self,
+        event_id: int,
+        timestamp: int,
+        kind: str,
+        nation: str,
+        region: Optional[str] = None,
+        source: Optional[str] = None,
+        destination: Optional[str] = None,
+        target: Optional[str] = None,
+    ):
+        self.event_id = event_id
+        self.timestamp = timestamp
+        self.kind = kind
+        self.nation = nation
+        self.region = region
+        self.source = source
+        self.destination = destination
+        self.target = target
+
+    def __repr__(self) -> str:
+        return f"Event({self.event_id}, {self.kind}, {self.nation})"
+
+
+def classify_one(event: dict) -> Optional[Event]:
+    """
+    Classifies a single happenings event.
+
+    :param event: happenings event, as returned by Client.ns_request
+    :return: Event, or None if the text isn't one of the kinds HYPR cares about
+    """
+    m = PATTERN.search(event["text"])
+    if m is None:
+        return None
+    kind = m.lastgroup
+    return Event(
+        int(event["event_id"]),
+        int(event["timestamp"]),
+        kind,
+        m.group("nation"),
+        region=m.group("ejected_from")
+        or m.group("founded_in")
+        or m.group("refounded_in"),
+        source=m.group("source"),
+        destination=m.group("destination"),
+        target=m.group("endorsed") or m.group("withdrawn"),
+    )
+
+
+def classify(events: Iterable[dict]) -> List[Event]:
+    """
+    Classifies a batch of happenings events, in order. Events that don't match any known kind are dropped.
+
+    :param events: happenings events, as returned by Client.ns_request
+    :return: list of Events
+    """
+    classified = []
+    for event in events:
+        e = classify_one(event)
+        if e is not None:
+            classified.append(e)
+    return classified
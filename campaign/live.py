@@ -0,0 +1,75 @@
+import threading
+from typing import List, Optional
+from api.sse import EventSource
+from campaign.campaign import Campaign
+from campaign.events import classify_one
+
+# Polling means a nation that moves or is founded just after a search waits a whole cycle before a campaign even knows
+# about it. LiveFeed takes happenings pushed by an api.sse.EventSource and puts targets straight into the deques of
+# the campaigns that accept them, as they arrive.
+
+
+class LiveFeed:
+    def __init__(self, source: EventSource, campaigns: Optional[List[Campaign]] = None):
+        """
+        Feeds campaigns from the happenings event stream.
+
+        Any campaign with an accept(event) method can be fed: every happenings campaign, plus NewlyFounded for
+        foundings. Happenings campaigns remember which events they've been fed, so if they also poll, they won't pick
+        the same event up a second time. Their polling cursors are left alone, so a poll still finds anything the
+        stream dropped while reconnecting.
+
+        :param source: EventSource to read happenings from. Its buckets should cover what the campaigns watch.
+        :param campaigns: Campaigns to feed
+        """
+        self.source = source
+        self.campaigns = list(campaigns) if campaigns is not None else []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, campaign: Campaign) -> None:
+        with self._lock:
+            self.campaigns.append(campaign)
+
+    def remove(self, campaign: Campaign) -> None:
+        with self._lock:
+            self.campaigns.remove(campaign)
+
+    def dispatch(self, event: dict) -> int:
+        """
+        Hands one happenings event to every campaign that wants it.
+
+        :param event: happenings dict, as yielded by EventSource.events()
+        :return: Number of campaigns the event's nation was added to
+        """
+        e = classify_one(event)
+        if e is None:
+            return 0
+        fed = 0
+        with self._lock:
+            for campaign in self.campaigns:
+                if campaign.accept(e) and campaign.push(e):
+                    fed += 1
+        return fed
+
+    def run(self) -> None:
+        """
+        Dispatches events until stop() is called. Blocks; see start() to run it in the background.
+        """
+        for event in self.source.events():
+            self.dispatch(event)
+
+    def start(self) -> None:
+        """
+        Runs the feed on a daemon thread.
+        """
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the feed. The thread finishes once the current message is handled or the stream next sends anything.
+        """
+        self.source.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,268 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from exceptions import QueueFull
+
+# Campaign.deque used to be a collections.deque, so every search appended whatever it found and the same nation could
+# sit in it many times over, checking for or removing a nation meant a scan, and with reverse set maxlen dropped the
+# newest targets instead of the oldest. RecipientQueue is an ordered set: each nation is in it at most once, with the
+# time it was added, membership and removal by name are O(1), and what happens when it's full is spelled out.
+#
+# With max_age set, targets also go cold: a nation ejected six hours ago is not worth the same telegram as one ejected
+# a second ago. Entries carry the time of the event that made them a target (happenings campaigns pass the event's
+# TIMESTAMP), and ones older than max_age are dropped lazily - from the oldest end whenever the queue is added to or
+# popped from, and from whichever end is being popped as they're reached. Each entry is dropped at most once, so this
+# is amortised O(1) per operation, and a queue nobody pops from still can't fill up with cold leads.
+
+# When full: drop the oldest entry to make room, refuse the new one, or raise QueueFull
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+ERROR = "error"
+
+# A nation, or a nation and the Unix time it became a target
+Entry = Union[str, Tuple[str, float]]
+
+
+class RecipientQueue:
+    def __init__(
+        self,
+        nations: Iterable[str] = (),
+        maxlen: Optional[int] = None,
+        overflow: str = DROP_OLDEST,
+        refresh: bool = False,
+        max_age: Optional[float] = None,
+    ):
+        """
+        Nations waiting to be telegrammed, oldest on the left and newest on the right, like the deque it replaces.
+
+        :param nations: Nations to start with, oldest first
+        :param maxlen: Most nations to hold, None for no limit
+        :param overflow: What to do with a new nation when full: DROP_OLDEST (as deque does) makes room by dropping
+            the oldest entry, DROP_NEWEST drops the new nation, ERROR raises QueueFull
+        :param refresh: If True, adding a nation that's already queued moves it to the newest end with a new
+            timestamp. Otherwise it keeps its place.
+        :param max_age: Seconds after its timestamp that an entry is too stale to hand out. None keeps entries forever.
+        """
+        if overflow not in (DROP_OLDEST, DROP_NEWEST, ERROR):
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        self.maxlen = maxlen
+        self.overflow = overflow
+        self.refresh = refresh
+        self.max_age = max_age
+        # Number of entries dropped for being too old
+        self.expired = 0
+        # nation -> time added, oldest first
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.extend(nations)
+
+    def _stale(self, when: float, now: float) -> bool:
+        return self.max_age is not None and now - when > self.max_age
+
+    def _expire(self, now: float) -> None:
+        # Drop stale entries from the oldest end, stopping at the first fresh one
+        if self.max_age is None:
+            return
+        entries = self._entries
+        while entries:
+            nation = next(iter(entries))
+            if not self._stale(entries[nation], now):
+                break
+            del entries[nation]
+            self.expired += 1
+
+    def _insert(self, nation: str, when: float, newest: bool, now: float) -> bool:
+        if self._stale(when, now):
+            # Already too old to be worth queueing, e.g. found by a backfill
+            return False
+        if nation in self._entries:
+            if not self.refresh:
+                return False
+            del self._entries[nation]
+        elif self.maxlen is not None and len(self._entries) >= self.maxlen:
+            if self.overflow == ERROR:
+                raise QueueFull(nation)
+            if self.overflow == DROP_NEWEST or not newest or self.maxlen == 0:
+                # A nation added at the oldest end of a full queue would be the first to go anyway
+                return False
+            self._entries.popitem(last=False)
+        self._entries[nation] = when
+        if not newest:
+            self._entries.move_to_end(nation, last=False)
+        return True
+
+    def append(self, nation: str, when: Optional[float] = None) -> bool:
+        """
+        Adds a nation at the newest end.
+
+        :param nation: Nation name
+        :param when: Unix time it was found, defaults to now
+        :return: True if it was added, False if it was already queued (and not refreshed) or dropped
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            return self._insert(nation, when if when is not None else now, True, now)
+
+    def appendleft(self, nation: str, when: Optional[float] = None) -> bool:
+        """
+        Adds a nation at the oldest end.
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            return self._insert(nation, when if when is not None else now, False, now)
+
+    def _insert_all(
+        self, entries: Iterable[Entry], when: Optional[float], newest: bool
+    ) -> int:
+        now = time.time()
+        when = when if when is not None else now
+        added = 0
+        with self._lock:
+            self._expire(now)
+            for entry in entries:
+                if isinstance(entry, tuple):
+                    added += self._insert(entry[0], entry[1], newest, now)
+                else:
+                    added += self._insert(entry, when, newest, now)
+        return added
+
+    def extend(self, nations: Iterable[Entry], when: Optional[float] = None) -> int:
+        """
+        Adds nations at the newest end, oldest first.
+
+        :param nations: Nation names, or (nation, Unix time) pairs to give each its own timestamp
+        :param when: Timestamp for the plain names, defaults to now
+        :return: Number of nations added
+        """
+        return self._insert_all(nations, when, True)
+
+    def extendleft(self, nations: Iterable[Entry], when: Optional[float] = None) -> int:
+        """
+        Adds nations at the oldest end, one at a time, so the last one ends up oldest (as with deque).
+
+        :return: Number of nations added
+        """
+        return self._insert_all(nations, when, False)
+
+    def pop(self) -> str:
+        """
+        Removes and returns the newest nation.
+
+        :raises IndexError: The queue is empty
+        """
+        return self.pop_entry()[0]
+
+    def popleft(self) -> str:
+        """
+        Removes and returns the oldest nation.
+
+        :raises IndexError: The queue is empty
+        """
+        return self.popleft_entry()[0]
+
+    def _pop_entry(self, last: bool) -> Tuple[str, float]:
+        # Popping is the hot path; don't read the clock if nothing can go stale
+        now = time.time() if self.max_age is not None else 0.0
+        with self._lock:
+            self._expire(now)
+            while True:
+                try:
+                    nation, when = self._entries.popitem(last=last)
+                except KeyError:
+                    raise IndexError("pop from an empty RecipientQueue") from None
+                if not self._stale(when, now):
+                    return nation, when
+                self.expired += 1
+
+    def pop_entry(self) -> Tuple[str, float]:
+        """
+        Removes the newest nation, returning it with its timestamp. Stale entries are skipped.
+        """
+        return self._pop_entry(True)
+
+    def popleft_entry(self) -> Tuple[str, float]:
+        """
+        Removes the oldest nation, returning it with its timestamp. Stale entries are skipped.
+        """
+        return self._pop_entry(False)
+
+    def remove(self, nation: str) -> None:
+        """
+        Removes a nation by name.
+
+        :raises ValueError: It isn't queued
+        """
+        with self._lock:
+            try:
+                del self._entries[nation]
+            except KeyError:
+                raise ValueError(f"{nation} is not queued") from None
+
+    def discard(self, nation: str) -> bool:
+        """
+        Removes a nation by name if it's queued.
+
+        :return: True if it was
+        """
+        with self._lock:
+            return self._entries.pop(nation, None) is not None
+
+    def timestamp(self, nation: str) -> float:
+        """
+        Unix time a queued nation was added, or the time passed in with it.
+
+        :raises KeyError: It isn't queued
+        """
+        return self._entries[nation]
+
+    def peek(self, n: int, newest: bool = True) -> List[str]:
+        """
+        The next n nations that pop() (or popleft(), if newest is False) would return, without removing them.
+        """
+        now = time.time()
+        with self._lock:
+            ends = reversed(self._entries) if newest else iter(self._entries)
+            fresh = (e for e in ends if not self._stale(self._entries[e], now))
+            return list(itertools.islice(fresh, n))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, nation: str) -> bool:
+        return nation in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Oldest to newest. Iterates over a snapshot, so the queue can be changed meanwhile.
+        """
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __reversed__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(reversed(self._entries)))
+
+    def __getitem__(self, index: int) -> str:
+        # Only the ends are cheap, as with deque
+        with self._lock:
+            if not self._entries:
+                raise IndexError("RecipientQueue index out of range")
+            if index == 0:
+                return next(iter(self._entries))
+            if index == -1:
+                return next(reversed(self._entries))
+            return list(self._entries)[index]
+
+    def __repr__(self) -> str:
+        return f"RecipientQueue({list(self._entries)}, maxlen={self.maxlen})"
@@ -0,0 +1,283 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+# Who has already been telegrammed, shared by every campaign and kept across restarts, so a nation picked up by
+# NewlyFounded, then Entrances, then WorldAssemblyAdmissions isn't telegrammed three times and a restart doesn't start
+# everyone over.
+#
+# Records live in SQLite, keyed by (nation, tgid). Almost every lookup is for a nation that has never been contacted,
+# so a Bloom filter of contacted nations sits in front and answers those without touching the database. It takes a
+# couple of bytes per nation, so it stays small at millions of entries, and SQLite only holds a page cache in memory.
+#
+# A nation is claimed (recorded) as soon as it's handed out, so two campaigns can't both take it, which is before its
+# telegram is actually sent. If sending fails, release() undoes the claim so the nation isn't written off for good.
+
+# Recent claims remembered so they can be released; a telegram either goes out or fails long before this many more
+# nations are claimed
+RELEASABLE_CLAIMS = 1024
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        :param capacity: Number of items the filter is sized for. Past it, false positives become more likely.
+        :param error_rate: Chance of a false positive at capacity
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        new = False
+        for i in self._indexes(item):
+            byte, bit = divmod(i, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        for i in self._indexes(item):
+            byte, bit = divmod(i, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+
+class RecipientRegistry:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        window: Optional[float] = None,
+        windows: Optional[Dict[int, Optional[float]]] = None,
+        cross_window: float = 0,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+    ):
+        """
+        :param path: SQLite database to keep the registry in. If None, it's only kept in memory.
+        :param window: Seconds after which a nation may be sent the same telegram again. None never allows it.
+        :param windows: Overrides window for particular telegram templates, by tgid
+        :param cross_window: Seconds after being sent any telegram during which a nation isn't sent a different one
+        :param capacity: Contacted nations the Bloom filter is sized for. It's rebuilt twice as big if it fills up.
+        :param error_rate: Chance of the Bloom filter sending a lookup for a new nation to the database anyway
+        """
+        self.path = path
+        self.window = window
+        self.windows = dict(windows or {})
+        self.cross_window = cross_window
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+        # (nation, tgid) -> when it was last sent before being claimed, for release()
+        self._claims: "OrderedDict[Tuple[str, int], Optional[float]]" = OrderedDict()
+        self._db = sqlite3.connect(
+            path if path is not None else ":memory:", check_same_thread=False
+        )
+        if path is not None:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS recipients ("
+            "nation TEXT NOT NULL, tgid INTEGER NOT NULL, sent REAL NOT NULL, "
+            "PRIMARY KEY (nation, tgid)) WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS recipients_sent ON recipients (sent)"
+        )
+        # The Bloom filter as of the last clean close, so opening a big registry doesn't have to rebuild it
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bloom (id INTEGER PRIMARY KEY CHECK (id = 1), "
+            "capacity INTEGER, error_rate REAL, records INTEGER, count INTEGER, bits BLOB)"
+        )
+        self._db.commit()
+        if not self._load(capacity):
+            self._rebuild(capacity)
+
+    def _records(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM recipients").fetchone()[0]
+
+    def _load(self, capacity: int) -> bool:
+        row = self._db.execute(
+            "SELECT capacity, error_rate, records, count, bits FROM bloom"
+        ).fetchone()
+        if row is None:
+            return False
+        saved_capacity, error_rate, records, count, bits = row
+        # Anything recorded since it was saved (e.g. before a crash) would be missing from it
+        if (
+            error_rate != self.error_rate
+            or saved_capacity < capacity
+            or records != self._records()
+        ):
+            return False
+        self._bloom = BloomFilter(saved_capacity, error_rate)
+        self._bloom.bits = bytearray(bits)
+        self._bloom.count = count
+        return True
+
+    def _save(self) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO bloom VALUES (1, ?, ?, ?, ?, ?)",
+            (
+                self._bloom.capacity,
+                self.error_rate,
+                self._records(),
+                self._bloom.count,
+                bytes(self._bloom.bits),
+            ),
+        )
+        self._db.commit()
+
+    def _rebuild(self, capacity: int) -> None:
+        (nations,) = self._db.execute(
+            "SELECT COUNT(DISTINCT nation) FROM recipients"
+        ).fetchone()
+        # Leave room to grow if it's already over capacity
+        if nations > capacity:
+            capacity = nations * 2
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for (nation,) in self._db.execute("SELECT DISTINCT nation FROM recipients"):
+            self._bloom.add(nation)
+
+    def _window(self, tgid: int) -> Optional[float]:
+        return self.windows.get(tgid, self.window)
+
+    def last_contacted(
+        self, nation: str, tgid: Optional[int] = None
+    ) -> Optional[float]:
+        """
+        Unix time a nation was last sent a telegram, or None if it never has been.
+
+        :param nation: Nation name
+        :param tgid: Only count this telegram template. If None, any template counts.
+        """
+        with self._lock:
+            if nation not in self._bloom:
+                return None
+            if tgid is None:
+                row = self._db.execute(
+                    "SELECT MAX(sent) FROM recipients WHERE nation = ?", (nation,)
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT sent FROM recipients WHERE nation = ? AND tgid = ?",
+                    (nation, tgid),
+                ).fetchone()
+            return row[0] if row is not None else None
+
+    def contacted(self, nation: str, tgid: int, now: Optional[float] = None) -> bool:
+        """
+        True if the nation shouldn't be sent telegram tgid yet, because it was sent it (or, within cross_window, any
+        telegram) too recently.
+        """
+        now = now if now is not None else time.time()
+        if self.cross_window:
+            last = self.last_contacted(nation)
+            if last is not None and now - last < self.cross_window:
+                return True
+        last = self.last_contacted(nation, tgid)
+        if last is None:
+            return False
+        window = self._window(tgid)
+        return window is None or now - last < window
+
+    def record(self, nation: str, tgid: int, when: Optional[float] = None) -> None:
+        """
+        Records that a nation has been sent telegram tgid.
+        """
+        when = when if when is not None else time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO recipients (nation, tgid, sent) VALUES (?, ?, ?) "
+                "ON CONFLICT (nation, tgid) DO UPDATE SET sent = excluded.sent",
+                (nation, tgid, when),
+            )
+            self._db.commit()
+            self._bloom.add(nation)
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild(self._bloom.capacity * 2)
+
+    def claim(self, nation: str, tgid: int) -> bool:
+        """
+        Records the nation as contacted with tgid, unless it already has been within its window.
+
+        :return: True if the nation may be sent the telegram
+        """
+        # Held across the check and the record, so two campaigns can't both claim the same nation
+        with self._claim_lock:
+            if self.contacted(nation, tgid):
+                return False
+            self._claims[(nation, tgid)] = self.last_contacted(nation, tgid)
+            if len(self._claims) > RELEASABLE_CLAIMS:
+                self._claims.popitem(last=False)
+            self.record(nation, tgid)
+            return True
+
+    def release(self, nation: str, tgid: int) -> bool:
+        """
+        Undoes a recent claim(), e.g. because the telegram couldn't be sent, so the nation can be claimed again.
+
+        :return: True if there was a claim to undo
+        """
+        with self._claim_lock:
+            try:
+                previous = self._claims.pop((nation, tgid))
+            except KeyError:
+                return False
+            with self._lock:
+                if previous is None:
+                    self._db.execute(
+                        "DELETE FROM recipients WHERE nation = ? AND tgid = ?",
+                        (nation, tgid),
+                    )
+                else:
+                    self._db.execute(
+                        "UPDATE recipients SET sent = ? WHERE nation = ? AND tgid = ?",
+                        (previous, nation, tgid),
+                    )
+                self._db.commit()
+            # The Bloom filter can't forget the nation, which only costs a database lookup for it from now on
+            return True
+
+    def prune(self, before: float) -> int:
+        """
+        Deletes records older than before, e.g. time.time() minus the longest window, to keep the database small.
+        The Bloom filter is rebuilt from what's left.
+
+        :return: Number of records deleted
+        """
+        with self._lock:
+            deleted = self._db.execute(
+                "DELETE FROM recipients WHERE sent < ?", (before,)
+            ).rowcount
+            self._db.commit()
+            self._rebuild(self._bloom.capacity)
+        return deleted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._records()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.path is not None:
+                self._save()
+            self._db.close()
@@ -0,0 +1,357 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from campaign.campaign import Campaign
+from campaign.registry import RecipientRegistry
+from campaign.validation import Validator
+
+# Weighted bin targeting. Campaigns on their own can only hand out their newest or oldest nation, and the scheduler
+# has no way to tell which campaign's nation deserves the next telegram. TargetPool collects candidates from every
+# campaign into bins, one per campaign, scores each from a few features (which campaign found it, how long ago, WA
+# membership, region, how many campaigns have found it) and hands each telegram slot the best candidate across all of
+# them.
+#
+# Scores decay exponentially with age. That keeps heaps usable even though scores change over time: every score
+# halves over the same half life, so the order between two candidates never changes, and the heaps can be keyed on
+# log2(weight) + found / half_life, which is fixed when the candidate is scored.
+
+
+class Candidate:
+    __slots__ = (
+        "nation",
+        "campaign",
+        "found",
+        "seen",
+        "wa",
+        "region",
+        "key",
+        "version",
+    )
+
+    def __init__(
+        self,
+        nation: str,
+        campaign: Campaign,
+        found: float,
+        wa: Optional[bool] = None,
+        region: Optional[str] = None,
+    ):
+        """
+        :param nation: Nation name
+        :param campaign: Campaign whose telegram the nation would be sent. If several campaigns found it, the one
+            that makes it score highest.
+        :param found: Unix time the nation was found (or the event that made it a target happened)
+        :param wa: Whether the nation is in the WA, None if unknown
+        :param region: Region the nation was found in, None if unknown
+        """
+        self.nation = nation
+        self.campaign = campaign
+        self.found = found
+        self.seen = 1
+        self.wa = wa
+        self.region = region
+        self.key = -math.inf
+        # bumped whenever the candidate is rescored, so older heap entries for it can be recognised and skipped
+        self.version = 0
+
+    def __repr__(self) -> str:
+        return f"Candidate({self.nation}, {self.campaign.name}, seen={self.seen})"
+
+
+class Scorer:
+    def __init__(
+        self,
+        campaigns: Optional[Dict[str, float]] = None,
+        half_life: float = 3600.0,
+        wa: float = 1.0,
+        regions: Optional[Dict[str, float]] = None,
+        seen: float = 0.0,
+        default: float = 1.0,
+    ):
+        """
+        Scores candidates as a product of weights: campaign * WA * region * (1 + seen * (sightings - 1)), halved every
+        half_life seconds since the candidate was found. A weight of 0 keeps a candidate from ever being drawn.
+
+        :param campaigns: Weight by campaign name
+        :param half_life: Seconds for a candidate's score to halve
+        :param wa: Weight for nations known to be in the WA
+        :param regions: Weight by region the nation was found in
+        :param seen: Extra weight for each additional campaign that found the nation
+        :param default: Weight of campaigns (and regions) not listed
+        """
+        if half_life <= 0:
+            raise ValueError("half_life must be positive")
+        self.campaigns = dict(campaigns or {})
+        self.half_life = half_life
+        self.wa = wa
+        self.regions = dict(regions or {})
+        self.seen = seen
+        self.default = default
+
+    def weight(self, candidate: Candidate) -> float:
+        """
+        The part of the score that doesn't depend on time.
+        """
+        weight = self.campaigns.get(candidate.campaign.name, self.default)
+        if candidate.wa:
+            weight *= self.wa
+        if candidate.region is not None:
+            weight *= self.regions.get(candidate.region, self.default)
+        return weight * (1 + self.seen * (candidate.seen - 1))
+
+    def score(self, candidate: Candidate, now: Optional[float] = None) -> float:
+        now = now if now is not None else time.time()
+        age = max(now - candidate.found, 0.0)
+        return self.weight(candidate) * 0.5 ** (age / self.half_life)
+
+    def key(self, candidate: Candidate) -> float:
+        """
+        Heap key: orders candidates exactly as score() would at any moment, but doesn't change as they age.
+        """
+        weight = self.weight(candidate)
+        if weight <= 0:
+            return -math.inf
+        return math.log2(weight) + candidate.found / self.half_life
+
+
+class TargetPool:
+    def __init__(
+        self,
+        scorer: Optional[Scorer] = None,
+        registry: Optional[RecipientRegistry] = None,
+        validator: Optional[Validator] = None,
+    ):
+        """
+        :param scorer: Scores candidates, defaults to Scorer()
+        :param registry: If set, candidates the registry refuses are skipped, and drawn ones are recorded in it. Call
+            release() for any whose telegram then isn't sent.
+        :param validator: If set, candidates that no longer exist or won't accept their campaign's telegram are skipped
+        """
+        self.scorer = scorer if scorer is not None else Scorer()
+        self.registry = registry
+        self.validator = validator
+        self._candidates: Dict[str, Candidate] = {}
+        # campaign name -> heap of (-key, -sequence, version, candidate)
+        self._bins: Dict[str, list] = {}
+        self._stale = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _push(self, candidate: Candidate) -> None:
+        candidate.version += 1
+        candidate.key = self.scorer.key(candidate)
+        if candidate.key == -math.inf:
+            # It can never be drawn, so don't keep it around either
+            if self._candidates.get(candidate.nation) is candidate:
+                del self._candidates[candidate.nation]
+            return
+        heap = self._bins.setdefault(candidate.campaign.name, [])
+        heapq.heappush(
+            heap,
+            (-candidate.key, -next(self._sequence), candidate.version, candidate),
+        )
+
+    def _live(self, entry: tuple) -> bool:
+        candidate = entry[3]
+        return (
+            entry[2] == candidate.version
+            and self._candidates.get(candidate.nation) is candidate
+        )
+
+    def _top(self, heap: list) -> Optional[tuple]:
+        # Entries for rescored or removed candidates are only dropped when they reach the top
+        while heap and not self._live(heap[0]):
+            heapq.heappop(heap)
+            self._stale -= 1
+        return heap[0] if heap else None
+
+    def _compact(self) -> None:
+        if self._stale <= len(self._candidates) + 64:
+            return
+        for name, heap in self._bins.items():
+            live = [entry for entry in heap if self._live(entry)]
+            heapq.heapify(live)
+            self._bins[name] = live
+        self._stale = 0
+
+    def add(
+        self,
+        campaign: Campaign,
+        nation: str,
+        found: Optional[float] = None,
+        wa: Optional[bool] = None,
+        region: Optional[str] = None,
+    ) -> Candidate:
+        """
+        Adds a candidate, or if it's already in the pool, counts another sighting and rescores it.
+
+        :param campaign: Campaign that found the nation
+        :param nation: Nation name
+        :param found: Unix time it was found, defaults to now
+        :param wa: Whether it's in the WA, defaults to campaign.wa_targets if that's set
+        :param region: Region it was found in, defaults to the campaign's region
+        """
+        found = found if found is not None else time.time()
+        if wa is None and campaign.wa_targets:
+            wa = True
+        if region is None:
+            region = campaign.search_params.get("region")
+        with self._lock:
+            candidate = self._candidates.get(nation)
+            if candidate is None:
+                candidate = Candidate(nation, campaign, found, wa, region)
+                self._candidates[nation] = candidate
+            else:
+                self._stale += 1
+                candidate.seen += 1
+                candidate.found = max(candidate.found, found)
+                candidate.wa = candidate.wa or wa
+                if candidate.region is None:
+                    candidate.region = region
+                # Send whichever campaign's telegram the nation scores highest under
+                current = self.scorer.weight(candidate)
+                previous = candidate.campaign
+                candidate.campaign = campaign
+                if self.scorer.weight(candidate) < current:
+                    candidate.campaign = previous
+            self._push(candidate)
+            self._compact()
+            return candidate
+
+    def collect(self, campaigns: Iterable[Campaign]) -> int:
+        """
+        Moves every nation queued in the campaigns' deques into the pool, keeping the time each was added.
+
+        :return: Number of nations moved
+        """
+        moved = 0
+        for campaign in campaigns:
+            while campaign.deque:
+                try:
+                    nation, found = campaign.deque.popleft_entry()
+                except IndexError:
+                    break
+                self.add(campaign, nation, found)
+                moved += 1
+        return moved
+
+    def _best(self, recruitment: Optional[bool]) -> Optional[tuple]:
+        best = None
+        for heap in self._bins.values():
+            entry = self._top(heap)
+            if entry is None:
+                continue
+            if (
+                recruitment is not None
+                and entry[3].campaign.is_recruitment != recruitment
+            ):
+                continue
+            if best is None or entry < best[1]:
+                best = (heap, entry)
+        return best
+
+    def peek(self, recruitment: Optional[bool] = None) -> Optional[Candidate]:
+        """
+        The candidate pop() would return, without removing it.
+        """
+        with self._lock:
+            best = self._best(recruitment)
+            return best[1][3] if best is not None else None
+
+    def upcoming(self, n: int = 5) -> List[str]:
+        """
+        The next n nations each bin would hand out, best first. For Validator.start(), so the nations about to be
+        drawn are checked ahead of time.
+        """
+        with self._lock:
+            nations = []
+            for heap in self._bins.values():
+                live = (entry for entry in heap if self._live(entry))
+                nations.extend(entry[3].nation for entry in heapq.nsmallest(n, live))
+            return nations
+
+    def pop(self, recruitment: Optional[bool] = None) -> Optional[Candidate]:
+        """
+        Removes and returns the highest scoring candidate. Candidates older than their campaign's max_age are dropped
+        on the way.
+
+        :param recruitment: Only draw from recruitment campaigns (True) or non-recruitment ones (False), to match
+            the kind of telegram slot that's free. None draws from all of them.
+        :return: Candidate, or None if there are none left
+        """
+        while True:
+            with self._lock:
+                best = self._best(recruitment)
+                if best is None:
+                    return None
+                heap, entry = best
+                heapq.heappop(heap)
+                candidate = entry[3]
+                del self._candidates[candidate.nation]
+            max_age = candidate.campaign.max_age
+            if max_age is not None and time.time() - candidate.found > max_age:
+                continue
+            if self.registry is not None and self.registry.contacted(
+                candidate.nation, candidate.campaign.tgid
+            ):
+                continue
+            if self.validator is not None and not self.validator.valid(
+                candidate.nation, candidate.campaign.is_recruitment
+            ):
+                continue
+            if self.registry is None or self.registry.claim(
+                candidate.nation, candidate.campaign.tgid
+            ):
+                return candidate
+
+    def release(self, candidate: Candidate) -> None:
+        """
+        Undoes the registry claim pop() made for a candidate whose telegram couldn't be sent.
+        """
+        if self.registry is not None:
+            self.registry.release(candidate.nation, candidate.campaign.tgid)
+
+    def put_back(self, candidate: Candidate) -> None:
+        """
+        Undoes pop() for a candidate whose telegram has to wait, e.g. because another sender took the telegram lane:
+        releases its registry claim and returns it to the pool as it was, still found when it was found. If the nation
+        has been added again since it was drawn, the newer candidate is kept instead.
+        """
+        self.release(candidate)
+        with self._lock:
+            if candidate.nation in self._candidates:
+                return
+            self._candidates[candidate.nation] = candidate
+            self._push(candidate)
+
+    def remove(self, nation: str) -> bool:
+        """
+        Drops a nation from the pool, e.g. because it has been telegrammed some other way.
+
+        :return: True if it was in the pool
+        """
+        with self._lock:
+            if self._candidates.pop(nation, None) is None:
+                return False
+            self._stale += 1
+            return True
+
+    def ranked(self, now: Optional[float] = None) -> List[tuple]:
+        """
+        Every candidate with its current score, best first. For inspecting the pool; O(n log n).
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            candidates = list(self._candidates.values())
+        scored = [(c, self.scorer.score(c, now)) for c in candidates]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored
+
+    def __contains__(self, nation: str) -> bool:
+        return nation in self._candidates
+
+    def __len__(self) -> int:
+        return len(self._candidates)
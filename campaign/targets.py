@@ -1,5 +1,13 @@
 from api import wrapper
-import re
+from campaign.events import (
+    ADMIT,
+    EJECT,
+    ENDORSE,
+    MOVE,
+    RESIGN,
+    WITHDRAW,
+    classify,
+)
 
 # This file contains a set of methods that can be used to identify campaign
 # targets for commonly used scenarios. Each returns a list of nation names.
@@ -44,11 +52,7 @@ def ejects(client: wrapper.Client, region: str = None) -> list:
             params={"q": "happenings", "filter": "eject", "view": f"region.{region}"}
         )
 
-    nations = []
-    for event in events:
-        nations.append(re.search(r"[\w-]+(?=@@ was)", event["text"]).group(0))
-
-    return nations
+    return [e.nation for e in classify(events) if e.kind == EJECT]
 
 
 def exits(client: wrapper.Client, region: str) -> list:
@@ -64,14 +68,13 @@ def exits(client: wrapper.Client, region: str) -> list:
         params={"q": "happenings", "filter": "move", "view": f"region.{region}"}
     )
 
-    nations = []
-    for event in events:
-        destination = re.search(r"[\w-]+(?=%%\.)", event["text"]).group(0)
-        source = re.search(r"[\w-]+(?=%% to)", event["text"]).group(0)
-        if source == region and destination != "the_rejected_realms":
-            nations.append(re.search(r"[\w-]+(?=@@ relo)", event["text"]).group(0))
-
-    return nations
+    return [
+        e.nation
+        for e in classify(events)
+        if e.kind == MOVE
+        and e.source == region
+        and e.destination != "the_rejected_realms"
+    ]
 
 
 def entrances(client: wrapper.Client, region: str) -> list:
@@ -87,13 +90,9 @@ def entrances(client: wrapper.Client, region: str) -> list:
         params={"q": "happenings", "filter": "move", "view": f"region.{region}"}
     )
 
-    nations = []
-    for event in events:
-        destination = re.search(r"[\w-]+(?=%%\.)", event["text"]).group(0)
-        if destination == region:
-            nations.append(re.search(r"[\w-]+(?=@@ relo)", event["text"]).group(0))
-
-    return nations
+    return [
+        e.nation for e in classify(events) if e.kind == MOVE and e.destination == region
+    ]
 
 
 def wa_join(client: wrapper.Client, region=None) -> list:
@@ -110,13 +109,7 @@ def wa_join(client: wrapper.Client, region=None) -> list:
             params={"q": "happenings", "filter": "member", "view": f"region.{region}"}
         )
 
-    nations = []
-    for event in events:
-        check = re.search(r"[\w-]+(?=@@ was admitted)", event["text"])
-        if check is not None:
-            nations.append(check.group(0))
-
-    return nations
+    return [e.nation for e in classify(events) if e.kind == ADMIT]
 
 
 def wa_resign(client: wrapper.Client, region: str = None) -> list:
@@ -135,13 +128,7 @@ def wa_resign(client: wrapper.Client, region: str = None) -> list:
             params={"q": "happenings", "filter": "member", "view": f"region.{region}"}
         )
 
-    nations = []
-    for event in events:
-        check = re.search(r"[\w-]+(?=@@ resigned)", event["text"])
-        if check is not None:
-            nations.append(check.group(0))
-
-    return nations
+    return [e.nation for e in classify(events) if e.kind == RESIGN]
 
 
 def wa_endorse(client: wrapper.Client, nation: str, region: str = None) -> list:
@@ -160,15 +147,9 @@ def wa_endorse(client: wrapper.Client, nation: str, region: str = None) -> list:
             params={"q": "happenings", "filter": "endo", "view": f"region.{region}"}
         )
 
-    nations = []
-    for event in events:
-        endorser = re.search(r"[\w-]+(?=@@ en)", event["text"])
-        endorsee = re.search(r"[\w-]+(?=@@\.)", event["text"])
-
-        if endorser is not None and endorsee.group(0) == nation:
-            nations.append(endorser.group(0))
-
-    return nations
+    return [
+        e.nation for e in classify(events) if e.kind == ENDORSE and e.target == nation
+    ]
 
 
 def wa_unendorse(client: wrapper.Client, nation: str, region: str = None) -> list:
@@ -187,15 +168,9 @@ def wa_unendorse(client: wrapper.Client, nation: str, region: str = None) -> lis
             params={"q": "happenings", "filter": "endo", "view": f"region.{region}"}
         )
 
-    nations = []
-    for event in events:
-        endorser = re.search(r"[\w-]+(?=@@ wi)", event["text"])
-        endorsee = re.search(r"[\w-]+(?=@@\.)", event["text"])
-
-        if endorser is not None and endorsee.group(0) == nation:
-            nations.append(endorser.group(0))
-
-    return nations
+    return [
+        e.nation for e in classify(events) if e.kind == WITHDRAW and e.target == nation
+    ]
 
 
 def endorsements(client: wrapper.Client, nation: str) -> list:
@@ -0,0 +1,125 @@
+from unittest import TestCase
+
+import campaign
+from campaign.bus import HappeningsBus
+from exceptions import TooManyRequests
+from testing import FakeClient, event, make_campaign
+
+
+class TestHappeningsBus(TestCase):
+    def test_fan_out(self):
+        handler = FakeClient(
+            [
+                event(1, "@@a@@ relocated from %%the_pacific%% to %%lazarus%%."),
+                event(2, "@@b@@ relocated from %%osiris%% to %%the_pacific%%."),
+                event(3, "@@c@@ was ejected from %%lazarus%% by @@x@@."),
+                event(4, "@@d@@ endorsed @@east_durthang@@."),
+                event(5, "@@e@@ was admitted to the World Assembly."),
+            ]
+        )
+        bus = HappeningsBus(handler)
+        exits = make_campaign(
+            campaign.Exits, "exits", search_params={"region": "the_pacific"}
+        )
+        entrances = make_campaign(
+            campaign.Entrances, "entrances", search_params={"region": "the_pacific"}
+        )
+        ejections = make_campaign(
+            campaign.Ejections, "ejections", search_params={"region": "lazarus"}
+        )
+        endos = make_campaign(
+            campaign.NewEndorsements, "endos", search_params={"nation": "east_durthang"}
+        )
+        admissions = make_campaign(
+            campaign.WorldAssemblyAdmissions, "wa", search_params={"region": "osiris"}
+        )
+        campaigns = (exits, entrances, ejections, endos, admissions)
+        for c in campaigns:
+            bus.subscribe(c)
+        for c in campaigns:
+            c.update_deque()
+
+        # world feed for the endorsements, one shared view for the regional campaigns, one for the WA campaign
+        self.assertEqual(len(handler.requests), 3)
+        views = {r.get("view"): r["filter"] for r in handler.requests}
+        self.assertEqual(
+            views,
+            {
+                None: "endo",
+                "region.lazarus,the_pacific": "eject+move",
+                "region.osiris": "member",
+            },
+        )
+
+        self.assertEqual(list(exits.deque), ["a"])
+        self.assertEqual(list(entrances.deque), ["b"])
+        self.assertEqual(list(ejections.deque), ["c"])
+        self.assertEqual(list(endos.deque), ["d"])
+        self.assertEqual(list(admissions.deque), ["e"])
+
+        # The next poll only asks for what's new
+        bus.poll()
+        self.assertEqual(handler.requests[-1]["sinceid"], 5)
+
+    def test_regrouping_doesnt_redeliver(self):
+        handler = FakeClient(
+            [event(1, "@@a@@ relocated from %%the_pacific%% to %%lazarus%%.")]
+        )
+        bus = HappeningsBus(handler)
+        exits = make_campaign(
+            campaign.Exits, "exits", search_params={"region": "the_pacific"}
+        )
+        bus.subscribe(exits)
+        bus.poll()
+
+        # A new region changes the shared view, which starts from the top of the feed again
+        bus.subscribe(
+            make_campaign(campaign.Exits, "exits2", search_params={"region": "lazarus"})
+        )
+        bus.poll()
+        self.assertEqual(handler.requests[-1]["view"], "region.lazarus,the_pacific")
+        self.assertNotIn("sinceid", handler.requests[-1])
+
+        exits.update_deque()
+        self.assertEqual(list(exits.deque), ["a"])
+
+    def test_full_page_catches_up(self):
+        handler = FakeClient([event(1, "@@a@@ was ejected from %%lazarus%% by @@x@@.")])
+        bus = HappeningsBus(handler, max_age=0, limit=2)
+        ejections = make_campaign(
+            campaign.Ejections, "ejections", search_params={"region": "lazarus"}
+        )
+        bus.subscribe(ejections)
+        ejections.update_deque()
+
+        # More happens between two polls than fits on a page
+        for i in range(2, 7):
+            handler.events.append(
+                event(i, f"@@n{i}@@ was ejected from %%lazarus%% by @@x@@.")
+            )
+        self.assertEqual(bus.poll(), 3)
+        ejections.update_deque()
+        self.assertEqual(list(ejections.deque), ["a", "n2", "n3", "n4", "n5", "n6"])
+
+    def test_ratelimited_poll(self):
+        handler = FakeClient([event(1, "@@a@@ was ejected from %%lazarus%% by @@x@@.")])
+        bus = HappeningsBus(handler, max_age=0, limit=2)
+        ejections = make_campaign(
+            campaign.Ejections, "ejections", search_params={"region": "lazarus"}
+        )
+        bus.subscribe(ejections)
+        bus.poll()
+        for i in range(2, 5):
+            handler.events.append(
+                event(i, f"@@n{i}@@ was ejected from %%lazarus%% by @@x@@.")
+            )
+
+        # A 429 partway through catching up publishes nothing and leaves the cursor alone
+        handler.errors[2] = "429"
+        with self.assertRaises(TooManyRequests):
+            bus.poll()
+        self.assertEqual(bus.cursors.get("bus|region.lazarus"), 1)
+
+        bus.poll()
+        ejections.update_deque()
+        self.assertEqual(list(ejections.deque), ["a", "n2", "n3", "n4"])
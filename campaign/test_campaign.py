@@ -1,16 +1,59 @@
-from unittest import TestCase
+import os
+import socket
+from unittest import SkipTest, TestCase
 
 import api
 import campaign
+from api.cassette import RecordingTransport, ReplayTransport
+from api.transport import PooledTransport
 
 # mediocre "unit tests" that I'm using to test each campaign and make sure their search functions work
 # if they don't work as behaved check their search_param arguments and see if they still make sense, since most
 # test cases are hardcoded to the pacific
 
+# Set HYPR_CASSETTE to a cassette file to run these offline, replaying a recording instead of hitting the live API.
+# With HYPR_RECORD=1 as well, they hit the live API and record to that file. See api.cassette.
+# Without HYPR_CASSETTE, a cassette recorded to campaign/cassettes/test_campaign.jsonl.gz is replayed if there is one.
+# Otherwise they go to the live API, and are skipped when it can't be reached.
+DEFAULT_CASSETTE = os.path.join(
+    os.path.dirname(__file__), "cassettes", "test_campaign.jsonl.gz"
+)
+CASSETTE = os.environ.get("HYPR_CASSETTE") or (
+    DEFAULT_CASSETTE if os.path.exists(DEFAULT_CASSETTE) else None
+)
+RECORD = bool(os.environ.get("HYPR_RECORD"))
+_transport = None
+
+
+def setUpModule():
+    if CASSETTE and not RECORD:
+        if not os.path.exists(CASSETTE):
+            raise SkipTest(f"No cassette at {CASSETTE}")
+        return
+    try:
+        socket.create_connection(("www.nationstates.net", 443), timeout=5).close()
+    except OSError as e:
+        raise SkipTest(f"NationStates can't be reached ({e}) and there's no cassette")
+
+
+def make_client() -> api.Client:
+    global _transport
+    if CASSETTE and _transport is None:
+        if RECORD:
+            _transport = RecordingTransport(PooledTransport(), CASSETTE)
+        else:
+            _transport = ReplayTransport(CASSETTE, speed=None)
+    return api.Client(useragent="HYPR Unit Tests - Khronion", transport=_transport)
+
+
+def tearDownModule():
+    if isinstance(_transport, RecordingTransport):
+        _transport.close()
+
 
 class TestNewlyFounded(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
         test_campaign = campaign.NewlyFounded(
             name="test",
             priority=0,
@@ -29,7 +72,7 @@ class TestNewlyFounded(TestCase):
 
 class TestResidents(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
         test_campaign = campaign.Residents(
             name="test",
             priority=0,
@@ -48,7 +91,7 @@ class TestResidents(TestCase):
 
 class TestEjections(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
         test_campaign = campaign.Ejections(
             name="test",
             priority=0,
@@ -67,7 +110,7 @@ class TestEjections(TestCase):
 
 class TestExits(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
         test_campaign = campaign.Exits(
             name="test",
             priority=0,
@@ -86,7 +129,7 @@ class TestExits(TestCase):
 
 class TestEntrances(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
         test_campaign = campaign.Entrances(
             name="test",
             priority=0,
@@ -105,7 +148,7 @@ class TestEntrances(TestCase):
 
 class TestWorldAssemblyAdmissions(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
         test_campaign = campaign.WorldAssemblyAdmissions(
             name="test",
             priority=0,
@@ -140,7 +183,7 @@ class TestWorldAssemblyAdmissions(TestCase):
 
 class TestWorldAssemblyResignations(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
         test_campaign = campaign.WorldAssemblyResignations(
             name="test",
             priority=0,
@@ -175,7 +218,7 @@ class TestWorldAssemblyResignations(TestCase):
 
 class TestNewEndorsements(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
 
         test_campaign = campaign.NewEndorsements(
             name="test",
@@ -196,7 +239,7 @@ class TestNewEndorsements(TestCase):
 
 class TestNewWithdrawnEndorsements(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
 
         test_campaign = campaign.NewWithdrawnEndorsements(
             name="test",
@@ -217,7 +260,7 @@ class TestNewWithdrawnEndorsements(TestCase):
 
 class TestEndorsements(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
 
         test_campaign = campaign.Endorsements(
             name="test",
@@ -240,7 +283,7 @@ class TestEndorsements(TestCase):
 
 class TestWorldAssemblyDelegates(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
 
         test_campaign = campaign.WorldAssemblyDelegates(
             name="test",
@@ -261,7 +304,7 @@ class TestWorldAssemblyDelegates(TestCase):
 
 class TestWorldAssemblyMembers(TestCase):
     def test__search(self):
-        api_handler = api.Client(useragent="HYPR Unit Tests - Khronion")
+        api_handler = make_client()
 
         test_campaign = campaign.WorldAssemblyMembers(
             name="test",
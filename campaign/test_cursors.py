@@ -0,0 +1,176 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+import campaign
+from campaign.cursors import CursorStore
+from exceptions import TooManyRequests
+from testing import FakeClient, make_campaign
+
+
+def move(
+    event_id: int, nation: str, source: str, destination: str, timestamp: int = 0
+) -> dict:
+    return {
+        "event_id": str(event_id),
+        "timestamp": str(timestamp),
+        "text": f"@@{nation}@@ relocated from %%{source}%% to %%{destination}%%.",
+    }
+
+
+class TestCursorStore(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_persists(self):
+        cursors = CursorStore(self.path)
+        cursors.advance("feed", 10)
+        # Cursors never move backwards
+        cursors.advance("feed", 5)
+        self.assertEqual(CursorStore(self.path).get("feed"), 10)
+
+        cursors.reset("feed")
+        self.assertIsNone(CursorStore(self.path).get("feed"))
+
+    def test_campaign_polls_since_cursor(self):
+        handler = FakeClient(
+            [
+                move(1, "a", "the_pacific", "lazarus"),
+                move(2, "b", "lazarus", "the_pacific"),
+            ]
+        )
+        test_campaign = campaign.Exits(
+            name="test",
+            priority=0,
+            tgid=0,
+            secret_key="test_key",
+            recruitment=False,
+            handler=handler,
+            search_params={"region": "the_pacific"},
+            cursors=CursorStore(self.path),
+        )
+        test_campaign.update_deque()
+        self.assertNotIn("sinceid", handler.requests[0])
+        self.assertEqual(list(test_campaign.deque), ["a"])
+
+        # A restarted campaign only asks for, and only sees, events it hasn't processed yet
+        handler.events.append(move(3, "c", "the_pacific", "lazarus"))
+        test_campaign.cursors = CursorStore(self.path)
+        test_campaign.update_deque()
+        self.assertEqual(handler.requests[1]["sinceid"], 2)
+        self.assertEqual(list(test_campaign.deque), ["a", "c"])
+
+    def test_page_queued_oldest_first(self):
+        now = int(time.time())
+        handler = FakeClient(
+            [
+                move(1, "oldest", "the_pacific", "lazarus", now - 50),
+                move(2, "middle", "the_pacific", "lazarus", now - 30),
+                move(3, "newest", "the_pacific", "lazarus", now),
+            ]
+        )
+        test_campaign = campaign.Exits(
+            name="test",
+            priority=0,
+            tgid=0,
+            secret_key="test_key",
+            recruitment=False,
+            handler=handler,
+            search_params={"region": "the_pacific"},
+            max_age=3600,
+        )
+        # The page comes back newest first
+        test_campaign.update_deque()
+        self.assertEqual(list(test_campaign.deque), ["oldest", "middle", "newest"])
+
+        # Stale entries sit at the oldest end, so they're dropped without being popped
+        test_campaign.deque.max_age = 40
+        handler.events.append(move(4, "later", "the_pacific", "lazarus", now))
+        test_campaign.update_deque()
+        self.assertEqual(list(test_campaign.deque), ["middle", "newest", "later"])
+        self.assertEqual(test_campaign.deque.expired, 1)
+
+        self.assertEqual(test_campaign.nation, "later")
+        self.assertEqual(test_campaign.nation, "newest")
+
+    def test_full_page_catches_up(self):
+        handler = FakeClient([move(1, "old", "the_pacific", "lazarus")])
+        test_campaign = campaign.Exits(
+            name="test",
+            priority=0,
+            tgid=0,
+            secret_key="test_key",
+            recruitment=False,
+            handler=handler,
+            search_params={"region": "the_pacific"},
+        )
+        test_campaign.limit = 2
+        test_campaign.update_deque()
+
+        # More happens between two searches than fits on a page
+        for event_id in range(2, 7):
+            handler.events.append(move(event_id, f"n{event_id}", "the_pacific", "x"))
+        handler.requests.clear()
+        test_campaign.update_deque()
+
+        self.assertEqual([r.get("beforeid") for r in handler.requests], [None, 5, 3])
+        self.assertEqual(
+            list(test_campaign.deque), ["old", "n2", "n3", "n4", "n5", "n6"]
+        )
+        self.assertEqual(test_campaign.cursors.get(test_campaign.cursor_key), 6)
+
+    def test_ratelimited_catch_up(self):
+        handler = FakeClient([move(1, "old", "the_pacific", "lazarus")])
+        test_campaign = make_campaign(
+            campaign.Exits, handler=handler, search_params={"region": "the_pacific"}
+        )
+        test_campaign.limit = 2
+        test_campaign.update_deque()
+        for event_id in range(2, 7):
+            handler.events.append(move(event_id, f"n{event_id}", "the_pacific", "x"))
+
+        # The second page of the catch-up is answered with a 429
+        handler.errors[2] = "429"
+        with self.assertRaises(TooManyRequests):
+            test_campaign.update_deque()
+        self.assertEqual(list(test_campaign.deque), ["old"])
+        self.assertEqual(test_campaign.cursors.get(test_campaign.cursor_key), 1)
+
+        # Nothing was lost: the retry picks up every event
+        test_campaign.update_deque()
+        self.assertEqual(
+            list(test_campaign.deque), ["old", "n2", "n3", "n4", "n5", "n6"]
+        )
+
+    def test_backfill(self):
+        handler = FakeClient([move(1, "old", "the_pacific", "lazarus")])
+        test_campaign = campaign.Exits(
+            name="test",
+            priority=0,
+            tgid=0,
+            secret_key="test_key",
+            recruitment=False,
+            handler=handler,
+            search_params={"region": "the_pacific"},
+        )
+        test_campaign.update_deque()
+
+        # HYPR goes down for a while, and more events happen than fit on one page
+        for event_id in range(2, 8):
+            handler.events.append(move(event_id, f"n{event_id}", "the_pacific", "x"))
+        handler.requests.clear()
+        self.assertEqual(test_campaign.backfill(limit=2), 6)
+
+        self.assertEqual(len(handler.requests), 4)
+        self.assertEqual(handler.requests[1]["beforeid"], 6)
+        self.assertEqual(
+            list(test_campaign.deque), ["old", "n2", "n3", "n4", "n5", "n6", "n7"]
+        )
+        self.assertEqual(test_campaign.cursors.get(test_campaign.cursor_key), 7)
@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+import campaign
+from campaign.events import classify, classify_one
+from testing import event, make_campaign
+
+
+class TestClassify(TestCase):
+    def test_kinds(self):
+        events = classify(
+            [
+                event(1, "@@a@@ relocated from %%lazarus%% to %%the_pacific%%."),
+                event(2, "@@b@@ was ejected from %%the_pacific%% by @@c@@."),
+                event(
+                    3,
+                    "@@d@@ was ejected and banned from %%the_north_pacific%% by @@e@@.",
+                ),
+                event(4, "@@f@@ was admitted to the World Assembly."),
+                event(5, "@@g@@ resigned from the World Assembly."),
+                event(6, "@@h@@ endorsed @@i@@."),
+                event(7, "@@j@@ withdrew its endorsement from @@k@@."),
+                event(8, "@@l@@ was founded in %%the_rejected_realms%%."),
+                event(9, "@@m@@ was refounded in %%lazarus%%."),
+            ]
+        )
+
+        self.assertEqual(
+            [e.kind for e in events],
+            [
+                "move",
+                "eject",
+                "eject",
+                "admit",
+                "resign",
+                "endorse",
+                "withdraw",
+                "found",
+                "refound",
+            ],
+        )
+        self.assertEqual(
+            (events[0].source, events[0].destination), ("lazarus", "the_pacific")
+        )
+        self.assertEqual((events[1].nation, events[1].region), ("b", "the_pacific"))
+        self.assertEqual(events[2].region, "the_north_pacific")
+        self.assertEqual((events[5].nation, events[5].target), ("h", "i"))
+        self.assertEqual((events[6].nation, events[6].target), ("j", "k"))
+        self.assertEqual(events[8].region, "lazarus")
+        self.assertEqual((events[0].event_id, events[0].timestamp), (1, 1700000000))
+
+    def test_unknown_text(self):
+        # Used to crash Exits with an AttributeError
+        self.assertIsNone(
+            classify_one(event(1, "@@a@@ applied to join the World Assembly."))
+        )
+        self.assertEqual(classify([event(1, "The World Assembly adjourned.")]), [])
+
+
+class TestRegionMatching(TestCase):
+    def test_region_spelling(self):
+        # Regions can be configured the way they're displayed; happenings use ids
+        ejected, moved = classify(
+            [
+                event(1, "@@a@@ was ejected from %%the_pacific%% by @@c@@."),
+                event(2, "@@b@@ relocated from %%lazarus%% to %%the_pacific%%."),
+            ]
+        )
+        for cls, e in ((campaign.Ejections, ejected), (campaign.Entrances, moved)):
+            test_campaign = cls(
+                name="test",
+                priority=0,
+                tgid=0,
+                secret_key="test_key",
+                recruitment=False,
+                handler=None,
+                search_params={"region": "The Pacific"},
+            )
+            self.assertEqual(test_campaign.region, "the_pacific")
+            self.assertTrue(test_campaign.accept(e))
+
+    def test_nation_spelling(self):
+        endorsed, withdrawn = classify(
+            [
+                event(1, "@@a@@ endorsed @@test_landia@@."),
+                event(2, "@@b@@ withdrew its endorsement from @@test_landia@@."),
+            ]
+        )
+        for spelling in ("Test Landia", "test_landia", " TEST_LANDIA "):
+            params = {"nation": spelling}
+            endos = make_campaign(campaign.NewEndorsements, search_params=params)
+            withdrawals = make_campaign(
+                campaign.NewWithdrawnEndorsements, search_params=params
+            )
+            self.assertTrue(endos.accept(endorsed))
+            self.assertTrue(withdrawals.accept(withdrawn))
+            self.assertFalse(endos.accept(withdrawn))
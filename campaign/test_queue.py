@@ -0,0 +1,184 @@
+import time
+from unittest import TestCase
+
+import campaign
+from campaign.queue import DROP_NEWEST, ERROR, RecipientQueue
+from exceptions import QueueFull
+from testing import make_campaign
+
+
+class TestRecipientQueue(TestCase):
+    def test_dedup(self):
+        queue = RecipientQueue()
+        self.assertEqual(queue.extend(["a", "b", "a", "c", "b"]), 3)
+
+        self.assertEqual(list(queue), ["a", "b", "c"])
+        self.assertIn("b", queue)
+        self.assertNotIn("d", queue)
+
+    def test_peek(self):
+        queue = RecipientQueue()
+        queue.extend(["a", "b", "c"])
+
+        self.assertEqual(queue.peek(2), ["c", "b"])
+        self.assertEqual(queue.peek(5, newest=False), ["a", "b", "c"])
+        self.assertEqual(len(queue), 3)
+
+    def test_refresh(self):
+        queue = RecipientQueue(refresh=True)
+        queue.append("a", when=1)
+        queue.append("b", when=2)
+        queue.append("a", when=3)
+
+        self.assertEqual(list(queue), ["b", "a"])
+        self.assertEqual(queue.timestamp("a"), 3)
+
+    def test_timestamps(self):
+        queue = RecipientQueue()
+        queue.append("a", when=1)
+        queue.append("a", when=5)
+        queue.append("b", when=2)
+
+        self.assertEqual(queue.timestamp("a"), 1)
+        self.assertEqual(queue.pop_entry(), ("b", 2))
+        self.assertEqual(queue.popleft_entry(), ("a", 1))
+        with self.assertRaises(IndexError):
+            queue.pop()
+
+    def test_remove(self):
+        queue = RecipientQueue(["a", "b", "c"])
+        queue.remove("b")
+        self.assertFalse(queue.discard("b"))
+        with self.assertRaises(ValueError):
+            queue.remove("b")
+
+        self.assertEqual(list(queue), ["a", "c"])
+        self.assertEqual((queue[0], queue[-1]), ("a", "c"))
+
+    def test_drop_oldest(self):
+        queue = RecipientQueue(["a", "b", "c"], maxlen=3)
+        queue.append("d")
+        # Adding at the oldest end of a full queue drops the new nation
+        queue.appendleft("z")
+
+        self.assertEqual(list(queue), ["b", "c", "d"])
+
+    def test_drop_newest(self):
+        queue = RecipientQueue(["a", "b"], maxlen=2, overflow=DROP_NEWEST)
+        self.assertFalse(queue.append("c"))
+
+        self.assertEqual(list(queue), ["a", "b"])
+
+    def test_error(self):
+        queue = RecipientQueue(["a"], maxlen=1, overflow=ERROR)
+        # Already queued, so not an overflow
+        queue.append("a")
+        with self.assertRaises(QueueFull):
+            queue.append("b")
+
+    def test_extendleft(self):
+        queue = RecipientQueue(["c"])
+        queue.extendleft(["b", "a"])
+
+        self.assertEqual(list(queue), ["a", "b", "c"])
+
+    def test_max_age(self):
+        now = time.time()
+        queue = RecipientQueue(max_age=60)
+        # Too old to be queued at all
+        self.assertEqual(queue.extend([("a", now - 120), ("b", now - 50)]), 1)
+        self.assertFalse(queue.append("c", when=now - 61))
+
+        # Entries going stale while queued
+        queue.extend([("c", now - 55), ("d", now - 10), ("f", now - 50), ("e", now)])
+        queue.max_age = 45
+        # "b" and "c" go from the oldest end as soon as the queue is touched, "f" only once it's reached
+        self.assertEqual(queue.peek(4), ["e", "d"])
+        self.assertEqual(queue.pop_entry(), ("e", now))
+        self.assertEqual(queue.expired, 2)
+        self.assertEqual(list(queue), ["d", "f"])
+        self.assertEqual(queue.pop(), "d")
+        self.assertEqual(queue.expired, 3)
+        self.assertEqual(len(queue), 0)
+
+    def test_no_max_age(self):
+        queue = RecipientQueue()
+        queue.extend([("a", 0), "b"])
+        self.assertEqual(queue.popleft_entry(), ("a", 0))
+        self.assertEqual(queue.pop(), "b")
+
+
+class TestCampaignQueue(TestCase):
+    def make(
+        self, reverse: bool, cls=campaign.NewlyFounded, **kwargs
+    ) -> campaign.Campaign:
+        test_campaign = make_campaign(cls, **kwargs)
+        test_campaign.reverse = reverse
+        return test_campaign
+
+    def test_newest_first(self):
+        test_campaign = self.make(reverse=False)
+        test_campaign._add(["a", "b"])
+        test_campaign._add(["b", "c"])
+
+        self.assertEqual(
+            [test_campaign.nation for _ in range(3)],
+            ["c", "b", "a"],
+        )
+
+    def test_reverse_oldest_first(self):
+        test_campaign = self.make(reverse=True)
+        test_campaign._add(["a", "b"])
+        test_campaign._add(["b", "c"])
+
+        self.assertEqual(
+            [test_campaign.nation for _ in range(3)],
+            ["a", "b", "c"],
+        )
+
+    def test_reverse_overflow_drops_oldest(self):
+        test_campaign = self.make(reverse=True)
+        test_campaign._add([f"nation_{i}" for i in range(500)])
+
+        self.assertEqual(len(test_campaign.deque), 480)
+        self.assertEqual(test_campaign.nation, "nation_20")
+
+    def test_event_timestamps(self):
+        test_campaign = self.make(False, campaign.Ejections, max_age=3600)
+        now = int(time.time())
+        events = [
+            {
+                "event_id": str(i),
+                "timestamp": str(when),
+                "text": f"@@{name}@@ was ejected from %%the_pacific%% by @@admin@@.",
+            }
+            for i, (name, when) in enumerate(
+                [("cold", now - 6 * 3600), ("warm", now - 60), ("hot", now - 1)]
+            )
+        ]
+        self.assertEqual(test_campaign._add(test_campaign._extract(events)), 2)
+
+        self.assertEqual(test_campaign.deque.timestamp("warm"), now - 60)
+        self.assertEqual(test_campaign.nation, "hot")
+        self.assertEqual(test_campaign.nation, "warm")
+
+    def test_put_back(self):
+        now = time.time()
+        for reverse, end in ((False, "c"), (True, "a")):
+            test_campaign = self.make(reverse, max_age=3600)
+            test_campaign._add([("a", now - 120), ("b", now - 60), ("c", now - 30)])
+
+            nation, found = test_campaign.take()
+            self.assertEqual(nation, end)
+            test_campaign.put_back(nation, found)
+            # Same end, same timestamp
+            self.assertEqual(test_campaign.deque.timestamp(end), found)
+            self.assertEqual(test_campaign.nation, end)
+
+        # Still expires from when it was found
+        test_campaign = self.make(False, max_age=60)
+        test_campaign._add([("a", now - 50)])
+        nation, found = test_campaign.take()
+        test_campaign.deque.max_age = 30
+        test_campaign.put_back(nation, found)
+        self.assertEqual(len(test_campaign.deque), 0)
@@ -0,0 +1,150 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import campaign
+from campaign.registry import BloomFilter, RecipientRegistry
+from testing import make_campaign
+
+
+class TestBloomFilter(TestCase):
+    def test_membership(self):
+        bloom = BloomFilter(10000, 0.01)
+        for i in range(10000):
+            bloom.add(f"nation_{i}")
+
+        self.assertTrue(all(f"nation_{i}" in bloom for i in range(10000)))
+        false_positives = sum(f"other_{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TestRecipientRegistry(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "registry.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_window(self):
+        registry = RecipientRegistry(window=60, windows={2: None})
+        registry.record("testlandia", 1, when=1000)
+        registry.record("testlandia", 2, when=1000)
+
+        self.assertTrue(registry.contacted("testlandia", 1, now=1030))
+        self.assertFalse(registry.contacted("testlandia", 1, now=1061))
+        # tgid 2 never re-contacts
+        self.assertTrue(registry.contacted("testlandia", 2, now=10**9))
+        # a different telegram is fine without a cross window
+        self.assertFalse(registry.contacted("testlandia", 3, now=1030))
+        self.assertFalse(registry.contacted("maxtopia", 1, now=1030))
+
+    def test_cross_window(self):
+        registry = RecipientRegistry(cross_window=3600)
+        registry.record("testlandia", 1, when=1000)
+
+        self.assertTrue(registry.contacted("testlandia", 2, now=2000))
+        self.assertFalse(registry.contacted("testlandia", 2, now=5000))
+
+    def test_claim(self):
+        registry = RecipientRegistry()
+        self.assertTrue(registry.claim("testlandia", 1))
+        self.assertFalse(registry.claim("testlandia", 1))
+        self.assertTrue(registry.claim("testlandia", 2))
+        self.assertEqual(len(registry), 2)
+
+    def test_release(self):
+        registry = RecipientRegistry(window=60)
+        self.assertTrue(registry.claim("testlandia", 1))
+        self.assertTrue(registry.release("testlandia", 1))
+        self.assertIsNone(registry.last_contacted("testlandia"))
+        self.assertTrue(registry.claim("testlandia", 1))
+        # Only claims can be released
+        registry.record("maxtopia", 1, when=1000)
+        self.assertFalse(registry.release("maxtopia", 1))
+
+        # Releasing a repeat claim goes back to the earlier send
+        self.assertTrue(registry.claim("maxtopia", 1))
+        self.assertTrue(registry.release("maxtopia", 1))
+        self.assertEqual(registry.last_contacted("maxtopia", 1), 1000)
+        self.assertFalse(registry.release("maxtopia", 1))
+
+    def test_persistence(self):
+        registry = RecipientRegistry(self.path)
+        registry.record("testlandia", 1)
+        registry.close()
+
+        registry = RecipientRegistry(self.path)
+        self.assertTrue(registry.contacted("testlandia", 1))
+        self.assertFalse(registry.contacted("maxtopia", 1))
+        registry.close()
+
+    def test_saved_bloom(self):
+        registry = RecipientRegistry(self.path)
+        registry.record("testlandia", 1)
+        registry.close()
+
+        registry = RecipientRegistry(self.path)
+        self.assertTrue(registry._load(registry._bloom.capacity))
+        # Recorded without a clean close, so the saved filter is out of date
+        registry.record("maxtopia", 1)
+        registry._db.close()
+
+        registry = RecipientRegistry(self.path)
+        self.assertFalse(registry._load(registry._bloom.capacity))
+        self.assertTrue(registry.contacted("maxtopia", 1))
+        registry.close()
+
+    def test_grows(self):
+        registry = RecipientRegistry(capacity=10)
+        for i in range(100):
+            registry.record(f"nation_{i}", 1)
+
+        self.assertGreaterEqual(registry._bloom.capacity, 100)
+        self.assertTrue(all(registry.contacted(f"nation_{i}", 1) for i in range(100)))
+
+    def test_prune(self):
+        registry = RecipientRegistry()
+        registry.record("testlandia", 1, when=1000)
+        registry.record("maxtopia", 1, when=5000)
+
+        self.assertEqual(registry.prune(before=2000), 1)
+        self.assertFalse(registry.contacted("testlandia", 1))
+        self.assertTrue(registry.contacted("maxtopia", 1))
+
+
+class TestCampaignRegistry(TestCase):
+    def test_shared_between_campaigns(self):
+        registry = RecipientRegistry()
+        founded = make_campaign(campaign.NewlyFounded, registry=registry)
+        entrances = make_campaign(
+            campaign.Entrances,
+            registry=registry,
+            search_params={"region": "the_pacific"},
+        )
+        founded.deque.extend(["testlandia", "maxtopia"])
+        entrances.deque.extend(["maxtopia", "testlandia"])
+
+        self.assertEqual(founded.nation, "maxtopia")
+        # maxtopia has already been claimed, so entrances skips it
+        self.assertEqual(entrances.nation, "testlandia")
+        with self.assertRaises(IndexError):
+            entrances.nation
+
+    def test_release_failed_send(self):
+        registry = RecipientRegistry()
+        founded = make_campaign(campaign.NewlyFounded, registry=registry)
+        founded.deque.append("testlandia")
+        # e.g. send_telegram raised, or sendTG didn't queue it
+        founded.release(founded.nation)
+
+        founded.deque.append("testlandia")
+        self.assertEqual(founded.nation, "testlandia")
+
+    def test_no_registry(self):
+        founded = make_campaign(campaign.NewlyFounded)
+        founded.deque.extend(["testlandia", "maxtopia"])
+
+        self.assertEqual(founded.nation, "maxtopia")
+        founded.deque.append("maxtopia")
+        self.assertEqual(founded.nation, "maxtopia")
@@ -0,0 +1,180 @@
+import random
+import time
+from unittest import TestCase
+
+import campaign
+from campaign.registry import RecipientRegistry
+from campaign.targeting import Scorer, TargetPool
+from testing import make_campaign
+
+
+class TestScorer(TestCase):
+    def test_key_matches_score(self):
+        # Ordering by key must agree with ordering by score at any moment
+        rng = random.Random(0)
+        founded = make_campaign(campaign.NewlyFounded, "founded")
+        admissions = make_campaign(campaign.WorldAssemblyAdmissions, "admissions")
+        scorer = Scorer({"founded": 1, "admissions": 3}, half_life=600, wa=2)
+        pool = TargetPool(scorer)
+        candidates = [
+            pool.add(
+                rng.choice([founded, admissions]),
+                f"nation_{i}",
+                found=1000 + rng.uniform(0, 3600),
+            )
+            for i in range(200)
+        ]
+
+        for now in (5000, 50000):
+            by_score = sorted(candidates, key=lambda c: scorer.score(c, now))
+            by_key = sorted(candidates, key=lambda c: c.key)
+            self.assertEqual(by_score, by_key)
+
+    def test_weights(self):
+        exits = make_campaign(
+            campaign.Exits, "exits", search_params={"region": "the_pacific"}
+        )
+        scorer = Scorer(
+            {"exits": 2}, half_life=100, regions={"the_pacific": 5}, seen=0.5
+        )
+        pool = TargetPool(scorer)
+        candidate = pool.add(exits, "testlandia", found=0)
+        self.assertAlmostEqual(scorer.score(candidate, now=0), 10)
+        self.assertAlmostEqual(scorer.score(candidate, now=100), 5)
+
+        pool.add(exits, "testlandia", found=0)
+        self.assertAlmostEqual(scorer.score(candidate, now=0), 15)
+
+
+class TestTargetPool(TestCase):
+    def setUp(self):
+        self.founded = make_campaign(campaign.NewlyFounded, "founded", tgid=1)
+        self.entrances = make_campaign(
+            campaign.Entrances,
+            "entrances",
+            tgid=2,
+            search_params={"region": "the_pacific"},
+        )
+        self.endorsers = make_campaign(
+            campaign.NewEndorsements,
+            "endorsers",
+            tgid=3,
+            recruitment=False,
+            search_params={"nation": "testlandia"},
+        )
+
+    def test_best_across_campaigns(self):
+        pool = TargetPool(Scorer({"founded": 1, "entrances": 4}, half_life=60))
+        pool.add(self.founded, "a", found=1000)
+        pool.add(self.entrances, "b", found=1000 - 60)
+        pool.add(self.founded, "c", found=1000 - 30)
+        pool.add(self.entrances, "d", found=1000 - 180)
+
+        # b: 4 * 1/2, a: 1, c: 1/sqrt(2), d: 4 * 1/8
+        self.assertEqual([pool.pop().nation for _ in range(4)], ["b", "a", "c", "d"])
+        self.assertIsNone(pool.pop())
+
+    def test_seen_twice(self):
+        pool = TargetPool(Scorer({"founded": 1, "entrances": 2}, seen=1))
+        pool.add(self.founded, "a", found=1000)
+        pool.add(self.founded, "b", found=1000)
+        pool.add(self.entrances, "a", found=1000)
+
+        self.assertEqual(len(pool), 2)
+        best = pool.pop()
+        self.assertEqual(best.nation, "a")
+        self.assertEqual(best.seen, 2)
+        # Sent the telegram of the campaign it scores highest under
+        self.assertIs(best.campaign, self.entrances)
+        self.assertEqual(pool.pop().nation, "b")
+        self.assertIsNone(pool.pop())
+
+    def test_wa_weight(self):
+        pool = TargetPool(Scorer(wa=3))
+        pool.add(self.founded, "a", found=1000)
+        pool.add(self.endorsers, "b", found=1000 - 3600)
+
+        self.assertTrue(pool.peek().wa)
+        self.assertEqual(pool.pop().nation, "b")
+
+    def test_recruitment_slots(self):
+        pool = TargetPool(Scorer({"endorsers": 10}))
+        pool.add(self.founded, "a", found=1000)
+        pool.add(self.endorsers, "b", found=1000)
+
+        self.assertEqual(pool.pop(recruitment=True).nation, "a")
+        self.assertIsNone(pool.pop(recruitment=True))
+        self.assertEqual(pool.pop(recruitment=False).nation, "b")
+
+    def test_zero_weight_never_drawn(self):
+        pool = TargetPool(Scorer({"founded": 0}))
+        pool.add(self.founded, "a")
+
+        self.assertNotIn("a", pool)
+        self.assertIsNone(pool.pop())
+
+    def test_max_age(self):
+        founded = make_campaign(campaign.NewlyFounded, "founded", max_age=60)
+        pool = TargetPool()
+        pool.add(founded, "a", found=time.time() - 120)
+        pool.add(founded, "b", found=time.time() - 30)
+
+        self.assertEqual(pool.pop().nation, "b")
+        self.assertIsNone(pool.pop())
+
+    def test_remove(self):
+        pool = TargetPool()
+        pool.add(self.founded, "a", found=2000)
+        pool.add(self.founded, "b", found=1000)
+        self.assertTrue(pool.remove("a"))
+
+        self.assertNotIn("a", pool)
+        self.assertEqual(pool.pop().nation, "b")
+
+    def test_collect(self):
+        self.founded.deque.extend(["a", "b"], when=1000)
+        self.entrances.deque.append("c", when=2000)
+        pool = TargetPool()
+
+        self.assertEqual(pool.collect([self.founded, self.entrances]), 3)
+        self.assertEqual(len(self.founded.deque), 0)
+        self.assertEqual(pool.pop().nation, "c")
+
+    def test_registry(self):
+        registry = RecipientRegistry()
+        registry.record("a", 1)
+        pool = TargetPool(registry=registry)
+        pool.add(self.founded, "a", found=2000)
+        pool.add(self.founded, "b", found=1000)
+
+        self.assertEqual(pool.pop().nation, "b")
+        self.assertTrue(registry.contacted("b", 1))
+        self.assertIsNone(pool.pop())
+
+        # The telegram to b failed
+        pool.release(pool.add(self.founded, "b", found=1000))
+        self.assertFalse(registry.contacted("b", 1))
+
+    def test_put_back(self):
+        registry = RecipientRegistry()
+        pool = TargetPool(registry=registry)
+        pool.add(self.founded, "a", found=2000)
+        pool.add(self.founded, "b", found=1000)
+
+        # The lane was taken before a could be sent its telegram
+        candidate = pool.pop()
+        pool.put_back(candidate)
+        self.assertFalse(registry.contacted("a", 1))
+        again = pool.pop()
+        self.assertIs(again, candidate)
+        self.assertEqual(again.found, 2000)
+        self.assertEqual(pool.pop().nation, "b")
+
+    def test_compaction(self):
+        pool = TargetPool()
+        for i in range(1000):
+            pool.add(self.founded, "a", found=i)
+
+        self.assertLess(sum(len(heap) for heap in pool._bins.values()), 200)
+        self.assertEqual(pool.pop().nation, "a")
+        self.assertIsNone(pool.pop())
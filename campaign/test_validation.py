@@ -0,0 +1,136 @@
+from unittest import TestCase
+
+import api
+import campaign
+from api.transport import PooledTransport
+from campaign.registry import RecipientRegistry
+from campaign.targeting import TargetPool
+from campaign.validation import CANNOT_RECRUIT, MISSING, VALID, Validator
+from tools.simulator import Simulator, World
+from testing import make_campaign
+
+
+class ValidatorTestCase(TestCase):
+    def setUp(self):
+        api.Client.request.reset()
+        self.world = World(nations=50)
+        self.world.no_recruit.update({"sim_nation_2", "sim_nation_3"})
+        self.simulator = Simulator(self.world)
+        self.transport = PooledTransport(base_url=self.simulator.start())
+        self.client = api.Client("HYPR Unit Tests", transport=self.transport)
+        self.validator = Validator(self.client, reserve=5)
+
+    def tearDown(self):
+        self.validator.stop()
+        self.transport.close()
+        self.simulator.stop()
+        api.Client.request.reset()
+
+    def make_campaign(self, **kwargs) -> campaign.Campaign:
+        return make_campaign(
+            campaign.NewlyFounded,
+            handler=self.client,
+            validator=self.validator,
+            **kwargs,
+        )
+
+
+class TestValidator(ValidatorTestCase):
+    def test_check(self):
+        self.assertEqual(self.validator.check("sim_nation_1"), VALID)
+        self.assertEqual(self.validator.check("sim_nation_2"), CANNOT_RECRUIT)
+        self.assertEqual(self.validator.check("ceased_to_exist"), MISSING)
+
+        # Answered from the cache from now on
+        requests = self.simulator.stats["requests"]
+        self.assertFalse(self.validator.valid("ceased_to_exist"))
+        self.assertFalse(self.validator.valid("sim_nation_2"))
+        # Can't be recruited, but can still be sent other telegrams
+        self.assertTrue(self.validator.valid("sim_nation_2", recruitment=False))
+        self.assertTrue(self.validator.valid("sim_nation_1"))
+        self.assertEqual(self.simulator.stats["requests"], requests)
+
+    def test_expiry(self):
+        self.validator.ttl = 0
+        self.validator.check("sim_nation_1")
+        self.assertIsNone(self.validator.status("sim_nation_1"))
+        self.validator.check("ceased_to_exist")
+        self.assertEqual(self.validator.status("ceased_to_exist"), MISSING)
+
+        self.validator.maxsize = 1
+        self.validator.check("sim_nation_2")
+        self.assertIsNone(self.validator.status("ceased_to_exist"))
+
+    def test_prefetch_leaves_reserve(self):
+        nations = [f"sim_nation_{i}" for i in range(1, 51)]
+        checked = self.validator.prefetch(nations)
+
+        # Never more than the bucket allows, less the reserve
+        self.assertEqual(checked, api.Client.request.max_requests - 5)
+        self.assertEqual(self.simulator.stats["requests"], checked)
+        self.assertFalse(self.validator.spare())
+        self.assertEqual(self.validator.prefetch(nations), 0)
+
+    def test_campaign_skips_invalid(self):
+        test_campaign = self.make_campaign(registry=RecipientRegistry())
+        test_campaign.deque.extend(
+            ["sim_nation_1", "ceased_to_exist", "sim_nation_3", "sim_nation_4"]
+        )
+        self.validator.prefetch(self.validator.upcoming([test_campaign]))
+        requests = self.simulator.stats["requests"]
+
+        self.assertEqual(test_campaign.nation, "sim_nation_4")
+        self.assertEqual(test_campaign.nation, "sim_nation_1")
+        with self.assertRaises(IndexError):
+            test_campaign.nation
+        # Everything was known by the time it was needed
+        self.assertEqual(self.simulator.stats["requests"], requests)
+        # and invalid nations aren't recorded as contacted
+        self.assertEqual(len(test_campaign.registry), 2)
+
+        # Non-recruitment telegrams can still go to nations that opted out of recruitment
+        other = self.make_campaign(recruitment=False)
+        other.deque.extend(["sim_nation_3", "ceased_to_exist"])
+        self.assertEqual(other.nation, "sim_nation_3")
+
+    def test_unchecked_nation(self):
+        # Nothing prefetched: handing out never waits on a check, so both go out unchecked
+        pool = TargetPool(validator=self.validator)
+        test_campaign = self.make_campaign()
+        pool.add(test_campaign, "sim_nation_5", found=2)
+        pool.add(test_campaign, "sim_nation_2", found=3)
+
+        self.assertEqual(pool.pop().nation, "sim_nation_2")
+        self.assertEqual(pool.pop().nation, "sim_nation_5")
+        self.assertEqual(self.simulator.stats["requests"], 0)
+
+    def test_pool_upcoming(self):
+        pool = TargetPool(validator=self.validator)
+        test_campaign = self.make_campaign()
+        for i in range(1, 5):
+            pool.add(test_campaign, f"sim_nation_{i}", found=i)
+        self.assertEqual(
+            pool.upcoming(3), ["sim_nation_4", "sim_nation_3", "sim_nation_2"]
+        )
+
+        self.validator.prefetch(pool.upcoming(3))
+        requests = self.simulator.stats["requests"]
+        self.assertEqual(pool.pop().nation, "sim_nation_4")
+        # 3 and 2 opted out of recruitment, which is known without asking again
+        self.assertEqual(pool.pop().nation, "sim_nation_1")
+        self.assertEqual(self.simulator.stats["requests"], requests)
+
+    def test_background(self):
+        test_campaign = self.make_campaign()
+        test_campaign.deque.extend(["sim_nation_6", "sim_nation_7"])
+        self.validator.start(
+            lambda: self.validator.upcoming([test_campaign]), interval=0.01
+        )
+        for _ in range(200):
+            if len(self.validator) == 2:
+                break
+            self.validator._stop.wait(0.01)
+        self.validator.stop()
+
+        self.assertEqual(self.validator.status("sim_nation_6"), VALID)
+        self.assertEqual(self.validator.status("sim_nation_7"), VALID)
@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Tuple
+import api.wrapper
+
+# A recruitment telegram slot only comes round every 180 seconds, so spending one on a nation that has CTE'd since it
+# was queued, or that won't accept recruitment telegrams, is about the most expensive mistake HYPR can make. Validator
+# checks the nations at the front of the campaigns' deques ahead of time with the tgcanrecruit shard (a 404 means the
+# nation no longer exists), using whatever API budget the searches leave spare, and remembers the answers for a while.
+# Campaign.nation and TargetPool.pop then skip nations known to be invalid. They only ever read the cache - they run
+# while a telegram slot is waiting, under the scheduler's telegram locks - so a nation nobody has checked yet goes out
+# unchecked.
+#
+# NS has no bulk form of tgcanrecruit, so it's still one request per nation; the point is to spend them while nothing
+# else needs the budget rather than while a telegram slot is waiting.
+
+# Results of a check
+VALID = "valid"
+CANNOT_RECRUIT = "cannot_recruit"
+MISSING = "missing"
+
+
+class Validator:
+    def __init__(
+        self,
+        client: api.wrapper.Client,
+        ttl: float = 600,
+        negative_ttl: float = 3600,
+        reserve: int = 10,
+        maxsize: int = 100_000,
+        from_region: Optional[str] = None,
+    ):
+        """
+        :param client: Client to check nations with
+        :param ttl: Seconds a nation stays known to be valid. Nations can opt out of recruitment at any time, so keep
+            this short.
+        :param negative_ttl: Seconds a nation stays known to be invalid
+        :param reserve: Requests in the ratelimit window left for everything else; prefetch() stops short of them
+        :param maxsize: Most results remembered, the least recently used are forgotten past it
+        :param from_region: Region the recruitment telegrams are sent from. NS also answers tgcanrecruit=0 for nations
+            that region has recruited recently.
+        """
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.reserve = reserve
+        self.maxsize = maxsize
+        self.from_region = from_region
+        # nation -> (status, expiry)
+        self._results: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {"checks": 0, "hits": 0, "invalid": 0}
+
+    def status(self, nation: str) -> Optional[str]:
+        """
+        Cached result for a nation: VALID, CANNOT_RECRUIT, MISSING, or None if it hasn't been checked recently.
+        Never makes a request.
+        """
+        with self._lock:
+            result = self._results.get(nation)
+            if result is None:
+                return None
+            if result[1] <= time.monotonic():
+                del self._results[nation]
+                return None
+            self._results.move_to_end(nation)
+            return result[0]
+
+    def _store(self, nation: str, status: str) -> None:
+        ttl = self.ttl if status == VALID else self.negative_ttl
+        with self._lock:
+            self._results[nation] = (status, time.monotonic() + ttl)
+            self._results.move_to_end(nation)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def check(self, nation: str) -> Optional[str]:
+        """
+        Asks the API about a nation and caches the answer.
+
+        :return: VALID, CANNOT_RECRUIT or MISSING, or None if the API didn't give a usable answer
+        """
+        params = {"nation": nation, "q": "tgcanrecruit"}
+        if self.from_region is not None:
+            params["from"] = self.from_region
+        response = self.client.ns_request(params)
+        self.stats["checks"] += 1
+        if isinstance(response, dict) and "error" in response:
+            if response["error"] != "404":
+                return None
+            status = MISSING
+        elif response.tgcanrecruit is None:
+            return None
+        else:
+            status = VALID if response.tgcanrecruit else CANNOT_RECRUIT
+        self._store(nation, status)
+        return status
+
+    def valid(self, nation: str, recruitment: bool = True) -> bool:
+        """
+        Whether a nation is worth a telegram, going by the cached result. Never makes a request: a nation with no
+        cached result (not prefetched yet, or the check failed) is given the benefit of the doubt, as the telegram API
+        won't deliver to it anyway if it's gone.
+
+        :param nation: Nation name
+        :param recruitment: If False, only existence matters, not tgcanrecruit
+        """
+        status = self.status(nation)
+        if status is not None:
+            self.stats["hits"] += 1
+        ok = status != MISSING and (status != CANNOT_RECRUIT or not recruitment)
+        if not ok:
+            self.stats["invalid"] += 1
+        return ok
+
+    def spare(self) -> bool:
+        """
+        True if a request can be made now without eating into the reserve.
+        """
+        limiter = self.client.limiter
+        return (
+            limiter.requests_made < limiter.max_requests - self.reserve
+            and limiter.delay() <= 0
+        )
+
+    def prefetch(self, nations: Iterable[str]) -> int:
+        """
+        Checks nations that have no cached result, for as long as there's spare budget.
+
+        :return: Number of nations checked
+        """
+        checked = 0
+        for nation in nations:
+            if self._stop.is_set() or not self.spare():
+                break
+            if self.status(nation) is not None:
+                continue
+            try:
+                self.check(nation)
+            except Exception:
+                break
+            checked += 1
+        return checked
+
+    @staticmethod
+    def upcoming(campaigns: Iterable, n: int = 5) -> List[str]:
+        """
+        The next n nations each campaign would hand out, in the order their deques pop them.
+        """
+        nations = []
+        for campaign in campaigns:
+            nations.extend(campaign.deque.peek(n, newest=not campaign.reverse))
+        return nations
+
+    def start(
+        self,
+        source: Callable[[], Iterable[str]],
+        interval: float = 1.0,
+    ) -> None:
+        """
+        Keeps prefetching in a background thread.
+
+        :param source: Called every interval for the nations to check next, e.g.
+            lambda: validator.upcoming(campaigns)
+        :param interval: Seconds between rounds
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.is_set():
+                try:
+                    self.prefetch(source())
+                except Exception:
+                    # Never let a bad round kill the thread; unchecked nations still get their telegram
+                    pass
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name="hypr-validator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __len__(self) -> int:
+        return len(self._results)
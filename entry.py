@@ -2,10 +2,15 @@ from colorama import init
 from os import path
 from webbrowser import open as open_url
 from api import Client
+from api.cache import ResponseCache
+from api.limiter import SharedLedger
 from campaign import Campaign
-from tools import Console, Scheduler
+from campaign.targeting import TargetPool
+from campaign.validation import Validator
+from exceptions import RecruitmentLimitExceeded, TelegramLimitExceeded
+from tools import Console, Handler, Scheduler, Task
 from time import sleep
-from typing import Tuple
+from typing import List, Tuple
 import logging
 
 
@@ -63,27 +68,55 @@ def verify_prompt(c: Console) -> Tuple[str, str]:
     return nt, tk
 
 
-def send_recruitment(api: Client, campaign: Campaign, c: Console) -> None:
+def send_recruitment(
+    api: Client,
+    pool: TargetPool,
+    campaigns: List[Campaign],
+    c: Console,
+    recruitment: bool = True,
+) -> None:
     """
-    Uses the campaign targeting functionality to provide options for targeting, then schedules the appropriate
-    recruitment request.
-    :param api:
-    :param campaign:
+    Collects what the campaigns have found into the target pool, then sends the best target across all of them the
+    telegram of the campaign that found it.
+    :param api: Client to send with
+    :param pool: Target pool shared by every send, which decides who gets the next telegram
+    :param campaigns: Running campaigns
+    :param c: Console
+    :param recruitment: Whether this is a recruitment telegram slot or a general one
     :return:
     """
 
     if api.key:
-        # Fetch a nation to target from the campaign
-        target = campaign.nation
-        params = {
-            "a": "sendTG",
-            "client": api.key,
-            "tgid": campaign.tgid,
-            "key": campaign.secret_key,
-            "to": target,
-        }
-        # Send the recruitment request
-        resp = api.ns_request(params)
+        # This runs under the scheduler's telegram locks, so it must never sleep waiting for a telegram lane. If the
+        # lane is busy, raise and let the scheduler retry once it's free - before a target is taken from the pool.
+        wait = api.telegram_limiter.delay(api.key, recruitment)
+        if wait > 0:
+            if recruitment:
+                raise RecruitmentLimitExceeded(wait)
+            raise TelegramLimitExceeded(wait)
+        pool.collect(campaigns)
+        candidate = pool.pop(recruitment)
+        if candidate is None:
+            return
+        campaign = candidate.campaign
+        try:
+            resp = api.send_telegram(
+                campaign.tgid,
+                campaign.secret_key,
+                candidate.nation,
+                recruitment=recruitment,
+                block=False,
+            )
+        except (TelegramLimitExceeded, RecruitmentLimitExceeded):
+            # Another sender took the lane in the meantime; keep the target, as it was, for the retry
+            pool.put_back(candidate)
+            raise
+        except Exception:
+            # Don't count the nation as contacted if the telegram never went out
+            pool.release(candidate)
+            raise
+        if not resp.get("queued"):
+            pool.release(candidate)
     else:
         c.cout(
             "No valid API key provided. Please add one to the config file and reload the client.",
@@ -99,7 +132,7 @@ def main() -> None:
     # Declare the console
     c = Console(logger)
     # Start our scheduler
-    sched = Scheduler()
+    sched = Scheduler(Handler(c))
     sched.run()
     c.cout("HYPR is starting up...", "info")
     c.cout("Loading config...", "debug")
@@ -120,7 +153,19 @@ def main() -> None:
         f"(Unverified). // Should there be serious concerns about the operation of this program, please "
         f"open an issue at https://github.com/AavHRF/HYPR/issues."
     )
-    api = Client(ua_string)
+    # One client (and so one response cache) is shared by every campaign, and shard requests they make at the same time
+    # are merged into one
+    api = Client(ua_string, cache=ResponseCache(), coalesce=0.05)
+    if "ratelimit_ledger" in config:
+        # Share the API budget with any other HYPR processes pointed at the same ledger
+        api.limiter.ledger = SharedLedger(config["ratelimit_ledger"])
+    # Every running campaign feeds one target pool, which picks who gets each telegram
+    campaigns: List[Campaign] = []
+    # Checks the nations about to be drawn in the background, with whatever API budget is spare, so a telegram slot
+    # isn't spent on one that has ceased to exist or opted out of recruitment
+    validator = Validator(api, from_region=config.get("home_region"))
+    pool = TargetPool(validator=validator)
+    validator.start(lambda: pool.upcoming() + validator.upcoming(campaigns))
     response = api.ns_request({"a": "verify", "nation": nation, "checksum": token})
     # Confirm the response.
     while True:
@@ -177,6 +222,14 @@ def main() -> None:
         case 5:
             # Start API
             c.cout("Loading API...", "debug")
+            sched.add_task(
+                Task.new(1, "recruitment", 0, send_recruitment, api, pool, campaigns, c)
+            )
+            sched.add_task(
+                Task.new(
+                    2, "telegram", 0, send_recruitment, api, pool, campaigns, c, False
+                )
+            )
 
 
 if __name__ == "__main__":
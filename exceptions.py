@@ -46,6 +46,13 @@ class SearchException(Exception):
     pass
 
 
+class QueueFull(Exception):
+    """
+    Raised by a campaign's RecipientQueue when it's full and its overflow policy is "error".
+    """
+    pass
+
+
 """
 These exceptions are raised by the API wrapper when a request fails.
 They each describe a potential failure and will describe how the program
@@ -94,8 +101,27 @@ class ServiceUnavailable(APIException):
     pass
 
 
+class GatewayTimeout(APIException):
+    """
+    Raised when the API returns a 504 status code.
+    """
+    pass
+
+
 class CloudflareError(APIException):
     """
     Raised when the API returns a 522 status code.
     """
     pass
+
+
+class CircuitOpen(APIException):
+    """
+    Raised instead of sending a request to an endpoint that has been failing, to give NS time to recover.
+    retry_in is the number of seconds until the endpoint will be tried again.
+    """
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for {endpoint}, retrying in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
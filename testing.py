@@ -0,0 +1,144 @@
+import time
+from typing import Callable, List, Optional
+
+import campaign
+from api.transport import Response, Transport
+
+# Stand-ins shared by the unit tests, and only by them - nothing in HYPR itself imports this module. StubTransport and
+# its subclasses replace the network under a real Client; FakeClient replaces the Client itself for campaign tests that
+# only care about which params were asked for. For anything that needs the real API's behaviour (ratelimits, 429s, a
+# changing world), use tools.simulator.
+
+NEWNATIONS = b"<WORLD><NEWNATIONS>testlandia</NEWNATIONS></WORLD>"
+
+
+class StubTransport(Transport):
+    """
+    Answers every request with the same status and body, counting the calls and recording their params.
+    """
+
+    def __init__(
+        self,
+        content: bytes | Callable[[dict], bytes] = NEWNATIONS,
+        status: int = 200,
+        delay: float = 0.0,
+        elapsed: float = 0.0,
+        headers: Optional[dict] = None,
+    ):
+        """
+        :param content: Body to answer with, or a function of the request params returning it
+        :param status: Status code to answer with
+        :param delay: Seconds to sleep before answering, to keep requests in flight
+        :param elapsed: Round trip time reported on the responses
+        :param headers: Extra headers sent with every response
+        """
+        super().__init__()
+        self.content = content
+        self.status = status
+        self.delay = delay
+        self.elapsed = elapsed
+        self.headers = headers or {}
+        self.calls = 0
+        self.requests: List[dict] = []
+
+    def body(self, params: dict) -> bytes:
+        return self.content(params) if callable(self.content) else self.content
+
+    def respond(self, params: dict) -> Response:
+        headers = {"X-Ratelimit-Requests-Seen": str(self.calls), **self.headers}
+        return Response(self.status, headers, self.body(params), self.elapsed)
+
+    def get(self, url: str, params: dict, headers: dict) -> Response:
+        self.calls += 1
+        self.requests.append(dict(params))
+        if self.delay:
+            time.sleep(self.delay)
+        return self.respond(params)
+
+
+class FoundingTransport(StubTransport):
+    """
+    Stands in for the live API: answers newnations with a different nation every time, and sets a cookie like NS does.
+    """
+
+    def __init__(self, elapsed: float = 0.2, **kwargs):
+        kwargs.setdefault("headers", {"Set-Cookie": "a=b"})
+        super().__init__(elapsed=elapsed, **kwargs)
+
+    def body(self, params: dict) -> bytes:
+        return f"<WORLD><NEWNATIONS>nation_{self.calls}</NEWNATIONS></WORLD>".encode()
+
+
+class ScriptedTransport(StubTransport):
+    """
+    Answers each request with the next status code from a script, 200 once the script runs out.
+    """
+
+    def __init__(self, statuses: list, **kwargs):
+        super().__init__(**kwargs)
+        self.statuses = list(statuses)
+
+    def respond(self, params: dict) -> Response:
+        self.status = self.statuses.pop(0) if self.statuses else 200
+        if self.status != 200:
+            headers = {"X-Ratelimit-Requests-Seen": str(self.calls)}
+            return Response(self.status, headers, b"", self.elapsed)
+        return super().respond(params)
+
+
+class FakeClient:
+    """
+    Stands in for api.Client, serving happenings from a list and recording the params it was asked for.
+    Honours sinceid, beforeid and limit like the real happenings shard.
+    """
+
+    def __init__(self, events: list, errors: Optional[dict] = None):
+        """
+        :param events: Happenings events, oldest first
+        :param errors: Request number (counting from 0) -> status to answer that request with an error dict for
+        """
+        self.events = events
+        self.errors = dict(errors or {})
+        self.requests = []
+
+    def ns_request(self, params: dict) -> list | dict:
+        self.requests.append(params)
+        status = self.errors.pop(len(self.requests) - 1, None)
+        if status is not None:
+            return {"error": status, "ratelimit": str(len(self.requests))}
+        since = int(params.get("sinceid", 0))
+        before = int(params.get("beforeid", 1 << 62))
+        # NS serves happenings newest first
+        events = [
+            event
+            for event in reversed(self.events)
+            if since < int(event["event_id"]) < before
+        ]
+        return events[: int(params.get("limit", 100))]
+
+
+def event(event_id: int, text: str, timestamp: int = 1700000000) -> dict:
+    """
+    A happenings event as ns_request returns it.
+    """
+    return {"event_id": str(event_id), "timestamp": str(timestamp), "text": text}
+
+
+def make_campaign(cls: type, name: Optional[str] = None, **kwargs) -> campaign.Campaign:
+    """
+    Builds a campaign that never talks to the API unless given a handler.
+
+    :param cls: Campaign subclass to build
+    :param name: Campaign name, defaults to the class name
+    :param kwargs: Overrides for any of the constructor's arguments (tgid, recruitment, search_params, registry...)
+    """
+    options = {
+        "priority": 0,
+        "tgid": 1,
+        "secret_key": "test_key",
+        "recruitment": True,
+        "handler": None,
+        "search_params": {},
+    }
+    options.update(kwargs)
+    return cls(name=name if name is not None else cls.__name__, **options)
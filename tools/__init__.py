@@ -1,2 +1,3 @@
 from tools.interface import Console
+from tools.errorhandler import Handler
 from tools.scheduler import Scheduler, Task
@@ -1,3 +1,4 @@
+from typing import Optional
 from tools.interface import Console
 from exceptions import *
 
@@ -7,4 +8,44 @@ class Handler:
     def __init__(self, console: Console):
         self.console = console
 
-    def handle(self, error: Exception):
+    def handle(self, error: Exception) -> Optional[float]:
+        """
+        Reports an error raised by a scheduled task, and works out whether the task is worth trying again.
+
+        Server trouble (5xx, dropped connections, open circuits) and ratelimit hits are expected from time to time and
+        are only warned about; anything else is logged as an error. None of them stop HYPR - fatal problems already
+        exit where they happen.
+
+        :param error: The exception raised
+        :return: Seconds to wait before trying again, or None if there's no point retrying
+        """
+        if isinstance(error, CircuitOpen):
+            self.console.cout(
+                f"NationStates keeps failing on {error.endpoint}, leaving it alone for {error.retry_in:.0f}s.",
+                "warn",
+            )
+            return error.retry_in
+        if isinstance(
+            error,
+            (TooManyRequests, TelegramLimitExceeded, RecruitmentLimitExceeded),
+        ):
+            wait = float(error.args[0]) if error.args else 0.0
+            self.console.cout(f"Ratelimited, retrying in {wait:.1f}s.", "warn")
+            return wait
+        if isinstance(
+            error,
+            (ServerError, ServiceUnavailable, GatewayTimeout, CloudflareError, OSError),
+        ):
+            self.console.cout(
+                f"NationStates is having trouble ({type(error).__name__}: {error}).",
+                "warn",
+            )
+            return None
+        if isinstance(error, AccessForbidden):
+            self.console.cout(
+                f"NationStates refused the request, check your API key and telegram settings: {error}",
+                "error",
+            )
+            return None
+        self.console.cout(f"{type(error).__name__}: {error}", "error")
+        return None
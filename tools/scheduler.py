@@ -1,6 +1,8 @@
+import math
 import time
 import threading
-from typing import Callable, List, Literal
+from typing import Callable, List, Literal, Optional
+from tools.errorhandler import Handler
 
 
 class Task:
@@ -39,10 +41,29 @@ class Task:
     def run_when(self) -> int:
         return self.init_time + self.cycle_length
 
+    def retry(self, delay: float) -> "Task":
+        """
+        A copy of the task that's due delay seconds from now.
+        """
+        task = Task(
+            self.priority,
+            self.type,
+            self.cycle_length,
+            self.function,
+            *self.args,
+            **self.kwargs
+        )
+        task.init_time = int(time.time()) + max(1, math.ceil(delay)) - self.cycle_length
+        return task
+
 
 class Scheduler:
-    def __init__(self):
+    def __init__(self, handler: Optional[Handler] = None):
+        """
+        :param handler: Reports errors raised by tasks. Without one, they're just printed.
+        """
         self.tasks: List[Task] = []
+        self.handler = handler
         self.organize()
         self.new_task_added = threading.Event()
         self.continue_running = False
@@ -62,6 +83,8 @@ class Scheduler:
         Method to organize the tasks by time of execution, placing higher priority tasks first.
         :return:
         """
+        if not self.tasks:
+            return
         self.tasks.sort(key=lambda task: task.run_when)
         previous_task: Task = self.tasks[0]
         for task in self.tasks[1:]:
@@ -77,6 +100,24 @@ class Scheduler:
                     previous_task = task
         return
 
+    def execute(self, task: Task) -> None:
+        """
+        Runs a task. A failing task (NS being down, a bad campaign) must never take the scheduler down with it, so
+        errors are reported to the handler instead. If the handler says the task is worth trying again (ratelimited,
+        or the endpoint's circuit is open), it's put back in the queue to run once that wait is over.
+        :param task: Task
+        :return: None
+        """
+        try:
+            task.function(*task.args, **task.kwargs)
+        except Exception as e:
+            if self.handler is None:
+                print(e)
+                return
+            retry_in = self.handler.handle(e)
+            if retry_in is not None:
+                self.add_task(task.retry(retry_in))
+
     def run(self) -> None:
         """
         This method is the main loop of the scheduler. It should be called once to start the scheduler, and never again.
@@ -97,28 +138,20 @@ class Scheduler:
             if delay > 0:
                 time.sleep(delay)
 
-            global_api_lock.acquire()
+            # Telegram pacing is handled by the telegram lanes in api.limiter (see Client.send_telegram), so these
+            # locks only keep telegram tasks from running over each other. Nothing may sleep while holding them:
+            # telegram tasks send with block=False, and a busy lane raises TelegramLimitExceeded or
+            # RecruitmentLimitExceeded, which execute() turns into a retry once the lane is free. That leaves
+            # ordinary telegrams free to go out in the gaps between recruitment ones.
             if task.type == "recruitment":
-                with global_telegram_lock:
-                    with global_recruitment_lock:
-                        try:
-                            task.function(*task.args, **task.kwargs)
-                        except Exception as e:
-                            print(e)
-                            global_api_lock.release()
-                        global_api_lock.release()
-                        time.sleep(task.cycle_length)
+                with global_telegram_lock, global_recruitment_lock:
+                    self.execute(task)
             elif task.type == "telegram":
                 with global_telegram_lock:
-                    try:
-                        task.function(*task.args, **task.kwargs)
-                    except Exception as e:
-                        print(e)
-                        global_api_lock.release()
-                    global_api_lock.release()
-                    time.sleep(task.cycle_length)
+                    self.execute(task)
             else:
-                task.function(*task.args, **task.kwargs)
+                with global_api_lock:
+                    self.execute(task)
                 time.sleep(task.cycle_length)
             return
 
@@ -127,9 +160,11 @@ class Scheduler:
             if self.tasks:
                 # Check if the first task is due
                 if check_if_task_is_due(self.tasks[0]):
-                    # Run the task and then clean up the queue
-                    run_task(self.tasks[0])
-                    self.tasks.pop(0)
+                    # Run the task and then clean up the queue. It may have queued a retry of itself meanwhile, so
+                    # remove it by identity rather than position.
+                    task = self.tasks[0]
+                    run_task(task)
+                    self.tasks.remove(task)
                     self.organize()
 
                 # Check to see if there are any new tasks
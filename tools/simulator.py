@@ -0,0 +1,607 @@
+import math
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from xml.sax.saxutils import escape
+
+# A local stand-in for the NationStates API, for load testing HYPR without spending (or tripping) the real budget.
+#
+# World keeps a synthetic population of nations and regions, and makes things happen to it - foundings, moves, WA
+# admissions and resignations, endorsements, ejections - at configurable rates. Simulator serves it over HTTP with the
+# endpoints Client uses, and enforces the real limits: 50 requests per 30 seconds, one telegram per 30 seconds per
+# client key and one recruitment telegram per 180 seconds, answering 429 with Retry-After past them. Point a
+# transport's base_url at Simulator.url:
+#
+#   sim = Simulator()
+#   sim.start()
+#   client = Client(ua_string, transport=PooledTransport(base_url=sim.url))
+#
+# or run it on its own with python -m tools.simulator [port].
+
+FEEDERS = [
+    "the_pacific",
+    "the_north_pacific",
+    "the_south_pacific",
+    "the_east_pacific",
+    "the_west_pacific",
+    "lazarus",
+    "osiris",
+    "balder",
+]
+REJECTED = "the_rejected_realms"
+
+# Events per second across the whole world. NS sees roughly this much on a quiet day.
+RATES = {
+    "found": 0.3,
+    "move": 1.0,
+    "admit": 0.2,
+    "resign": 0.15,
+    "endorse": 1.0,
+    "withdraw": 0.2,
+    "eject": 0.05,
+}
+
+# Happenings filter each kind of event shows up under
+FILTERS = {
+    "found": "founding",
+    "move": "move",
+    "admit": "member",
+    "resign": "member",
+    "endorse": "endo",
+    "withdraw": "endo",
+    "eject": "eject",
+}
+
+
+class Happening:
+    __slots__ = ("event_id", "timestamp", "filter", "text", "nations", "regions")
+
+    def __init__(
+        self,
+        event_id: int,
+        timestamp: int,
+        kind: str,
+        text: str,
+        nations: Tuple[str, ...],
+        regions: Tuple[str, ...],
+    ):
+        self.event_id = event_id
+        self.timestamp = timestamp
+        self.filter = FILTERS[kind]
+        self.text = text
+        self.nations = nations
+        self.regions = regions
+
+
+class World:
+    def __init__(
+        self,
+        regions: Iterable[str] = FEEDERS + [REJECTED],
+        nations: int = 1000,
+        rates: Optional[Dict[str, float]] = None,
+        history: int = 20000,
+        seed: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Synthetic NationStates world. Time only moves when advance() is called, which the Simulator does on every
+        request, so events arrive at their configured rates however often the world is looked at.
+
+        :param regions: Region names. Nations are founded into the first five.
+        :param nations: Nations to start with, spread over the regions, about a third of them in the WA
+        :param rates: Events per second by kind (found, move, admit, resign, endorse, withdraw, eject), overriding
+            RATES
+        :param history: Most happenings kept
+        :param seed: Seed for the random number generator, so runs are repeatable
+        :param clock: Returns the current Unix time
+        """
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.rates = {**RATES, **(rates or {})}
+        self.lock = threading.RLock()
+        # region -> {nation: None}, a dict so nations stay in order of arrival
+        self.regions: Dict[str, Dict[str, None]] = {r: {} for r in regions}
+        self.region_of: Dict[str, str] = {}
+        self.wa: Dict[str, None] = {}
+        # nation -> nations endorsing it
+        self.endorsements: Dict[str, Dict[str, None]] = {}
+        self.happenings: Deque[Happening] = deque(maxlen=history)
+        self.newnations: Deque[str] = deque(maxlen=50)
+        # Nations that won't accept recruitment telegrams (tgcanrecruit=0)
+        self.no_recruit: set = set()
+        self._names = 0
+        self._event_id = 0
+        self._due = {kind: 0.0 for kind in self.rates}
+        self._last = self._now = clock()
+
+        names = list(self.regions)
+        for _ in range(nations):
+            nation = self._new_nation(self.rng.choice(names))
+            if self.rng.random() < 0.3:
+                self.wa[nation] = None
+
+    def _new_nation(self, region: str) -> str:
+        self._names += 1
+        nation = f"sim_nation_{self._names}"
+        self.regions[region][nation] = None
+        self.region_of[nation] = region
+        self.endorsements[nation] = {}
+        return nation
+
+    def _move(self, nation: str, region: str) -> None:
+        del self.regions[self.region_of[nation]][nation]
+        self.regions[region][nation] = None
+        self.region_of[nation] = region
+        self._clear_endorsements(nation)
+
+    def _clear_endorsements(self, nation: str) -> None:
+        self.endorsements[nation] = {}
+        for endorsers in self.endorsements.values():
+            endorsers.pop(nation, None)
+
+    def _pick(self, population: Iterable[str]) -> Optional[str]:
+        population = list(population)
+        return self.rng.choice(population) if population else None
+
+    def _record(self, kind: str, text: str, nations: tuple, regions: tuple) -> None:
+        self._event_id += 1
+        self.happenings.append(
+            Happening(self._event_id, int(self._now), kind, text, nations, regions)
+        )
+
+    def _happen(self, kind: str) -> None:
+        if kind == "found":
+            region = self.rng.choice(list(self.regions)[:5])
+            nation = self._new_nation(region)
+            self.newnations.appendleft(nation)
+            self._record(
+                kind, f"@@{nation}@@ was founded in %%{region}%%.", (nation,), (region,)
+            )
+        elif kind == "move":
+            nation = self._pick(self.region_of)
+            source = self.region_of[nation]
+            destination = self.rng.choice([r for r in self.regions if r != source])
+            self._move(nation, destination)
+            self._record(
+                kind,
+                f"@@{nation}@@ relocated from %%{source}%% to %%{destination}%%.",
+                (nation,),
+                (source, destination),
+            )
+        elif kind == "admit":
+            nation = self._pick(n for n in self.region_of if n not in self.wa)
+            if nation is None:
+                return
+            self.wa[nation] = None
+            self._record(
+                kind,
+                f"@@{nation}@@ was admitted to the World Assembly.",
+                (nation,),
+                (self.region_of[nation],),
+            )
+        elif kind == "resign":
+            nation = self._pick(self.wa)
+            if nation is None:
+                return
+            del self.wa[nation]
+            self._clear_endorsements(nation)
+            self._record(
+                kind,
+                f"@@{nation}@@ resigned from the World Assembly.",
+                (nation,),
+                (self.region_of[nation],),
+            )
+        elif kind in ("endorse", "withdraw"):
+            nation = self._pick(self.wa)
+            if nation is None:
+                return
+            region = self.region_of[nation]
+            if kind == "endorse":
+                # Most endorsements go to the delegate
+                target = self.delegate(region)
+                if target in (None, nation) or nation in self.endorsements[target]:
+                    target = self._pick(
+                        n
+                        for n in self.regions[region]
+                        if n in self.wa
+                        and n != nation
+                        and nation not in self.endorsements[n]
+                    )
+                if target is None:
+                    return
+                self.endorsements[target][nation] = None
+                text = f"@@{nation}@@ endorsed @@{target}@@."
+            else:
+                target = self._pick(
+                    n for n in self.regions[region] if nation in self.endorsements[n]
+                )
+                if target is None:
+                    return
+                del self.endorsements[target][nation]
+                text = f"@@{nation}@@ withdrew its endorsement from @@{target}@@."
+            self._record(kind, text, (nation, target), (region,))
+        elif kind == "eject":
+            region = self.rng.choice([r for r in self.regions if r != REJECTED])
+            nation = self._pick(self.regions[region])
+            officer = self.delegate(region) or self._pick(self.region_of)
+            if nation is None or nation == officer:
+                return
+            self._move(nation, REJECTED)
+            self._record(
+                kind,
+                f"@@{nation}@@ was ejected from %%{region}%% by @@{officer}@@.",
+                (nation, officer),
+                (region,),
+            )
+
+    def advance(self) -> None:
+        """
+        Makes everything happen that should have happened since the last call.
+        """
+        with self.lock:
+            now = self.clock()
+            elapsed = now - self._last
+            self._last = now
+            # Spread the events over the elapsed time, in order, so timestamps and event ids agree
+            pending = []
+            for kind, rate in self.rates.items():
+                self._due[kind] += rate * elapsed
+                n = int(self._due[kind])
+                self._due[kind] -= n
+                pending.extend(
+                    (now - self.rng.random() * elapsed, kind)
+                    for _ in range(min(n, self.happenings.maxlen))
+                )
+            for at, kind in sorted(pending):
+                self._now = at
+                self._happen(kind)
+
+    def delegate(self, region: str) -> Optional[str]:
+        best = None
+        for nation in self.regions[region]:
+            if nation in self.wa and (
+                best is None
+                or len(self.endorsements[nation]) > len(self.endorsements[best])
+            ):
+                best = nation
+        return best
+
+    def select(
+        self,
+        filters: Optional[List[str]] = None,
+        view: Optional[str] = None,
+        sinceid: Optional[int] = None,
+        beforeid: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[Happening]:
+        """
+        Happenings matching a happenings query, newest first.
+        """
+        nations = regions = None
+        if view:
+            kind, _, names = view.partition(".")
+            names = set(names.split(","))
+            if kind == "nation":
+                nations = names
+            else:
+                regions = names
+        events = []
+        with self.lock:
+            for event in reversed(self.happenings):
+                if sinceid is not None and event.event_id <= sinceid:
+                    break
+                if beforeid is not None and event.event_id >= beforeid:
+                    continue
+                if filters and event.filter not in filters:
+                    continue
+                if nations is not None and nations.isdisjoint(event.nations):
+                    continue
+                if regions is not None and regions.isdisjoint(event.regions):
+                    continue
+                events.append(event)
+                if len(events) >= limit:
+                    break
+        return events
+
+
+class Simulator:
+    def __init__(
+        self,
+        world: Optional[World] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_requests: int = 50,
+        period: float = 30,
+        telegram_period: float = 30,
+        recruitment_period: float = 180,
+        recruitment_tgids: Iterable[int] = (),
+        checksum: str = "hypr",
+    ):
+        """
+        :param world: World to serve, defaults to a new World()
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 for any free one
+        :param max_requests: Requests allowed per period
+        :param period: Length of the ratelimit window in seconds
+        :param telegram_period: Seconds between telegrams sent with the same client key
+        :param recruitment_period: Seconds between recruitment telegrams sent with the same client key
+        :param recruitment_tgids: Telegram templates that are recruitment telegrams. NS knows this from the template
+            itself, so it can't be told from the request.
+        :param checksum: The verification code a=verify accepts
+        """
+        self.world = world if world is not None else World()
+        self.max_requests = max_requests
+        self.period = period
+        self.telegram_period = telegram_period
+        self.recruitment_period = recruitment_period
+        self.recruitment_tgids = {str(tgid) for tgid in recruitment_tgids}
+        self.checksum = checksum
+        self.stats = {
+            "requests": 0,
+            "throttled": 0,
+            "telegrams": 0,
+            "recruitment": 0,
+            "telegrams_throttled": 0,
+        }
+        self._window: Deque[float] = deque()
+        # (client key, recruitment) -> time the lane is next free
+        self._lanes: Dict[tuple, float] = {}
+        self._sent: Deque[float] = deque()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/cgi-bin/api.cgi"
+
+    def start(self) -> str:
+        """
+        Serves the API on a background thread.
+
+        :return: URL to use as a transport's base_url
+        """
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def admit(self) -> Tuple[bool, Dict[str, str]]:
+        """
+        Counts a request against the window.
+
+        :return: Whether it's allowed, and the ratelimit headers to send back
+        """
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0] <= now - self.period:
+                self._window.popleft()
+            allowed = len(self._window) < self.max_requests
+            if allowed:
+                self._window.append(now)
+                self.stats["requests"] += 1
+            else:
+                self.stats["throttled"] += 1
+            reset = self._window[0] + self.period - now if self._window else 0
+            headers = {
+                "X-Ratelimit-Requests-Seen": str(len(self._window)),
+                "RateLimit-Policy": f"{self.max_requests};w={self.period:g}",
+                "RateLimit-Limit": str(self.max_requests),
+                "RateLimit-Remaining": str(self.max_requests - len(self._window)),
+                "RateLimit-Reset": str(math.ceil(reset)),
+            }
+            if not allowed:
+                headers["Retry-After"] = str(math.ceil(reset))
+            return allowed, headers
+
+    def telegram(self, key: str, tgid: str) -> Optional[float]:
+        """
+        Counts a telegram against the client key's lanes.
+
+        :return: None if it may be sent, else seconds until it could have been
+        """
+        recruitment = tgid in self.recruitment_tgids
+        with self._lock:
+            now = time.monotonic()
+            free = self._lanes.get((key, False), 0.0)
+            if recruitment:
+                free = max(free, self._lanes.get((key, True), 0.0))
+            if free > now:
+                self.stats["telegrams_throttled"] += 1
+                return free - now
+            self._lanes[(key, False)] = now + self.telegram_period
+            if recruitment:
+                self._lanes[(key, True)] = now + self.recruitment_period
+                self.stats["recruitment"] += 1
+            self.stats["telegrams"] += 1
+            self._sent.append(now)
+            return None
+
+    def respond(self, params: Dict[str, str]) -> Tuple[int, str, Dict[str, str]]:
+        """
+        Answers an API request.
+
+        :return: Status code, body and any extra headers
+        """
+        allowed, headers = self.admit()
+        if not allowed:
+            return 429, "Too Many Requests", headers
+        self.world.advance()
+        action = params.get("a", "").lower()
+        if action:
+            status, body, extra = self.action(action, params)
+            return status, body, {**headers, **extra}
+        shards = params.get("q", "").lower().split("+")
+        with self.world.lock:
+            if "nation" in params:
+                status, body = self.nation(params["nation"].lower(), shards)
+            elif "region" in params:
+                status, body = self.region(params["region"].lower(), shards)
+            elif "wa" in params:
+                status, body = self.assembly(shards)
+            else:
+                status, body = self.world_shards(shards, params)
+        return status, body, headers
+
+    def action(self, action: str, params: dict) -> Tuple[int, str, Dict[str, str]]:
+        if action == "verify":
+            nation = params.get("nation", "").lower()
+            verified = (
+                nation in self.world.region_of
+                and params.get("checksum") == self.checksum
+            )
+            return 200, "1" if verified else "0", {}
+        if action == "sendtg":
+            missing = [p for p in ("client", "tgid", "key", "to") if not params.get(p)]
+            if missing:
+                return 400, f"Missing parameter: {missing[0]}", {}
+            wait = self.telegram(params["client"], str(params["tgid"]))
+            if wait is not None:
+                return (
+                    429,
+                    "Client exceeded ratelimit",
+                    {"Retry-After": str(math.ceil(wait))},
+                )
+            return 200, "queued", {}
+        return 400, f"Unknown action: {action}", {}
+
+    def nation(self, nation: str, shards: List[str]) -> Tuple[int, str]:
+        world = self.world
+        if nation not in world.region_of:
+            return 404, "Unknown nation"
+        values = {
+            "name": nation,
+            "region": world.region_of[nation],
+            "endorsements": ",".join(world.endorsements[nation]),
+            "unstatus": "WA Member" if nation in world.wa else "Non-member",
+            "tgcanrecruit": "0" if nation in world.no_recruit else "1",
+            "population": "5",
+        }
+        return 200, _entity("NATION", nation, values, shards)
+
+    def region(self, region: str, shards: List[str]) -> Tuple[int, str]:
+        world = self.world
+        if region not in world.regions:
+            return 404, "Unknown region"
+        values = {
+            "name": region,
+            "nations": ":".join(world.regions[region]),
+            "numnations": str(len(world.regions[region])),
+            "delegate": world.delegate(region) or "0",
+        }
+        return 200, _entity("REGION", region, values, shards)
+
+    def assembly(self, shards: List[str]) -> Tuple[int, str]:
+        world = self.world
+        values = {
+            "members": ",".join(world.wa),
+            "delegates": ",".join(
+                d for d in map(world.delegate, world.regions) if d is not None
+            ),
+            "numnations": str(len(world.wa)),
+        }
+        body = "".join(_tag(s, values[s]) for s in shards if s in values)
+        return 200, f'<WA council="1">{body}</WA>'
+
+    def world_shards(self, shards: List[str], params: dict) -> Tuple[int, str]:
+        parts = []
+        for shard in shards:
+            if shard == "newnations":
+                parts.append(_tag(shard, ",".join(self.world.newnations)))
+            elif shard == "happenings":
+                parts.append(self.happenings(params))
+            elif shard == "tgq":
+                with self._lock:
+                    now = time.monotonic()
+                    while self._sent and self._sent[0] <= now - 60:
+                        self._sent.popleft()
+                    # Telegrams sent in the last minute are treated as still queued
+                    queued = len(self._sent)
+                parts.append(
+                    f"<TGQUEUE><MANUAL>0</MANUAL><MASS>0</MASS><API>{queued}</API></TGQUEUE>"
+                )
+        return 200, f"<WORLD>{''.join(parts)}</WORLD>"
+
+    def happenings(self, params: dict) -> str:
+        def integer(name: str) -> Optional[int]:
+            return int(params[name]) if params.get(name) else None
+
+        events = self.world.select(
+            (
+                params.get("filter", "").lower().split("+")
+                if params.get("filter")
+                else None
+            ),
+            params.get("view"),
+            integer("sinceid"),
+            integer("beforeid"),
+            min(integer("limit") or 100, 200),
+        )
+        return (
+            "<HAPPENINGS>"
+            + "".join(
+                f'<EVENT id="{e.event_id}"><TIMESTAMP>{e.timestamp}</TIMESTAMP>'
+                f"<TEXT>{escape(e.text)}</TEXT></EVENT>"
+                for e in events
+            )
+            + "</HAPPENINGS>"
+        )
+
+
+def _tag(name: str, text: str) -> str:
+    tag = name.upper()
+    return f"<{tag}>{escape(text)}</{tag}>"
+
+
+def _entity(root: str, name: str, values: Dict[str, str], shards: List[str]) -> str:
+    # No q means the standard shards
+    shards = [s for s in shards if s] or list(values)
+    body = "".join(_tag(s, values[s]) for s in shards if s in values)
+    return f'<{root} id="{name}">{body}</{root}>'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        params = dict(parse_qsl(urlsplit(self.path).query))
+        try:
+            status, body, headers = self.server.simulator.respond(params)
+        except ValueError as e:
+            status, body, headers = 400, f"Bad request: {e}", {}
+        content = body.encode()
+        self.send_response(status)
+        self.send_header(
+            "Content-Type", "text/xml" if body.startswith("<") else "text/plain"
+        )
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    simulator = Simulator(port=port)
+    print(f"Simulating the NationStates API at {simulator.start()}")
+    try:
+        while True:
+            time.sleep(60)
+            print(simulator.stats)
+    except KeyboardInterrupt:
+        simulator.stop()
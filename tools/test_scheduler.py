@@ -0,0 +1,47 @@
+import time
+from unittest import TestCase
+
+from exceptions import ServerError, TooManyRequests
+from tools.scheduler import Scheduler, Task
+
+
+class StubHandler:
+    """
+    Stands in for tools.errorhandler.Handler: retries ratelimit hits after the wait they carry, nothing else.
+    """
+
+    def __init__(self):
+        self.errors = []
+
+    def handle(self, error: Exception):
+        self.errors.append(error)
+        if isinstance(error, TooManyRequests):
+            return error.args[0]
+        return None
+
+
+def fail(error: Exception):
+    raise error
+
+
+class TestExecute(TestCase):
+    def setUp(self):
+        self.handler = StubHandler()
+        self.scheduler = Scheduler(self.handler)
+
+    def test_ratelimited_task_retried(self):
+        task = Task.new(3, "api", 0, fail, TooManyRequests(20))
+        self.scheduler.execute(task)
+
+        self.assertEqual(len(self.scheduler.tasks), 1)
+        retry = self.scheduler.tasks[0]
+        self.assertIsNot(retry, task)
+        self.assertAlmostEqual(retry.run_when, time.time() + 20, delta=2)
+        self.assertEqual((retry.priority, retry.type), (3, "api"))
+        self.assertEqual(retry.args, task.args)
+
+    def test_other_errors_not_retried(self):
+        self.scheduler.execute(Task.new(3, "api", 0, fail, ServerError("500")))
+
+        self.assertEqual(len(self.handler.errors), 1)
+        self.assertEqual(self.scheduler.tasks, [])
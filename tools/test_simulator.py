@@ -0,0 +1,99 @@
+from unittest import TestCase
+
+import api
+import campaign
+from api.transport import PooledTransport
+from exceptions import TooManyRequests
+from tools.simulator import Simulator, World
+
+
+class SimulatorTestCase(TestCase):
+    def setUp(self):
+        api.Client.request.reset()
+        api.Client.telegram_limiter = api.limiter.TelegramBucket()
+        self.simulator = Simulator(World(nations=200), recruitment_tgids=[2])
+        self.transport = PooledTransport(base_url=self.simulator.start())
+        self.client = api.Client("HYPR Unit Tests", transport=self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+        self.simulator.stop()
+        api.Client.request.reset()
+
+
+class TestRatelimit(SimulatorTestCase):
+    def test_enforced(self):
+        for _ in range(50):
+            r = self.transport.get("", {"q": "newnations"}, {})
+            self.assertEqual(r.status_code, 200)
+        r = self.transport.get("", {"q": "newnations"}, {})
+
+        self.assertEqual(r.status_code, 429)
+        self.assertGreater(int(r.headers["Retry-After"]), 0)
+        self.assertEqual(r.headers["X-Ratelimit-Requests-Seen"], "50")
+        self.assertEqual(r.headers["RateLimit-Remaining"], "0")
+
+    def test_client_stays_under(self):
+        # As fast as the bucket allows: HYPR refuses the 46th request itself rather than letting NS refuse it
+        with self.assertRaises(TooManyRequests):
+            for _ in range(50):
+                self.client.request({"q": "newnations"})
+
+        self.assertEqual(self.simulator.stats["requests"], 45)
+        self.assertEqual(self.simulator.stats["throttled"], 0)
+
+    def test_telegrams(self):
+        self.client.key = "client_key"
+        self.assertTrue(
+            self.client.send_telegram(2, "secret", "sim_nation_1", True)["queued"]
+        )
+
+        # Skipping HYPR's telegram bucket, NS refuses the next one
+        params = self.client.telegram_params(1, "secret", "sim_nation_2")
+        r = self.transport.get("", params, {})
+        self.assertEqual(r.status_code, 429)
+        self.assertEqual(self.simulator.stats["telegrams"], 1)
+        self.assertEqual(self.simulator.stats["recruitment"], 1)
+
+
+class TestEndpoints(SimulatorTestCase):
+    def test_happenings_campaign(self):
+        world = self.simulator.world
+        world._last -= 120
+        test_campaign = campaign.Entrances(
+            name="test",
+            priority=0,
+            tgid=0,
+            secret_key="test_key",
+            recruitment=False,
+            handler=self.client,
+            search_params={"region": "the_pacific"},
+        )
+        test_campaign.update_deque()
+
+        expected = [
+            e.nations[0]
+            for e in world.select(["move"], "region.the_pacific")
+            if e.regions[1] == "the_pacific"
+        ]
+        self.assertGreater(len(test_campaign.deque), 0)
+        self.assertEqual(sorted(test_campaign.deque), sorted(expected))
+
+        # Only new events next time
+        cursor = test_campaign.cursors.get(test_campaign.cursor_key)
+        self.assertEqual(
+            cursor,
+            max(e.event_id for e in world.select(["move"], "region.the_pacific")),
+        )
+
+    def test_shards(self):
+        world = self.simulator.world
+        region = self.client.request({"region": "the_pacific", "q": "nations+delegate"})
+        self.assertEqual(region.nations, list(world.regions["the_pacific"]))
+        self.assertEqual(region.delegate, world.delegate("the_pacific"))
+
+        members = self.client.request({"wa": "1", "q": "members"})["members"]
+        self.assertEqual(members, list(world.wa))
+
+        verify = {"a": "verify", "nation": "sim_nation_1", "checksum": "hypr"}
+        self.assertTrue(self.client.request(verify)["verified"])